@@ -1,12 +1,21 @@
 import streamlit as st
 import os
-from langchain_core.messages import HumanMessage
-from src.ingestion import IngestionEngine
-from src.graph import app as rag_app
 from src.config import Config
 
 st.set_page_config(page_title="DevDocs Navigator", layout="wide")
 
+# Heavy modules (LangGraph, FAISS, the embedding model) are imported on first use
+# and cached for the server process, so page loads and reruns stay fast.
+@st.cache_resource
+def get_ingestion_engine():
+    from src.ingestion import IngestionEngine
+    return IngestionEngine()
+
+@st.cache_resource
+def get_rag_app():
+    from src.graph import app as rag_app
+    return rag_app
+
 st.title("🧭 DevDocs Navigator")
 st.markdown("AI-Powered Documentation Assistant for LangChain, LlamaIndex, and Pandas")
 
@@ -23,25 +32,33 @@ with st.sidebar:
 
     st.header("Data Management")
     
-    # Check if vector store exists
-    if os.path.exists(Config.VECTOR_STORE_PATH):
-        st.success("✅ Knowledge Base: Ready")
+    # Check which collection shards exist
+    from src.shards import collection_names, shard_exists
+    available = [name for name in collection_names() if shard_exists(name)]
+    if available:
+        st.success(f"✅ Knowledge Base: Ready ({', '.join(available)})")
     else:
         st.warning("⚠️ Knowledge Base: Not Found. Please ingest data.")
+    selected_collections = st.multiselect(
+        "Search collections", available,
+        help="Leave empty to pick collections from the question (or search all)."
+    )
         
     if st.button("Re-ingest / Update Documentation"):
         with st.spinner("Ingesting documentation... This may take a while."):
             try:
-                ingestion = IngestionEngine()
+                ingestion = get_ingestion_engine()
                 # Use sample URLs for now, in real app might allow user input or broader crawl
                 sample_urls = [
                    "https://python.langchain.com/docs/introduction/", 
                    "https://langchain-ai.github.io/langgraph/concepts/high_level/", # LangGraph Concepts
                 ]
                 docs = ingestion.load_urls(sample_urls)
-                splits = ingestion.process_documents(docs)
-                ingestion.create_vector_store(splits)
-                st.success(f"Successfully ingested {len(splits)} chunks!")
+                summary = ingestion.update_vector_store(docs)
+                if summary is None:
+                    st.error("Ingestion failed. Check the logs for details.")
+                    st.stop()
+                st.success(f"Documentation updated: {summary['added']} chunks added, {summary['removed']} removed.")
                 st.rerun() # Refresh status
             except Exception as e:
                 st.error(f"Error during ingestion: {e}")
@@ -55,42 +72,63 @@ with st.sidebar:
         with st.spinner("Processing files..."):
             try:
                 import tempfile
-                ingestion = IngestionEngine()
-                all_docs = []
+                ingestion = get_ingestion_engine()
                 
                 # Create a temp directory to save uploaded files
                 with tempfile.TemporaryDirectory() as temp_dir:
+                    names = {}
                     for uploaded_file in uploaded_files:
                         temp_path = os.path.join(temp_dir, uploaded_file.name)
                         with open(temp_path, "wb") as f:
                             f.write(uploaded_file.getbuffer())
-                        
-                        if uploaded_file.name.endswith(".pdf"):
-                            all_docs.extend(ingestion.load_pdf(temp_path))
-                        else:
-                            all_docs.extend(ingestion.load_text(temp_path))
+                        names[temp_path] = uploaded_file.name
+                    
+                    all_docs = ingestion.load_files(list(names))
+                    # Key chunks by the uploaded name, not the random temp path, so re-uploads replace them
+                    for doc in all_docs:
+                        doc.metadata["source"] = names.get(doc.metadata.get("source"), doc.metadata.get("source"))
                     
                     if all_docs:
-                        splits = ingestion.process_documents(all_docs)
-                        ingestion.create_vector_store(splits)
-                        st.success(f"Successfully ingested {len(all_docs)} documents ({len(splits)} chunks)!")
+                        summary = ingestion.update_vector_store(all_docs)
+                        if summary is None:
+                            st.error("Ingestion failed. Check the logs for details.")
+                            st.stop()
+                        st.success(f"Successfully ingested {len(all_docs)} documents ({summary['added']} new chunks)!")
                         st.rerun()
                     else:
                         st.warning("No valid content found in uploaded files.")
             except Exception as e:
                 st.error(f"Error processing upload: {e}")
 
-    # 2. Demo Data
+    # 2. Crawl a documentation site
+    crawl_url = st.text_input("Crawl a documentation site", placeholder="https://pandas.pydata.org/docs/user_guide/")
+    crawl_depth = st.number_input("Link depth", min_value=0, max_value=10, value=Config.CRAWL_MAX_DEPTH)
+    if crawl_url and st.button("Crawl Site"):
+        with st.spinner("Crawling... Pages unchanged since the last crawl are skipped."):
+            try:
+                ingestion = get_ingestion_engine()
+                summary = ingestion.crawl([crawl_url], max_depth=int(crawl_depth))
+                if summary is None:
+                    st.error("Crawl failed. Check the logs for details.")
+                    st.stop()
+                st.success(f"Crawled {summary['pages_fetched']} pages ({summary['pages_unchanged']} unchanged): "
+                           f"{summary['added']} chunks added, {summary['removed']} removed.")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error during crawl: {e}")
+
+    # 3. Demo Data
     if st.button("Load Demo Data (Acme Corp Handbook)"):
         with st.spinner("Loading Demo Data..."):
             try:
-                ingestion = IngestionEngine()
+                ingestion = get_ingestion_engine()
                 data_path = os.path.join(Config.PROJECT_ROOT, "data")
-                docs = ingestion.load_directory(data_path)
-                if docs:
-                    splits = ingestion.process_documents(docs)
-                    ingestion.create_vector_store(splits)
-                    st.success(f"Successfully loaded Acme Corp Handbook ({len(splits)} chunks)!")
+                if os.path.isdir(data_path):
+                    summary = ingestion.ingest_stream([data_path])
+                    if summary is None:
+                        st.error("Ingestion failed. Check the logs for details.")
+                        st.stop()
+                    st.success(f"Successfully loaded Acme Corp Handbook ({summary['added']} new chunks)!")
                     st.rerun()
                 else:
                     st.error("Demo data not found in 'data/' directory.")
@@ -126,29 +164,28 @@ if prompt := st.chat_input("How do I use LangGraph?"):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Invoke the LangGraph app
-                # Use the session-specific thread_id
-                config = {"configurable": {"thread_id": st.session_state.thread_id}}
-                result = rag_app.invoke(
-                    {"question": prompt, "messages": [HumanMessage(content=prompt)]}, 
-                    config=config
-                )
-                
-                # Extract the last AI message
-                response = result["messages"][-1].content
-                st.markdown(response)
-                
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                
-                # Debugging: Show retrieved context
-                with st.expander("Debug: Retrieved Context"):
-                    st.write(result.get("context", "No context returned"))
-                
-                # Check for context/sources in state if available (not explicitly returned in simple graph but in state)
-                # In a real app we would extract documents from state if persisted or returned
-                
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
-                st.markdown("Please make sure you have set up the API keys and ingested data.")
+        try:
+            # Stream the LangGraph app so the answer renders token by token
+            # Use the session-specific thread_id
+            from langchain_core.messages import HumanMessage
+            from src.graph import AnswerStream
+            config = {"configurable": {"thread_id": st.session_state.thread_id}}
+            stream = AnswerStream(
+                {"question": prompt, "messages": [HumanMessage(content=prompt)], "collections": selected_collections},
+                config,
+                graph=get_rag_app()
+            )
+            response = st.write_stream(stream)
+            if stream.ttft is not None:
+                st.caption(f"First token in {stream.ttft * 1000:.0f} ms · total {stream.total * 1000:.0f} ms")
+            
+            st.session_state.messages.append({"role": "assistant", "content": response})
+            
+            # Debugging: Show retrieved context
+            result = stream.state or {}
+            with st.expander("Debug: Retrieved Context"):
+                st.write(result.get("context", "No context returned"))
+            
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+            st.markdown("Please make sure you have set up the API keys and ingested data.")
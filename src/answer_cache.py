@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+from src.config import Config
+
+
+def _selection(collections):
+    """Order-independent key of a collection selection; () for the default (no selection)."""
+    return tuple(sorted(set(collections or ())))
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of generated answers, looked up by question similarity among the
+    answers given for the same collection selection. Entries are tied to the vector store
+    version they were answered from and are dropped as soon as a new index version is
+    served; otherwise evicted by LRU and TTL.
+    """
+
+    def __init__(self, embeddings, threshold=None, max_entries=None, ttl=None):
+        self.embeddings = embeddings
+        self.threshold = Config.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or Config.ANSWER_CACHE_MAX_ENTRIES
+        self.ttl = Config.ANSWER_CACHE_TTL if ttl is None else ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._indexes = {} # collection selection -> cosine similarity over normalized question vectors
+        self._entries = OrderedDict() # id -> entry, least recently used first
+        self._vectors = OrderedDict() # recent question -> vector, so lookup + store embed once
+        self._version = None
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    def _embed(self, question, vector=None):
+        """Unit-length question vector; vector is the question's embedding if the caller has it."""
+        with self._lock:
+            if question in self._vectors:
+                self._vectors.move_to_end(question)
+                return self._vectors[question]
+        if vector is None:
+            vector = self.embeddings.embed_query(question)
+        vector = np.array([vector], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        with self._lock:
+            self._vectors[question] = vector
+            if len(self._vectors) > 256:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def _sync_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._version = version
+
+    def _remove(self, ids):
+        for i in ids:
+            entry = self._entries.pop(i)
+            self._indexes[entry["collections"]].remove_ids(np.array([i], dtype=np.int64))
+
+    def _expire(self):
+        if self.ttl:
+            cutoff = time.time() - self.ttl
+            expired = [i for i, e in self._entries.items() if e["created"] < cutoff]
+            self.evictions += len(expired)
+            self._remove(expired)
+
+    def lookup(self, question, version, vector=None, collections=None):
+        """
+        Return the cached entry for a similar question answered from this index version
+        with the same collection selection (None or [] for the default), or None.
+        """
+        vector = self._embed(question, vector)
+        with self._lock:
+            self._sync_version(version)
+            self._expire()
+            index = self._indexes.get(_selection(collections))
+            if index is not None and index.ntotal:
+                scores, ids = index.search(vector, 1)
+                if ids[0][0] != -1 and scores[0][0] >= self.threshold:
+                    self._entries.move_to_end(int(ids[0][0]))
+                    self.hits += 1
+                    return self._entries[int(ids[0][0])]
+            self.misses += 1
+            return None
+
+    def store(self, question, answer, context, version, vector=None, collections=None):
+        vector = self._embed(question, vector)
+        selection = _selection(collections)
+        with self._lock:
+            self._sync_version(version)
+            index = self._indexes.get(selection)
+            if index is None:
+                index = self._indexes[selection] = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = {
+                "question": question,
+                "answer": answer,
+                "context": context,
+                "collections": selection,
+                "created": time.time(),
+            }
+            overflow = list(self._entries)[:max(0, len(self._entries) - self.max_entries)]
+            self.evictions += len(overflow)
+            self._remove(overflow)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache(embeddings):
+    """Process-wide answer cache shared by every graph invocation and Streamlit session."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache(embeddings)
+    return _cache
@@ -0,0 +1,182 @@
+"""
+Batch question answering for offline runs (e.g. nightly doc-coverage checks).
+
+The distinct questions are embedded once, in one matrix, and those vectors serve every
+step. Questions go through the graph's router and semantic answer cache like interactive
+ones: cached answers are returned as-is and questions routed away from retrieval get
+a direct reply. The rest are searched with a single multi-query FAISS call per
+collection shard (fused with BM25 per question when hybrid search is on); each retrieved
+chunk is fetched once however many questions share it, duplicate questions are answered
+once, and generation fans out with bounded parallelism.
+
+Input is JSONL with a "question" (or "input") field per line; output is JSONL with
+question, answer, sources, route, cache_hit and error per line.
+
+Usage: python -m src.batch questions.jsonl answers.jsonl [--concurrency 8]
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+import faiss
+import numpy as np
+from langchain_core.output_parsers import StrOutputParser
+from src.config import Config
+from src.context_builder import build_context
+from src.graph import (
+    ANSWER_PROMPT, NO_DOCUMENTS, _count_llm_tokens, _fetch_k, _prompt_inputs, _remember_answer,
+    check_cache, ingestion, route,
+)
+from src.metrics import span, trace
+from src.models import get_llm
+from src.reranker import get_reranker
+from src.retrieval import search_many
+from src.shards import select_collections
+
+
+def embed_questions(questions):
+    """One unit-length embedding per question, computed in a single call."""
+    with span("embed_query"):
+        vectors = np.asarray(ingestion.embeddings.embed_documents(questions), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def retrieve_batch(questions, k=None, vectors=None):
+    """
+    Return one list of chunk Documents per question, or None for questions with no shard
+    to search. Questions are grouped by the shards they select, and each group is searched
+    with a single multi-query search per shard. vectors: from embed_questions(questions).
+    """
+    k = k or Config.RETRIEVAL_K
+    if vectors is None:
+        vectors = embed_questions(questions)
+    groups = defaultdict(list)
+    for i, question in enumerate(questions):
+        groups[tuple(select_collections(question) or ())].append(i)
+
+    ranked, owners = [None] * len(questions), {}
+    for selected, rows in groups.items():
+        stores = ingestion.get_vector_stores(list(selected)) or ingestion.get_vector_stores()
+        if not stores:
+            continue
+        group_ranked, group_owners = search_many(stores, [questions[i] for i in rows], vectors[rows], k)
+        for i, ids in zip(rows, group_ranked):
+            ranked[i] = ids
+        owners.update(group_owners)
+
+    # Fetch every distinct chunk once, however many questions retrieved it
+    unique_ids = {doc_id for ids in ranked if ids for doc_id in ids}
+    with span("fetch_chunks"):
+        found = {doc_id: owners[doc_id].docstore.search(doc_id) for doc_id in unique_ids}
+    # Docstores return a message for unknown IDs (e.g. removed since the search)
+    chunks = {doc_id: doc for doc_id, doc in found.items() if not isinstance(doc, str)}
+    trace(f"---BATCH RETRIEVE: {sum(len(ids) for ids in ranked if ids)} chunk references, "
+          f"{len(chunks)} distinct chunks from {len(groups)} shard selections---")
+    return [None if ids is None else [chunks[i] for i in ids if i in chunks] for ids in ranked]
+
+
+def answer_batch(questions, k=None, max_concurrency=None):
+    """
+    Answer questions in bulk; returns one result dict per input question, in order.
+    Each question goes through the graph's router and answer cache first, so only
+    uncached questions routed to retrieval are retrieved, and cached ones skip the LLM.
+    The distinct questions are embedded once, and those vectors serve the router, the
+    cache, the search and the context builder.
+    """
+    unique = list(dict.fromkeys(questions))
+    vectors = embed_questions(unique) if unique else np.empty((0, 0), dtype=np.float32)
+    vector_of = dict(zip(unique, vectors))
+    row_of = {q: i for i, q in enumerate(unique)}
+    states = {q: {"question": q, "collections": []} for q in unique}
+    for question, state in states.items():
+        state.update(route(state, vector_of[question]))
+        if state["route"] == "retrieve":
+            state.update(check_cache(state, vector_of[question]))
+    pending = [q for q, s in states.items() if s["route"] == "retrieve" and not s["cache_hit"]]
+    trace(f"---BATCH: {len(unique)} distinct questions, {len(states) - len(pending)} answered "
+          f"from the cache or without retrieval---")
+
+    retrieved = retrieve_batch(pending, k or _fetch_k(), vectors[[row_of[q] for q in pending]])
+    sources = {}
+    for question, docs in zip(pending, retrieved):
+        if docs is None:
+            states[question]["context"] = NO_DOCUMENTS
+            continue
+        if Config.RERANK_ENABLED:
+            docs = get_reranker().rerank(question, docs, Config.RETRIEVAL_K)
+        if Config.CONTEXT_BUILDER:
+            context, stats = build_context(question, docs, ingestion.chunk_vectors, vector_of.__getitem__,
+                                           diversify=not Config.RERANK_ENABLED)
+            docs = [docs[i] for i in stats["used"]]
+            trace(f"---CONTEXT: {stats['tokens']} tokens ({stats['tokens_saved']} saved by overlap merging)---")
+        else:
+            context = "\n\n".join(d.page_content for d in docs)
+        states[question]["context"] = context
+        sources[question] = list(dict.fromkeys(d.metadata.get("source", "unknown") for d in docs))
+
+    to_generate = [q for q, s in states.items() if not s["cache_hit"]]
+    answers = {q: states[q]["messages"][-1].content for q in unique if states[q]["cache_hit"]}
+    if to_generate:
+        llm = get_llm()
+        if llm is None:
+            raise RuntimeError("Configuration Error: API Key not found.")
+        # Same prompt per route as the generate node: retrieved context, or none for direct replies
+        prompts = {q: _prompt_inputs(states[q]) for q in to_generate}
+        generated = (llm | StrOutputParser()).batch(
+            [prompt.invoke(inputs) for prompt, inputs in prompts.values()],
+            config={"max_concurrency": max_concurrency or Config.LLM_MAX_CONCURRENCY},
+            return_exceptions=True,
+        )
+        for question, answer in zip(to_generate, generated):
+            answers[question] = answer
+            prompt, inputs = prompts[question]
+            if not isinstance(answer, Exception):
+                _count_llm_tokens(prompt, inputs, answer)
+                if prompt is ANSWER_PROMPT:
+                    state = states[question]
+                    _remember_answer(question, answer, state["context"], vector_of[question], state["collections"])
+
+    results = {}
+    for question in unique:
+        answer = answers[question]
+        failed = isinstance(answer, Exception)
+        results[question] = {
+            "question": question,
+            "answer": None if failed else answer,
+            "sources": sources.get(question, []),
+            "route": states[question]["route"],
+            "cache_hit": states[question]["cache_hit"],
+            "error": str(answer) if failed else None,
+        }
+    return [results[q] for q in questions]
+
+
+def run_batch(input_path, output_path, k=None, max_concurrency=None):
+    with open(input_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    questions = [r.get("question") or r["input"] for r in records]
+
+    start = time.perf_counter()
+    results = answer_batch(questions, k, max_concurrency)
+    elapsed = time.perf_counter() - start
+
+    with open(output_path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+    errors = sum(1 for r in results if r["error"])
+    cached = sum(1 for r in results if r["cache_hit"])
+    print(f"Answered {len(results)} questions in {elapsed:.1f}s "
+          f"({len(results) / max(elapsed, 1e-9):.1f} questions/sec, {cached} from the answer cache, "
+          f"{errors} errors) -> {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.k, args.concurrency)
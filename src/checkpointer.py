@@ -0,0 +1,247 @@
+"""
+Persistent, bounded LangGraph checkpointer on SQLite.
+
+Conversation state survives restarts and lives on disk instead of in process memory:
+  - only the newest CHECKPOINT_KEEP_PER_THREAD checkpoints of a thread are kept (each
+    stores the full channel values, so older ones are never needed to resume a thread);
+  - threads idle for longer than CHECKPOINT_THREAD_TTL seconds are deleted, checked at
+    most once per CHECKPOINT_SWEEP_INTERVAL seconds.
+
+Checkpoints are serialized with the graph's JsonPlusSerializer (msgpack), never pickle.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from src.config import Config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT, type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL, type TEXT, value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_threads_last_used ON threads(last_used);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    def __init__(self, path=None, keep_per_thread=None, thread_ttl=None, sweep_interval=None, serde=None):
+        super().__init__(serde=serde)
+        self.path = path or Config.CHECKPOINT_PATH
+        self.keep_per_thread = max(1, keep_per_thread or Config.CHECKPOINT_KEEP_PER_THREAD)
+        self.thread_ttl = Config.CHECKPOINT_THREAD_TTL if thread_ttl is None else thread_ttl
+        self.sweep_interval = Config.CHECKPOINT_SWEEP_INTERVAL if sweep_interval is None else sweep_interval
+        self._last_sweep = float("-inf")
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def _conn(self):
+        """SQLite connection, opened (creating the file) on first use rather than at import."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # durable across crashes of the process
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    # Reads
+
+    def _tuple(self, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+        def config(cid):
+            return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": cid}}
+
+        return CheckpointTuple(
+            config=config(checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=config(parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                found = self._tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(found.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(found)
+        yield from results
+
+    # Writes
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, serialized, metadata_type, serialized_metadata),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time())
+            )
+            self._prune_thread(thread_id, checkpoint_ns)
+            self._sweep_idle_threads()
+            self._conn.commit()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts) overwrite; regular writes are kept once per index
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel,
+             *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        with self._lock:
+            self._conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def _prune_thread(self, thread_id, checkpoint_ns):
+        """Drop all but the newest keep_per_thread checkpoints (and their writes) of a thread."""
+        stale = [r[0] for r in self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_per_thread),
+        )]
+        for table in ("checkpoints", "writes"):
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, checkpoint_id) for checkpoint_id in stale],
+            )
+
+    def _sweep_idle_threads(self):
+        now = time.monotonic()
+        if not self.thread_ttl or now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        idle = [r[0] for r in self._conn.execute(
+            "SELECT thread_id FROM threads WHERE last_used < ?", (time.time() - self.thread_ttl,)
+        )]
+        for thread_id in idle:
+            self._delete_thread(thread_id)
+        if idle:
+            print(f"Checkpointer: evicted {len(idle)} idle threads")
+
+    def _delete_thread(self, thread_id):
+        for table in ("checkpoints", "writes", "threads"):
+            self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            self._delete_thread(thread_id)
+            self._conn.commit()
+
+    def thread_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    # Async variants: SQLite calls run in a worker thread, off the event loop
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for result in results:
+            yield result
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def get_checkpointer():
+    """The graph's checkpointer: SQLite-backed by default, MemorySaver with CHECKPOINT_BACKEND=memory."""
+    if Config.CHECKPOINT_BACKEND == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+    if Config.CHECKPOINT_BACKEND != "sqlite":
+        raise ValueError(f"Unknown CHECKPOINT_BACKEND '{Config.CHECKPOINT_BACKEND}', expected sqlite or memory")
+    return SqliteCheckpointSaver()
@@ -12,10 +12,127 @@ class Config:
     # Model Configuration
     MODEL_NAME = "gemini-2.5-flash"
     EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    # Chunks embedded per model call during ingestion
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+    # Embedding backend: torch (sentence-transformers), onnx (ONNX Runtime) or onnx_int8
+    # (ONNX with int8 dynamic quantization, exported once to ONNX_MODEL_DIR below). All produce
+    # vectors of the same model, so the index format is unchanged.
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) # intra-op threads; 0 = runtime default
+    ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "avx2") # arm64, avx2, avx512 or avx512_vnni
+    
+    # Streaming Ingestion
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "8")) # items buffered between stages
+    INGEST_CHECKPOINT_EVERY = int(os.getenv("INGEST_CHECKPOINT_EVERY", "5000")) # chunks between staged checkpoints
+    # Drop exact and near-duplicate chunks (MinHash/LSH over word shingles) before embedding
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9")) # estimated Jaccard similarity
+    DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128")) # MinHash permutations
+    DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5")) # words per shingle
+
+    # Document Loading Concurrency
+    HTTP_MAX_WORKERS = int(os.getenv("HTTP_MAX_WORKERS", "8"))
+    HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "2"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+    PDF_PARSE_PROCESSES = int(os.getenv("PDF_PARSE_PROCESSES", str(os.cpu_count() or 1)))
+    # Crawler: links are followed up to CRAWL_MAX_DEPTH hops from the start URLs, staying under
+    # their URL prefix; unchanged pages are skipped with conditional GETs (ETag / Last-Modified)
+    CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+    CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500")) # per crawl
     
     # Vector Store Paths
     PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     VECTOR_STORE_PATH = os.path.join(PROJECT_ROOT, "faiss_index")
+    # Seconds between checks for a newly saved index version
+    VECTOR_STORE_RELOAD_INTERVAL = float(os.getenv("VECTOR_STORE_RELOAD_INTERVAL", "2"))
+    # Index versions kept on disk (live one included) so in-flight loads never lose their files
+    VECTOR_STORE_KEEP_VERSIONS = 2
+
+    # Collections: one index shard per library. A source goes to the first collection with a
+    # keyword in its path/URL, anything else (handbooks, uploads) to DEFAULT_COLLECTION, which
+    # lives at VECTOR_STORE_PATH; others at VECTOR_STORE_PATH_<name>. The same keywords in a
+    # question restrict the search to those shards.
+    COLLECTIONS = {
+        "langchain": ("langchain", "langgraph", "langsmith", "stategraph", "runnable"),
+        "llamaindex": ("llamaindex", "llama_index", "llama-index"),
+        "pandas": ("pandas", "dataframe"),
+    }
+    DEFAULT_COLLECTION = "general"
+    
+    # Vector Index Type: flat (exact), ivf_flat, hnsw or ivf_pq (compressed)
+    VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat")
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0")) # 0 = derive from corpus size
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+    HNSW_M = int(os.getenv("HNSW_M", "32"))
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+    PQ_M = int(os.getenv("PQ_M", "48")) # sub-quantizers; must divide the embedding dimension
+    PQ_NBITS = int(os.getenv("PQ_NBITS", "8"))
+    
+    # Embedding Cache (content-addressed, survives re-ingestion)
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.path.join(PROJECT_ROOT, "embedding_cache", "embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+    ONNX_MODEL_DIR = os.path.join(PROJECT_ROOT, "onnx_models") # exported EMBEDDING_BACKEND=onnx_int8 models
+    CRAWL_STATE_PATH = os.path.join(PROJECT_ROOT, "crawl_state", "pages.sqlite") # validators and links per URL
+    
+    # Retrieval
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "4")) # chunks passed to the LLM per question
+    # Hybrid search: BM25 over the same chunks, fused with dense results by reciprocal rank
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+    HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+    HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+    HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20")) # candidates taken from each ranking
+    RRF_K = int(os.getenv("RRF_K", "60")) # rank smoothing constant in 1 / (RRF_K + rank)
+    # Context assembly: overlapping chunks are merged, then MMR-picked into a token budget
+    CONTEXT_BUILDER = os.getenv("CONTEXT_BUILDER", "true").lower() == "true"
+    CONTEXT_FETCH_K = int(os.getenv("CONTEXT_FETCH_K", "8")) # candidate chunks to choose from
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1000"))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7")) # 1 = pure relevance, 0 = pure diversity
+    # Routing: skip retrieval for small talk, off-corpus questions and follow-ups (no LLM call)
+    ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+    ROUTER_HISTORY_TURNS = int(os.getenv("ROUTER_HISTORY_TURNS", "3")) # turns kept per thread
+    ROUTER_FOLLOWUP_MAX_WORDS = int(os.getenv("ROUTER_FOLLOWUP_MAX_WORDS", "12"))
+    ROUTER_MAX_NOVEL_TERMS = int(os.getenv("ROUTER_MAX_NOVEL_TERMS", "1")) # new content words a follow-up may add
+    ROUTER_MIN_CORPUS_SIM = float(os.getenv("ROUTER_MIN_CORPUS_SIM", "0.05")) # 0 disables the off-corpus check
+    HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "200")) # turns older than the window
+    # Reranking: a cross-encoder rescores RERANK_FETCH_K candidates, the best RETRIEVAL_K are kept
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "20"))
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000")) # cached (question, chunk) scores
+    
+    # Serving
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8")) # in-flight Gemini calls per event loop
+    SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+    
+    # Conversation checkpoints: sqlite (persistent, bounded) or memory (in-process MemorySaver)
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+    CHECKPOINT_PATH = os.path.join(PROJECT_ROOT, "checkpoints", "checkpoints.sqlite")
+    CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "3")) # newest checkpoints kept
+    CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", "604800")) # idle seconds; 0 = keep forever
+    CHECKPOINT_SWEEP_INTERVAL = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL", "60")) # seconds between TTL sweeps
+    
+    # Semantic Answer Cache (in front of retrieval + generation)
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")) # cosine similarity
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400")) # seconds
+    
+    # Instrumentation (src.metrics): per-node/stage latency spans and counters
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) # standalone Prometheus endpoint; 0 = off
+    METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", "") # append spans/counters as JSON lines
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0")) # seconds; 0 = off
+    PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "profile.collapsed") # collapsed stacks, written at exit
+    LOG_CHUNK_PREVIEWS = os.getenv("LOG_CHUNK_PREVIEWS", "false").lower() == "true" # print retrieved chunks
+    LOG_QUERY_TRACE = os.getenv("LOG_QUERY_TRACE", "false").lower() == "true" # print per-query node progress
+    
+    # Offline evaluation (src.eval_runner)
+    EVAL_MAX_CONCURRENCY = int(os.getenv("EVAL_MAX_CONCURRENCY", "4")) # examples in flight
+    EVAL_CACHE_PATH = os.path.join(PROJECT_ROOT, "eval_cache", "verdicts.sqlite") # judge verdicts
     
     @staticmethod
     def validate():
@@ -0,0 +1,155 @@
+"""
+Token-budgeted context assembly.
+
+Retrieved chunks overlap by up to chunk_overlap characters with their neighbours, so
+joining them as-is pays for the same text twice. build_context:
+  1. merges chunks from the same source/page whose text overlaps into one passage,
+  2. picks passages by maximal marginal relevance (relevant but not redundant),
+  3. stops adding passages once CONTEXT_TOKEN_BUDGET would be exceeded.
+"""
+import threading
+import numpy as np
+from src.config import Config
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+# Overlap shorter than this is treated as coincidence, not splitter overlap
+MIN_OVERLAP = 32
+
+
+def count_tokens(text):
+    """Token count with tiktoken's cl100k_base; ~4 characters per token if it can't be loaded."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    # The BPE file is downloaded on first use, which fails offline
+                    print(f"tiktoken unavailable ({e.__class__.__name__}); estimating tokens from length.")
+                    _encoding = False
+    if _encoding is False:
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _overlap(left, right):
+    """Length of the longest suffix of left that is a prefix of right (0 if under MIN_OVERLAP)."""
+    if len(left) < MIN_OVERLAP or len(right) < MIN_OVERLAP:
+        return 0
+    probe = right[:MIN_OVERLAP]
+    start = left.find(probe, max(0, len(left) - len(right)))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _merge_pair(a, b):
+    """Merged text of two passages if one contains or overlaps the other, else None."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _overlap(a, b)
+    if n:
+        return a + b[n:]
+    n = _overlap(b, a)
+    if n:
+        return b + a[n:]
+    return None
+
+
+def merge_overlaps(docs):
+    """
+    Merge overlapping chunks of the same source (and page) into passages.
+    Returns [(text, member indexes)] in order of each passage's best-ranked chunk.
+    """
+    passages = [] # [key, text, members]
+    for i, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        current = [key, doc.page_content, [i]]
+        merged = True
+        while merged: # a new chunk can bridge two passages, so keep merging
+            merged = False
+            for passage in passages:
+                if passage[0] != key:
+                    continue
+                text = _merge_pair(passage[1], current[1])
+                if text is not None:
+                    passages.remove(passage)
+                    members = sorted(passage[2] + current[2])
+                    current = [key, text, members]
+                    merged = True
+                    break
+        passages.append(current)
+    passages.sort(key=lambda p: p[2][0])
+    return [(text, members) for _, text, members in passages]
+
+
+def mmr_order(query_vector, vectors, lambda_mult):
+    """Indexes of vectors in maximal-marginal-relevance order (all unit-length rows)."""
+    relevance = vectors @ query_vector
+    similarity = vectors @ vectors.T
+    remaining = list(range(len(vectors)))
+    order = []
+    redundancy = np.full(len(vectors), -np.inf)
+    while remaining:
+        penalty = np.where(np.isfinite(redundancy[remaining]), redundancy[remaining], 0.0)
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * penalty
+        best = remaining.pop(int(np.argmax(scores)))
+        order.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return order
+
+
+def build_context(question, docs, chunk_vectors, embed_query, budget=None, diversify=True):
+    """
+    Assemble the prompt context from ranked chunks.
+    chunk_vectors maps the chunks to unit-length rows (read back from the index during
+    normal runs) and embed_query embeds the question. With diversify=False passages keep
+    the order of their best-ranked chunk (e.g. after reranking) and nothing is embedded.
+    Returns (context, stats).
+    """
+    budget = budget or Config.CONTEXT_TOKEN_BUDGET
+    if not docs:
+        return "", {"chunks": 0, "passages": 0, "tokens": 0, "naive_tokens": 0, "tokens_saved": 0, "used": []}
+
+    passages = merge_overlaps(docs)
+    order = range(len(passages))
+    if diversify:
+        rows = chunk_vectors(docs)
+        # A passage is represented by the mean direction of its chunks
+        vectors = np.vstack([rows[members].mean(axis=0) for _, members in passages])
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        query_vector = np.asarray(embed_query(question), dtype=np.float32)
+        query_vector = query_vector / (np.linalg.norm(query_vector) + 1e-12)
+        order = mmr_order(query_vector, vectors, Config.MMR_LAMBDA)
+
+    selected, used_chunks, tokens = [], [], 0
+    for i in order:
+        text, members = passages[i]
+        cost = count_tokens(text)
+        if selected and tokens + cost > budget:
+            continue # a smaller passage further down may still fit
+        selected.append(text)
+        used_chunks.extend(members)
+        tokens += cost
+
+    context = "\n\n".join(selected)
+    tokens = count_tokens(context)
+    # What the same chunks would have cost joined as-is, overlaps and all
+    naive_tokens = count_tokens("\n\n".join(docs[i].page_content for i in sorted(used_chunks)))
+    stats = {
+        "chunks": len(used_chunks),
+        "passages": len(selected),
+        "tokens": tokens,
+        "naive_tokens": naive_tokens,
+        "tokens_saved": naive_tokens - tokens,
+        "used": sorted(used_chunks), # indexes into docs of the chunks that made it in
+    }
+    return context, stats
@@ -0,0 +1,194 @@
+"""
+Incremental documentation crawler.
+
+Walks doc sites breadth-first from start URLs, following links that stay under a URL
+prefix (by default the directory of each start URL) for up to CRAWL_MAX_DEPTH hops and
+CRAWL_MAX_PAGES pages. At most HTTP_MAX_WORKERS requests are in flight, and at most
+HTTP_PER_HOST_LIMIT per host.
+
+The ETag / Last-Modified validators, content hash and outgoing links of every page are
+stored in CRAWL_STATE_PATH. On the next crawl, a page whose stored content is what the index
+holds is requested with If-None-Match / If-Modified-Since. A 304 skips the page entirely
+(no download, parsing or splitting), and its stored links keep the walk going.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urldefrag, urljoin, urlparse
+from langchain_core.documents import Document
+from src.config import Config
+
+# Links to these are never HTML pages, so they are not followed
+_SKIPPED_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".css", ".js", ".json",
+    ".zip", ".gz", ".tar", ".whl", ".pdf", ".mp4", ".woff", ".woff2", ".ttf",
+)
+
+
+def default_prefix(url):
+    """Directory of a URL: https://host/docs/intro/page.html -> https://host/docs/intro/"""
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    return f"{parsed.scheme}://{parsed.netloc}{path[:path.rfind('/') + 1]}"
+
+
+def _metadata(soup, url):
+    """Same metadata as WebBaseLoader, so crawled and directly loaded pages match."""
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html := soup.find("html"):
+        metadata["language"] = html.get("lang", "No language found.")
+    return metadata
+
+
+class CrawlState:
+    """Per-URL validators, content hash and outgoing links from the last successful fetch."""
+
+    def __init__(self, path=None):
+        self.path = path or Config.CRAWL_STATE_PATH
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT,"
+            " links TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_hash, links = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": content_hash,
+                "links": json.loads(links)}
+
+    def put(self, url, etag, last_modified, content_hash, links):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(links), time.time()),
+            )
+            self._conn.commit()
+
+
+class DocCrawler:
+    """Breadth-first, prefix- and depth-limited crawler with conditional re-fetches."""
+
+    def __init__(self, content_hash, host_limit, state=None, max_depth=None, max_pages=None):
+        # content_hash(docs) must match the hash the ingestion manifest records per source
+        self.content_hash = content_hash
+        self.host_limit = host_limit
+        self.state = state or CrawlState()
+        self.max_depth = Config.CRAWL_MAX_DEPTH if max_depth is None else max_depth
+        self.max_pages = max_pages or Config.CRAWL_MAX_PAGES
+        self.stats = {"pages_fetched": 0, "pages_unchanged": 0, "pages_failed": 0}
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=Config.HTTP_MAX_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = os.getenv("USER_AGENT", "devdocs-navigator")
+            self._session = session
+        return self._session
+
+    def fetch(self, url, known=None):
+        """
+        GET one page, conditionally if `known` (its stored state) is given.
+        Returns (docs, links): docs is None if the page is unchanged (304) and empty if it
+        is not HTML.
+        """
+        from bs4 import BeautifulSoup
+
+        headers = {}
+        if known and known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known and known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+        with self.host_limit(url):
+            response = self.session.get(url, headers=headers, timeout=Config.HTTP_TIMEOUT)
+        if response.status_code == 304 and known:
+            return None, known["links"]
+        response.raise_for_status()
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            return [], []
+
+        response.encoding = response.apparent_encoding # as WebBaseLoader does
+        soup = BeautifulSoup(response.text, "html.parser")
+        links = sorted({
+            urldefrag(urljoin(response.url, a["href"]))[0] for a in soup.find_all("a", href=True)
+        })
+        docs = [Document(page_content=soup.get_text(), metadata=_metadata(soup, url))]
+        self.state.put(url, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                       self.content_hash(docs), links)
+        return docs, links
+
+    def crawl(self, start_urls, prefixes=None, indexed=None):
+        """
+        Yield (url, docs) for every page reached, level by level; docs is None for pages
+        skipped as unchanged. indexed maps url -> content hash in the index: only pages
+        whose stored content is what is indexed are fetched conditionally, so a page fetched
+        but never indexed (e.g. an interrupted run) is downloaded again.
+        """
+        indexed = indexed or {}
+        prefixes = tuple(prefixes or {default_prefix(url) for url in start_urls})
+
+        def in_scope(url):
+            return (url.startswith(prefixes)
+                    and not urlparse(url).path.lower().endswith(_SKIPPED_EXTENSIONS))
+
+        def fetch(url):
+            known = self.state.get(url)
+            if known and indexed.get(url) != known["content_hash"]:
+                known = None
+            return self.fetch(url, known)
+
+        frontier = list(dict.fromkeys(urldefrag(url)[0] for url in start_urls))
+        visited = set(frontier)
+        budget = self.max_pages
+        with ThreadPoolExecutor(max_workers=Config.HTTP_MAX_WORKERS) as pool:
+            for _ in range(self.max_depth + 1):
+                frontier = frontier[:budget]
+                budget -= len(frontier)
+                futures = {pool.submit(fetch, url): url for url in frontier}
+                next_level = []
+                for future in as_completed(futures):
+                    url = futures[future]
+                    try:
+                        docs, links = future.result()
+                    except Exception as e:
+                        self.stats["pages_failed"] += 1
+                        print(f"Error crawling {url}: {e}")
+                        continue
+                    if docs is None:
+                        self.stats["pages_unchanged"] += 1
+                        yield url, None
+                    elif docs:
+                        self.stats["pages_fetched"] += 1
+                        yield url, docs
+                    for link in links:
+                        if link not in visited and in_scope(link):
+                            visited.add(link)
+                            next_level.append(link)
+                frontier = sorted(next_level)
+                if not frontier or budget <= 0:
+                    break
+
+        print(f"Crawl: {self.stats['pages_fetched']} pages fetched, {self.stats['pages_unchanged']} "
+              f"unchanged (304), {self.stats['pages_failed']} failed")
@@ -0,0 +1,128 @@
+"""
+Exact and near-duplicate chunk detection, run between splitting and embedding.
+
+Documentation crawls repeat a lot of text: navigation and footers, license blurbs, the
+same page under several versions or URLs. A chunk is dropped before it is embedded when,
+compared with the chunks its collection already indexes and those kept earlier in the
+run, it is
+  - an exact duplicate: same SHA-256 of its whitespace-normalized, lowercased text;
+  - a near duplicate: the Jaccard similarity of its word shingles to a kept chunk,
+    estimated from MinHash signatures, is at least DEDUP_THRESHOLD. Candidates are found
+    with LSH banding, so each chunk is only compared with a handful of others.
+"""
+import hashlib
+import re
+import zlib
+import numpy as np
+from src.config import Config
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _lsh_params(num_perm, threshold, recall=0.99):
+    """
+    (bands, rows per band) with bands * rows = num_perm. Uses the most rows per band (the
+    fewest candidates to verify) that still makes a pair at the threshold a candidate
+    with probability >= recall.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if num_perm % rows == 0 and 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class ChunkDeduplicator:
+    """Remembers the chunks kept so far and classifies new ones as exact/near duplicates."""
+
+    def __init__(self, threshold=None, num_perm=None, shingle_size=None, seed=1):
+        self.threshold = Config.DEDUP_THRESHOLD if threshold is None else threshold
+        self.num_perm = num_perm or Config.DEDUP_NUM_PERM
+        self.shingle_size = shingle_size or Config.DEDUP_SHINGLE_SIZE
+        self.bands, self.rows = _lsh_params(self.num_perm, self.threshold)
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._hashes = {} # digest -> key of the kept chunk
+        self._signatures = []
+        self._keys = [] # key of the kept chunk per signature, None once discarded
+        self._registered = {} # key -> (digest, signature index or None)
+        self._buckets = [{} for _ in range(self.bands)] # band -> {band bytes: [signature index]}
+        self.stats = {"kept": 0, "exact": 0, "near": 0}
+
+    def _signature(self, normalized):
+        words = _WORD.findall(normalized)
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        values = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # Universal hashing (a * x + b) mod p per permutation; the minimum over shingles
+        permuted = (np.outer(values, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _register(self, digest, signature, key):
+        self._hashes[digest] = key
+        self._registered[key] = (digest, None if signature is None else len(self._signatures))
+        if signature is None:
+            return
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        self._keys.append(key)
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(index)
+
+    def add(self, text, key=None):
+        """Remember a chunk that is kept regardless (e.g. already indexed) under key."""
+        normalized = _normalize(text)
+        digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+        if digest not in self._hashes:
+            self._register(digest, self._signature(normalized) if normalized else None, key)
+
+    def discard(self, keys):
+        """Forget kept chunks (e.g. about to be deleted), so they no longer count as originals."""
+        for key in keys:
+            digest, index = self._registered.pop(key, (None, None))
+            if digest is not None and self._hashes.get(digest) == key:
+                del self._hashes[digest]
+            if index is not None:
+                self._keys[index] = None
+
+    def check(self, text, key=None):
+        """
+        Return ("exact" or "near", key of the kept chunk) if text duplicates a chunk seen
+        before, else None. Chunks that are not duplicates are remembered under key.
+        """
+        normalized = _normalize(text)
+        digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+        if digest in self._hashes:
+            self.stats["exact"] += 1
+            return "exact", self._hashes[digest]
+
+        signature = self._signature(normalized) if normalized else None
+        if signature is not None:
+            candidates = set()
+            for bucket, band in zip(self._buckets, self._band_keys(signature)):
+                candidates.update(bucket.get(band, ()))
+            for index in candidates:
+                if self._keys[index] is None:
+                    continue
+                if np.mean(self._signatures[index] == signature) >= self.threshold:
+                    self.stats["near"] += 1
+                    return "near", self._keys[index]
+
+        self._register(digest, signature, key)
+        self.stats["kept"] += 1
+        return None
+
@@ -0,0 +1,142 @@
+"""
+Pickle-free on-disk format for an index version:
+
+    index.faiss       FAISS index, memory-mapped read-only when serving
+    docstore.sqlite   chunks(row, id, text, metadata JSON), fetched only for hit rows
+
+Serving processes therefore share the OS page cache for vectors and chunk text, load in
+near-constant time whatever the corpus size, and never unpickle anything.
+"""
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+import faiss
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+
+# Tried in order: mmap of flat/HNSW storage, mmap of IVF lists, plain read
+_MMAP_FLAGS = [
+    faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY,
+    faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+]
+
+
+def write_index_files(vectorstore, path):
+    """Write a FAISS store's index and chunks into a (new, empty) version directory."""
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(vectorstore.index, os.path.join(path, INDEX_FILE))
+
+    def rows():
+        for row, chunk_id in sorted(vectorstore.index_to_docstore_id.items()):
+            doc = vectorstore.docstore.search(chunk_id)
+            yield row, chunk_id, doc.page_content, json.dumps(doc.metadata, default=str)
+
+    conn = sqlite3.connect(os.path.join(path, DOCSTORE_FILE))
+    try:
+        conn.execute(
+            "CREATE TABLE chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def read_index(path, mmap=True):
+    """Read index.faiss, memory-mapped read-only if possible."""
+    index_file = os.path.join(path, INDEX_FILE)
+    if mmap:
+        for flags in _MMAP_FLAGS:
+            try:
+                return faiss.read_index(index_file, flags)
+            except RuntimeError:
+                continue
+    return faiss.read_index(index_file)
+
+
+def read_all_chunks(path):
+    """Load every chunk into an InMemoryDocstore and row -> id dict (for writers)."""
+    conn = sqlite3.connect(os.path.join(path, DOCSTORE_FILE))
+    try:
+        docs, index_to_id = {}, {}
+        for row, chunk_id, text, metadata in conn.execute("SELECT row, id, text, metadata FROM chunks"):
+            docs[chunk_id] = Document(id=chunk_id, page_content=text, metadata=json.loads(metadata))
+            index_to_id[row] = chunk_id
+    finally:
+        conn.close()
+    return InMemoryDocstore(docs), index_to_id
+
+
+class SqliteDocstore(Docstore):
+    """
+    Read-only docstore over docstore.sqlite. The connection is opened eagerly and shared
+    by all threads, so the store keeps working even if its version directory is deleted
+    while it is still being served.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.join(path, DOCSTORE_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def search(self, search):
+        found = self._query("SELECT text, metadata FROM chunks WHERE id = ?", (search,))
+        if not found:
+            return f"ID {search} not found." # same contract as InMemoryDocstore
+        text, metadata = found[0]
+        return Document(id=search, page_content=text, metadata=json.loads(metadata))
+
+    def row_id(self, row):
+        found = self._query("SELECT id FROM chunks WHERE row = ?", (row,))
+        if not found:
+            raise KeyError(row)
+        return found[0][0]
+
+    def rows_of(self, ids):
+        """{chunk id: FAISS row} for the given IDs that are in the store."""
+        rows = {}
+        for i in range(0, len(ids), 500): # stay under SQLite's bound-parameter limit
+            chunk = list(ids[i:i + 500])
+            rows.update(self._query(
+                f"SELECT id, row FROM chunks WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return rows
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM chunks")[0][0]
+
+    def all_ids(self):
+        return [r[0] for r in self._query("SELECT id FROM chunks ORDER BY row")]
+
+
+class SqliteRowMap(Mapping):
+    """Lazy FAISS row -> chunk id mapping, read from the docstore only for the rows asked for."""
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, row):
+        return self.docstore.row_id(int(row))
+
+    def __len__(self):
+        return self.docstore.count()
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def values(self):
+        return self.docstore.all_ids()
+
+    def rows_of(self, ids):
+        return self.docstore.rows_of(ids)
@@ -0,0 +1,107 @@
+"""
+Embedding backend benchmark: CPU throughput and retrieval quality per EMBEDDING_BACKEND.
+
+Embeds the chunks of a corpus (data/ by default) with each backend and reports:
+  - model load time and sentences/sec (timed after a warm-up batch)
+  - agreement with the first (baseline) backend: mean cosine similarity of the chunk
+    vectors, and recall@k of each backend's exact nearest neighbours against the
+    baseline's for the evaluation questions plus a sample of chunks used as queries
+  - gold-passage recall@k and MRR on the evaluation questions (as in src.retrieval_benchmark)
+
+Usage: python -m src.embedding_benchmark [--backends torch,onnx,onnx_int8] [--corpus data docs/]
+                                         [--threads 4] [--queries 200] [--k 4]
+"""
+import argparse
+import os
+import time
+import faiss
+import numpy as np
+from src.config import Config
+from src.models import EMBEDDING_BACKENDS, get_embeddings
+from src.retrieval_benchmark import _csv, _split, gold_labels, load_corpus, score_ranking
+
+
+def _embed(embeddings, texts, batch_size):
+    vectors = np.vstack([
+        np.asarray(embeddings.embed_documents(texts[i:i + batch_size]), dtype=np.float32)
+        for i in range(0, len(texts), batch_size)
+    ])
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def run_benchmark(backends, texts, queries, labeled, k=4, batch_size=None):
+    """Return one result dict per backend; the first backend is the baseline."""
+    batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+    results, baseline = [], None
+    for backend in backends:
+        embeddings = get_embeddings(backend)
+        start = time.perf_counter()
+        embeddings.embed_documents(texts[:batch_size]) # loads (and for onnx_int8, exports) the model
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vectors = _embed(embeddings, texts, batch_size)
+        seconds = time.perf_counter() - start
+        query_vectors = _embed(embeddings, queries, batch_size)
+
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        _, neighbours = index.search(query_vectors, k)
+        gold = [score_ranking(list(neighbours[i]), chunks, k) for i, (_, chunks) in enumerate(labeled)]
+
+        result = {
+            "backend": backend,
+            "load_s": load_seconds,
+            "sentences_per_s": len(texts) / max(seconds, 1e-9),
+            f"gold_recall@{k}": float(np.mean([g[0] for g in gold])) if gold else float("nan"),
+            "gold_mrr": float(np.mean([g[1] for g in gold])) if gold else float("nan"),
+        }
+        if baseline is None:
+            baseline = {"vectors": vectors, "neighbours": neighbours, "rate": result["sentences_per_s"]}
+        result["speedup"] = result["sentences_per_s"] / baseline["rate"]
+        result["cosine_vs_base"] = float(np.mean(np.sum(vectors * baseline["vectors"], axis=1)))
+        result[f"nn_recall@{k}"] = float(np.mean([
+            len(set(found) & set(truth)) / k for found, truth in zip(neighbours, baseline["neighbours"])
+        ]))
+        results.append(result)
+    return results
+
+
+def print_report(results, k):
+    print(f"{'backend':<10} {'load s':>7} {'sent/s':>9} {'speedup':>8} {'cos vs base':>12} "
+          f"{'nn recall@' + str(k):>12} {'gold recall@' + str(k):>14} {'gold MRR':>9}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['load_s']:>7.2f} {r['sentences_per_s']:>9.1f} {r['speedup']:>7.2f}x "
+              f"{r['cosine_vs_base']:>12.4f} {r[f'nn_recall@{k}']:>12.3f} "
+              f"{r[f'gold_recall@{k}']:>14.3f} {r['gold_mrr']:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", type=_csv, default=list(EMBEDDING_BACKENDS),
+                        help="Comma-separated; the first one is the baseline")
+    parser.add_argument("--corpus", nargs="+", default=[os.path.join(Config.PROJECT_ROOT, "data")])
+    parser.add_argument("--threads", type=int, default=None, help="Intra-op threads (default: EMBEDDING_THREADS)")
+    parser.add_argument("--queries", type=int, default=200, help="Chunks sampled as extra neighbour queries")
+    parser.add_argument("--k", type=int, default=Config.RETRIEVAL_K)
+    args = parser.parse_args()
+    if args.threads is not None:
+        Config.EMBEDDING_THREADS = args.threads
+
+    from src.ingestion import IngestionEngine
+    from src.manage_dataset import examples
+
+    docs = load_corpus(IngestionEngine(), args.corpus)
+    if not docs:
+        raise SystemExit("No documents found in the corpus.")
+    chunks = _split(docs, 1000, 0.2) # the ingestion splitter's settings
+    texts = [c.page_content for c in chunks]
+    labeled = gold_labels(examples, chunks)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(texts), size=min(args.queries, len(texts)), replace=False)
+    queries = [question for question, _ in labeled] + [texts[i] for i in sample]
+
+    print(f"{len(texts)} chunks, {len(queries)} queries ({len(labeled)} with gold passages)")
+    results = run_benchmark(args.backends, texts, queries, labeled, args.k)
+    print_report(results, args.k)
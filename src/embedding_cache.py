@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from src.config import Config
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (embedding model, backend, quantization, sha256 of
+    chunk text), since torch, ONNX and int8 ONNX vectors of the same model differ slightly.
+    Least recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(self, path=None, model_name=None, backend=None, quantization=None, max_entries=None):
+        self.path = path or Config.EMBEDDING_CACHE_PATH
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.backend = backend or Config.EMBEDDING_BACKEND
+        # Only the int8 backend is quantized, with the instruction set it was exported for
+        self.quantization = quantization or (
+            f"int8-{Config.ONNX_QUANTIZATION}" if self.backend == "onnx_int8" else "fp32"
+        )
+        self.max_entries = max_entries or Config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    @property
+    def _conn(self):
+        """SQLite connection, opened (and the file created) on first use, not at construction."""
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)"
+            )
+            conn.commit()
+            self._db = conn
+        return self._db
+
+    def _key(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{self.backend}:{self.quantization}:{digest}"
+
+    def lookup(self, texts):
+        """Return a list aligned with texts holding cached vectors or None."""
+        keys = [self._key(t) for t in texts]
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i+500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+
+        hits = sum(1 for k in keys if k in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return [
+            np.frombuffer(found[k], dtype=np.float32) if k in found else None
+            for k in keys
+        ]
+
+    def store(self, texts, vectors):
+        """Insert freshly computed vectors and evict the oldest entries if over budget."""
+        now = time.time()
+        rows = [
+            (self._key(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,252 @@
+"""
+Local evaluation runner: LLM-as-a-judge without LangSmith.
+
+Runs the RAG graph over the ground-truth examples (src/manage_dataset.py, or a JSONL file
+with "question"/"answer" fields per line) with up to EVAL_MAX_CONCURRENCY examples in
+flight, grading each answer for correctness and faithfulness with both judge calls made
+concurrently. Verdicts are cached on disk keyed by (judge model, evaluator, question,
+answer, context, reference), so re-runs only pay the judge for answers that changed.
+
+--stub-judge (and --stub-llm for generation) run fully offline, e.g. in CI.
+
+Usage: python -m src.eval_runner [--examples qa.jsonl] [--output results.jsonl]
+                                 [--concurrency 4] [--stub-judge] [--stub-llm 0.5]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from langchain_core.messages import HumanMessage
+from src.config import Config
+
+CORRECTNESS_PROMPT = """You are a strict technical document grader.
+
+Question: {question}
+Ground Truth Answer: {reference}
+Student Answer: {answer}
+
+Evaluate the Student Answer based on the Ground Truth.
+
+Steps:
+1. Identify key facts in the Ground Truth.
+2. Check if the Student Answer contains these facts.
+3. Check if the Student Answer contains hallucinations or info not in Ground Truth (if strict).
+4. Provide a reasoning for the score.
+
+Score 1.0 if the answer is fully correct and complete.
+Score 0.5 if key facts are missing but the answer is partially correct.
+Score 0.0 if the answer is wrong or irrelevant.
+
+Output strictly in this format:
+Score: [0.0 - 1.0]
+Reason: [Concise explanation]
+"""
+
+FAITHFULNESS_PROMPT = """You are a faithfulness checker.
+
+Context: {context}
+Answer: {answer}
+
+Is the Answer fully supported by the Context?
+If the answer says "I don't know", score it 1.0 (it is faithful to its lack of knowledge).
+If the answer mentions facts not in context, score 0.0.
+
+Output strictly:
+Score: [0.0 or 1.0]
+Reason: [Explanation]
+"""
+
+
+def parse_verdict(response):
+    """Return (score, reason) from a judge response in the "Score: / Reason:" format."""
+    score_match = re.search(r"Score:\s*([0-9.]+)", response)
+    reason_match = re.search(r"Reason:\s*(.+)", response, re.DOTALL)
+    try:
+        score = float(score_match.group(1)) if score_match else 0.0
+    except ValueError:
+        score = 0.0
+    return score, reason_match.group(1).strip() if reason_match else response
+
+
+class VerdictCache:
+    """On-disk judge verdicts keyed by the judge model and everything the verdict depends on."""
+
+    def __init__(self, path=None):
+        self.path = path or Config.EVAL_CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, score REAL NOT NULL, comment TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(judge_model, evaluator, question, answer, context, reference):
+        payload = json.dumps([judge_model, evaluator, question, answer, context, reference])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT score, comment FROM verdicts WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row
+
+    def put(self, key, score, comment):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, score, comment, created) VALUES (?, ?, ?, ?)",
+                (key, score, comment, time.time()),
+            )
+            self._conn.commit()
+
+
+def judge_name(judge):
+    return getattr(judge, "model", None) or judge._llm_type
+
+
+def load_examples(path=None):
+    """Ground-truth examples as [{"question", "answer"}], from a JSONL file or manage_dataset."""
+    if path:
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        from src.manage_dataset import examples as records
+    return [
+        {"question": r.get("question") or r["input"], "answer": r.get("answer") or r.get("output", "")}
+        for r in records
+    ]
+
+
+class EvaluationRunner:
+    def __init__(self, judge, cache=None, max_concurrency=None):
+        from src.graph import app as rag_app
+        self.rag_app = rag_app
+        self.judge = judge
+        self.judge_model = judge_name(judge)
+        self.cache = cache or VerdictCache()
+        self.max_concurrency = max_concurrency or Config.EVAL_MAX_CONCURRENCY
+        self.run_id = uuid.uuid4().hex[:8]
+
+    async def _target(self, index, question):
+        # A fresh thread per example, so concurrent examples never share history
+        thread_id = f"eval-{self.run_id}-{index}"
+        result = await self.rag_app.ainvoke(
+            {"question": question, "messages": [HumanMessage(content=question)]},
+            config={"configurable": {"thread_id": thread_id}},
+        )
+        await self.rag_app.checkpointer.adelete_thread(thread_id)
+        return result["messages"][-1].content, result.get("context", "")
+
+    async def _grade(self, evaluator, prompt, question, answer, context, reference):
+        key = self.cache.key(self.judge_model, evaluator, question, answer, context, reference)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return {"key": evaluator, "score": cached[0], "comment": cached[1], "cached": True}
+        try:
+            response = (await self.judge.ainvoke([HumanMessage(content=prompt)])).content
+        except Exception as e:
+            # Not cached, so the next run retries it
+            return {"key": evaluator, "score": 0.0, "comment": f"Error resolving grade: {e}", "cached": False}
+        score, reason = parse_verdict(response)
+        self.cache.put(key, score, reason)
+        return {"key": evaluator, "score": score, "comment": reason, "cached": False}
+
+    async def _faithfulness(self, question, answer, context):
+        if not context:
+            return {"key": "faithfulness", "score": 0.0, "comment": "No context provided.", "cached": False}
+        prompt = FAITHFULNESS_PROMPT.format(context=context, answer=answer)
+        return await self._grade("faithfulness", prompt, question, answer, context, None)
+
+    async def _evaluate(self, index, example, semaphore):
+        question, reference = example["question"], example["answer"]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                answer, context = await self._target(index, question)
+            except Exception as e:
+                return {"question": question, "error": str(e), "scores": {}}
+            latency = time.perf_counter() - start
+            prompt = CORRECTNESS_PROMPT.format(question=question, reference=reference, answer=answer)
+            verdicts = await asyncio.gather(
+                self._grade("correctness", prompt, question, answer, context, reference),
+                self._faithfulness(question, answer, context),
+            )
+        return {
+            "question": question,
+            "answer": answer,
+            "reference": reference,
+            "latency_s": latency,
+            "scores": {v["key"]: v["score"] for v in verdicts},
+            "verdicts": verdicts,
+            "error": None,
+        }
+
+    async def arun(self, examples):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        return await asyncio.gather(*(self._evaluate(i, e, semaphore) for i, e in enumerate(examples)))
+
+    def run(self, examples):
+        """Evaluate every example; returns one result dict per example, in order."""
+        start = time.perf_counter()
+        results = asyncio.run(self.arun(examples))
+        elapsed = time.perf_counter() - start
+
+        graded = [r for r in results if not r["error"]]
+        means = {
+            key: sum(r["scores"][key] for r in graded) / len(graded)
+            for key in ("correctness", "faithfulness")
+        } if graded else {}
+        judged = self.cache.hits + self.cache.misses
+        print(f"Evaluated {len(results)} examples in {elapsed:.1f}s "
+              f"(concurrency {self.max_concurrency}, {len(results) - len(graded)} errors)")
+        print("Mean scores: " + ", ".join(f"{k} {v:.2f}" for k, v in means.items()))
+        print(f"Judge cache: {self.cache.hits}/{judged} verdicts reused, "
+              f"{self.cache.misses} judge calls ({self.judge_model})")
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", default=None, help="JSONL ground truth (default: src/manage_dataset.py)")
+    parser.add_argument("--output", default=None, help="Write per-example results as JSONL")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--cache", default=None, help="Verdict cache path (default: Config.EVAL_CACHE_PATH)")
+    parser.add_argument("--stub-judge", action="store_true", help="Grade with an offline stub judge")
+    parser.add_argument("--stub-llm", type=float, default=None, metavar="LATENCY",
+                        help="Answer with an offline stub LLM of this latency in seconds")
+    args = parser.parse_args()
+
+    from src.models import StubChatModel, get_llm, set_llm
+    if args.stub_judge:
+        judge = StubChatModel(latency=0.0, response="Score: 1.0\nReason: Stub verdict.")
+    else:
+        judge = get_llm()
+        if judge is None:
+            raise SystemExit("No judge LLM: set GOOGLE_API_KEY or pass --stub-judge.")
+    if args.stub_llm is not None:
+        set_llm(StubChatModel(latency=args.stub_llm))
+
+    runner = EvaluationRunner(judge, VerdictCache(args.cache), args.concurrency)
+    results = runner.run(load_examples(args.examples))
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"Results written to {args.output}")
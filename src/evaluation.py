@@ -1,9 +1,11 @@
+import uuid
 from langsmith import Client
 from langsmith.evaluation import evaluate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from src.config import Config
+from src.eval_runner import CORRECTNESS_PROMPT, FAITHFULNESS_PROMPT, parse_verdict
 from src.graph import app as rag_app
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
 
 # Initialize LangSmith Client
 client = Client()
@@ -20,11 +22,13 @@ def target(inputs: dict) -> dict:
     Wrapper around RAG app to adapt inputs/outputs for LangSmith evaluation.
     """
     query = inputs["question"]
-    # Invoke the RAG pipeline
+    # A fresh thread per example, so no history from earlier questions or runs leaks in
+    thread_id = f"eval-{uuid.uuid4().hex}"
     result = rag_app.invoke(
         {"question": query, "messages": [HumanMessage(content=query)]},
-        config={"configurable": {"thread_id": "eval_thread"}}
+        config={"configurable": {"thread_id": thread_id}}
     )
+    rag_app.checkpointer.delete_thread(thread_id)
     # Extract the final answer from the last message
     answer = result["messages"][-1].content
     # Return dictionary matching the expected output schema for evaluators
@@ -34,45 +38,13 @@ def correctness_evaluator(run, example) -> dict:
     """
     Custom evaluator that checks correctness of the answer vs the ground truth.
     """
-    prediction = run.outputs["output"]
-    reference = example.outputs["answer"]
-    question = example.inputs["question"]
-
-    # Chain-of-Thought Prompt for Correctness
-    prompt = f"""You are a strict technical document grader.
-    
-    Question: {question}
-    Ground Truth Answer: {reference}
-    Student Answer: {prediction}
-    
-    Evaluate the Student Answer based on the Ground Truth.
-    
-    Steps:
-    1. Identify key facts in the Ground Truth.
-    2. Check if the Student Answer contains these facts.
-    3. Check if the Student Answer contains hallucinations or info not in Ground Truth (if strict).
-    4. Provide a reasoning for the score.
-    
-    Score 1.0 if the answer is fully correct and complete.
-    Score 0.5 if key facts are missing but the answer is partially correct.
-    Score 0.0 if the answer is wrong or irrelevant.
-    
-    Output strictly in this format:
-    Score: [0.0 - 1.0]
-    Reason: [Concise explanation]
-    """
-    
+    prompt = CORRECTNESS_PROMPT.format(
+        question=example.inputs["question"],
+        reference=example.outputs["answer"],
+        answer=run.outputs["output"],
+    )
     try:
-        response = eval_llm.invoke([HumanMessage(content=prompt)]).content
-        
-        import re
-        score_match = re.search(r"Score:\s*([0-9.]+)", response)
-        score = float(score_match.group(1)) if score_match else 0.0
-        
-        # Extract Reason
-        reason_match = re.search(r"Reason:\s*(.+)", response, re.DOTALL)
-        reason = reason_match.group(1).strip() if reason_match else response
-        
+        score, reason = parse_verdict(eval_llm.invoke([HumanMessage(content=prompt)]).content)
         return {"key": "correctness", "score": score, "comment": reason}
     except Exception as e:
         return {"key": "correctness", "score": 0.0, "comment": f"Error resolving grade: {e}"}
@@ -81,33 +53,14 @@ def faithfulness_evaluator(run, example) -> dict:
     """
     Check if the answer is grounded in the provided context (avoiding hallucinations).
     """
-    prediction = run.outputs["output"]
     context = run.outputs["context"]
-    
     if not context:
         return {"key": "faithfulness", "score": 0.0, "comment": "No context provided."}
-        
-    prompt = f"""You are a faithfulness checker.
-    
-    Context: {context}
-    Answer: {prediction}
-    
-    Is the Answer fully supported by the Context?
-    If the answer says "I don't know", score it 1.0 (it is faithful to its lack of knowledge).
-    If the answer mentions facts not in context, score 0.0.
-    
-    Output strictly:
-    Score: [0.0 or 1.0]
-    Reason: [Explanation]
-    """
-    
+
+    prompt = FAITHFULNESS_PROMPT.format(context=context, answer=run.outputs["output"])
     try:
         response = eval_llm.invoke([HumanMessage(content=prompt)]).content
-        
-        import re
-        score_match = re.search(r"Score:\s*([0-9.]+)", response)
-        score = float(score_match.group(1)) if score_match else 0.0
-        
+        score, _ = parse_verdict(response)
         return {"key": "faithfulness", "score": score, "comment": response}
     except:
         return {"key": "faithfulness", "score": 0.0, "comment": "Error parsing faithfulness"}
@@ -1,108 +1,413 @@
+import asyncio
+import time
+import weakref
 from typing import Annotated, Sequence, TypedDict, Literal
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langchain_core.messages import AIMessageChunk, BaseMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 
-from src.ingestion import IngestionEngine
+from src.answer_cache import get_answer_cache
+from src.checkpointer import get_checkpointer
 from src.config import Config
+from src.context_builder import build_context, count_tokens
+from src.ingestion import IngestionEngine
+from src.metrics import enabled as metrics_enabled, inc, observe, span, timed, trace
+from src.models import get_llm
+from src.reranker import get_reranker
+from src.retrieval import retrieve_documents
+from src.router import get_router
+from src.shards import select_collections
+
+def _keep_recent_turns(history, new):
+    """Reducer: append this turn's (question, answer) and keep the last ROUTER_HISTORY_TURNS."""
+    return ((history or []) + new)[-Config.ROUTER_HISTORY_TURNS:]
+
+def _compact_summary(summary, turns):
+    """
+    Fold turns leaving the history window into a short extractive summary (question plus
+    the first sentence of its answer), dropping the oldest lines beyond HISTORY_SUMMARY_MAX_TOKENS.
+    """
+    lines = [line for line in (summary or "").split("\n") if line]
+    for turn in turns:
+        first_sentence = turn["answer"].strip().split("\n")[0].split(". ")[0][:200]
+        lines.append(f"- {turn['question'].strip()[:200]} -> {first_sentence}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > Config.HISTORY_SUMMARY_MAX_TOKENS:
+        lines.pop(0)
+    return "\n".join(lines)
 
 # Define State
 class AgentState(TypedDict):
     messages: Sequence[BaseMessage]
     context: str
     question: str
+    cache_hit: bool
+    documents: list # candidate chunks handed from retrieve to rerank
+    route: str # "retrieve", "history" or "direct", set by the router
+    history: Annotated[list, _keep_recent_turns] # recent turns of this thread
+    summary: str # compacted summary of the turns that left the history window
+    collections: list # optional input: search only these collection shards
+
+# Initialize Ingestion for Retrieval (cheap: the embedding model loads on first query)
+ingestion = IngestionEngine()
+
+NO_DOCUMENTS = "No documents found. Please run ingestion first."
+
+def _index_version():
+    """Version of the shards currently served, or None if there is no knowledge base."""
+    return ingestion.index_version()
+
+def route(state: AgentState, query_vector=None):
+    """
+    Decide without an LLM call whether this turn needs retrieval. Follow-ups reuse the
+    context retrieved for the previous turn, which the checkpointer kept in the state.
+    cache_hit is checkpointed too, so the previous turn's value is cleared here.
+    query_vector: the question's embedding, if the caller already has it (batch runs).
+    """
+    if not Config.ROUTER_ENABLED:
+        return {"route": "retrieve", "cache_hit": False}
+    decision = get_router(ingestion.embeddings).route(
+        state["question"], state.get("history"), state.get("context"),
+        list(ingestion.get_vector_stores().values()), _index_version(), query_vector,
+    )
+    inc(f"route_{decision}")
+    if decision == "direct":
+        return {"route": decision, "context": "", "cache_hit": False}
+    return {"route": decision, "cache_hit": False}
 
-# Initialize Model
-# Helper to get LLM
-def get_llm():
-    if not Config.GOOGLE_API_KEY:
-        return None
-    return ChatGoogleGenerativeAI(
-        model=Config.MODEL_NAME,
-        google_api_key=Config.GOOGLE_API_KEY,
-        temperature=0
+async def aroute(state: AgentState):
+    """Async route: the off-corpus check embeds the question, so it runs in a worker thread."""
+    return await asyncio.to_thread(route, state)
+
+def route_question(state: AgentState) -> Literal["check_cache", "generate"]:
+    """Only questions routed to retrieval go through the answer cache and retrieval."""
+    return "check_cache" if state.get("route", "retrieve") == "retrieve" else "generate"
+
+def check_cache(state: AgentState, query_vector=None):
+    """
+    Answer from the semantic cache if a similar question was already answered
+    from the current index version.
+    """
+    version = _index_version()
+    if not Config.ANSWER_CACHE_ENABLED or version is None:
+        return {"cache_hit": False}
+
+    entry = get_answer_cache(ingestion.embeddings).lookup(
+        state["question"], version, query_vector, state.get("collections")
     )
+    if entry is None:
+        inc("answer_cache_misses")
+        return {"cache_hit": False}
+    inc("answer_cache_hits")
+    trace("---CACHE HIT---")
+    return {
+        "cache_hit": True,
+        "context": entry["context"],
+        "messages": [AIMessage(content=entry["answer"])],
+        **_turn_update(state, entry["answer"]),
+    }
 
-# Initialize Ingestion for Retrieval
-ingestion = IngestionEngine()
+def route_after_cache(state: AgentState) -> Literal["retrieve", "__end__"]:
+    return END if state.get("cache_hit") else "retrieve"
 
 def retrieve(state: AgentState):
     """
     Retrieve documents relevant to the question.
     """
-    print("---RETRIEVE---")
+    trace("---RETRIEVE---")
     question = state["question"]
-    
-    vectorstore = ingestion.load_vector_store()
-    if not vectorstore:
-        return {"context": "No documents found. Please run ingestion first."}
-        
-    retriever = vectorstore.as_retriever()
-    docs = retriever.invoke(question)
-    
-    print(f"---DEBUG: Retrieved {len(docs)} docs---")
-    for i, d in enumerate(docs):
-        print(f"Doc {i} preview: {d.page_content[:100]}...")
-        
-    context = "\n\n".join([d.page_content for d in docs])
-    return {"context": context}
 
-def generate(state: AgentState):
+    stores = _select_shards(state)
+    if not stores:
+        return {"context": NO_DOCUMENTS}
+
+    start = time.perf_counter()
+    docs = retrieve_documents(stores, question, _fetch_k())
+    trace(f"---RETRIEVE: {len(docs)} candidates in {(time.perf_counter() - start) * 1000:.0f} ms---")
+    inc("chunks_retrieved", len(docs))
+    if Config.RERANK_ENABLED and docs:
+        return {"documents": docs}
+    return _context_update(question, docs)
+
+async def aretrieve(state: AgentState):
+    """Async retrieve: the FAISS and BM25 searches run off the event loop."""
+    trace("---RETRIEVE---")
+    stores = _select_shards(state)
+    if not stores:
+        return {"context": NO_DOCUMENTS}
+    question = state["question"]
+    start = time.perf_counter()
+    docs = await asyncio.to_thread(retrieve_documents, stores, question, _fetch_k())
+    trace(f"---RETRIEVE: {len(docs)} candidates in {(time.perf_counter() - start) * 1000:.0f} ms---")
+    inc("chunks_retrieved", len(docs))
+    if Config.RERANK_ENABLED and docs:
+        return {"documents": docs}
+    return await asyncio.to_thread(_context_update, question, docs)
+
+def _select_shards(state: AgentState):
     """
-    Generate answer using the retrieved context.
+    Shards to search: the requested collections, else those named in the question;
+    falls back to every shard if none of the selected ones has an index yet.
+    """
+    selected = select_collections(state["question"], state.get("collections"))
+    stores = ingestion.get_vector_stores(selected)
+    if not stores and selected and not state.get("collections"):
+        stores = ingestion.get_vector_stores()
+    trace(f"---SHARDS: {', '.join(stores) or 'none'}---")
+    return stores
+
+def _fetch_k():
+    """Candidates to retrieve: a wide net for the reranker, else what the context builder picks from."""
+    if Config.RERANK_ENABLED:
+        return Config.RERANK_FETCH_K
+    return _context_k()
+
+def _context_k():
+    return Config.CONTEXT_FETCH_K if Config.CONTEXT_BUILDER else Config.RETRIEVAL_K
+
+def rerank(state: AgentState):
+    """
+    Rescore the retrieved candidates with the cross-encoder and build the context
+    from the best ones.
     """
-    print("---GENERATE---")
     question = state["question"]
-    context = state["context"]
-    messages = state["messages"]
-    
-    # Prompt
-    template = """Answer the question based only on the following context:
+    candidates = state.get("documents") or []
+    if not candidates:
+        return {} # keep retrieve's context (e.g. the "No documents found" hint)
+    docs = get_reranker().rerank(question, candidates, Config.RETRIEVAL_K)
+    # Keep the cross-encoder's order rather than re-diversifying by embedding similarity
+    return {**_context_update(question, docs, diversify=False), "documents": []}
+
+async def arerank(state: AgentState):
+    """Async rerank: the cross-encoder runs in a worker thread."""
+    return await asyncio.to_thread(rerank, state)
+
+def _context_update(question, docs, diversify=True):
+    trace(f"---DEBUG: Retrieved {len(docs)} docs---")
+    if Config.LOG_CHUNK_PREVIEWS:
+        for i, d in enumerate(docs):
+            print(f"Doc {i} preview: {d.page_content[:100]}...")
+
+    if not Config.CONTEXT_BUILDER:
+        return {"context": "\n\n".join([d.page_content for d in docs])}
+    with span("context_build"):
+        context, stats = build_context(
+            question, docs, ingestion.chunk_vectors, ingestion.embeddings.embed_query, diversify=diversify
+        )
+    inc("context_tokens", stats["tokens"])
+    inc("context_tokens_saved", stats["tokens_saved"])
+    trace(f"---CONTEXT: {stats['chunks']} chunks in {stats['passages']} passages, "
+          f"{stats['tokens']} tokens ({stats['tokens_saved']} saved by overlap merging)---")
+    return {"context": context}
+
+# Prompt
+ANSWER_PROMPT = ChatPromptTemplate.from_template("""Answer the question based only on the following context:
     {context}
     
     Question: {question}
     
     If the answer is not in the context, say "I don't have enough information to answer that based on the provided documentation."
     Always provide citations if possible (though the text might not have explicit URLs, refer to the content).
+    """)
+
+FOLLOWUP_PROMPT = ChatPromptTemplate.from_template("""Answer the follow-up question using the conversation so far and the documentation context it was based on:
+    {context}
+
+    Conversation so far:
+    {history}
+
+    Follow-up question: {question}
+
+    If the answer is not in the context, say "I don't have enough information to answer that based on the provided documentation."
+    """)
+
+DIRECT_PROMPT = ChatPromptTemplate.from_template("""You are a developer documentation assistant. Reply briefly to the message below.
+    No documentation was retrieved for it; if it asks for technical details, say the indexed documentation does not seem to cover it.
+
+    Conversation so far:
+    {history}
+
+    Message: {question}
+    """)
+
+def _prompt_inputs(state: AgentState):
+    """Prompt and inputs for the route taken: retrieved context, previous context, or none."""
+    question = state["question"]
+    route = state.get("route", "retrieve")
+    if route == "retrieve":
+        return ANSWER_PROMPT, {"context": state["context"], "question": question}
+    history = "\n".join(f"Q: {t['question']}\nA: {t['answer']}" for t in state.get("history") or []) or "(none)"
+    if state.get("summary"):
+        history = f"Earlier turns (summary):\n{state['summary']}\n\n{history}"
+    if route == "history":
+        return FOLLOWUP_PROMPT, {"context": state.get("context", ""), "history": history, "question": question}
+    return DIRECT_PROMPT, {"history": history, "question": question}
+
+def _remember_answer(question, response, context, query_vector=None, collections=None):
+    version = _index_version()
+    if Config.ANSWER_CACHE_ENABLED and version is not None:
+        get_answer_cache(ingestion.embeddings).store(
+            question, response, context, version, query_vector, collections
+        )
+
+def _count_llm_tokens(prompt, inputs, response):
+    """Token counters for one LLM call (estimated locally, the API usage isn't surfaced here)."""
+    if not metrics_enabled():
+        return
+    inc("llm_calls")
+    inc("prompt_tokens", count_tokens(prompt.format(**inputs)))
+    inc("completion_tokens", count_tokens(response))
+
+def _turn_update(state: AgentState, answer):
+    """Record this turn; turns about to leave the history window are compacted into the summary."""
+    update = {"history": [{"question": state["question"], "answer": answer}]}
+    history = state.get("history") or []
+    overflow = len(history) + 1 - Config.ROUTER_HISTORY_TURNS
+    if overflow > 0:
+        update["summary"] = _compact_summary(state.get("summary"), history[:overflow])
+    return update
+
+def _generate_update(state: AgentState, response):
+    return {"messages": [AIMessage(content=response)], **_turn_update(state, response)}
+
+def generate(state: AgentState):
     """
-    prompt = ChatPromptTemplate.from_template(template)
-    
+    Generate answer using the retrieved context.
+    """
+    trace("---GENERATE---")
+    question = state["question"]
+
     llm = get_llm()
     if not llm:
         return {"messages": [AIMessage(content="Configuration Error: API Key not found.")]}
 
+    prompt, inputs = _prompt_inputs(state)
     chain = prompt | llm | StrOutputParser()
-    response = chain.invoke({"context": context, "question": question})
-    
-    return {"messages": [AIMessage(content=response)]}
+    with span("llm_generate"):
+        response = chain.invoke(inputs)
+    _count_llm_tokens(prompt, inputs, response)
+    if prompt is ANSWER_PROMPT: # only context-grounded answers are reusable for other threads
+        _remember_answer(question, response, state["context"], collections=state.get("collections"))
 
-def route_question(state: AgentState) -> Literal["retrieve", "generate"]:
-    """
-    Route question to retrieval or generation.
-    For this simple version, we always retrieve if it looks like a technical question.
-    """
-    # Simple logic: always retrieve for now as it's a documentation assistant
-    return "retrieve"
+    return _generate_update(state, response)
+
+# asyncio.Semaphore binds to the loop it is first used in, so each event loop gets its own
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+def _llm_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+    return semaphore
+
+async def agenerate(state: AgentState):
+    """Async generate: at most LLM_MAX_CONCURRENCY Gemini calls are in flight per event loop."""
+    trace("---GENERATE---")
+    question = state["question"]
+
+    llm = get_llm()
+    if not llm:
+        return {"messages": [AIMessage(content="Configuration Error: API Key not found.")]}
+
+    prompt, inputs = _prompt_inputs(state)
+    chain = prompt | llm | StrOutputParser()
+    async with _llm_semaphore():
+        with span("llm_generate"):
+            response = await chain.ainvoke(inputs)
+    _count_llm_tokens(prompt, inputs, response)
+    if prompt is ANSWER_PROMPT:
+        await asyncio.to_thread(
+            _remember_answer, question, response, state["context"], None, state.get("collections")
+        )
+
+    return _generate_update(state, response)
+
+async def acheck_cache(state: AgentState):
+    """Async check_cache: embedding the question is CPU-bound, so it runs in a worker thread."""
+    return await asyncio.to_thread(check_cache, state)
 
 # Build Graph
 workflow = StateGraph(AgentState)
 
-workflow.add_node("retrieve", retrieve)
-workflow.add_node("generate", generate)
+def _node(name, func, afunc):
+    """
+    Each node has a sync and an async implementation, so the graph serves both
+    app.invoke/stream (Streamlit, evaluation) and app.ainvoke/astream (src.server);
+    both are timed as span node_<name>.
+    """
+    return RunnableLambda(timed(f"node_{name}")(func), afunc=timed(f"node_{name}")(afunc))
+
+workflow.add_node("router", _node("router", route, aroute))
+workflow.add_node("check_cache", _node("check_cache", check_cache, acheck_cache))
+workflow.add_node("retrieve", _node("retrieve", retrieve, aretrieve))
+workflow.add_node("generate", _node("generate", generate, agenerate))
+if Config.RERANK_ENABLED:
+    workflow.add_node("rerank", _node("rerank", rerank, arerank))
 
 # Entry point
-workflow.set_entry_point("retrieve")
+workflow.set_entry_point("router")
 
 # Edges
-workflow.add_edge("retrieve", "generate")
+workflow.add_conditional_edges("router", route_question)
+workflow.add_conditional_edges("check_cache", route_after_cache)
+if Config.RERANK_ENABLED:
+    workflow.add_edge("retrieve", "rerank")
+    workflow.add_edge("rerank", "generate")
+else:
+    workflow.add_edge("retrieve", "generate")
 workflow.add_edge("generate", END)
 
-# Checkpointer for Memory
-from langgraph.checkpoint.memory import MemorySaver
-memory = MemorySaver()
+# Checkpointer for Memory: persistent and bounded (see src/checkpointer.py)
+memory = get_checkpointer()
 
 # Compile
 app = workflow.compile(checkpointer=memory)
+
+
+def _content_text(content):
+    """Message content as plain text (Gemini may return a list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+class AnswerStream:
+    """
+    Run the graph in streaming mode. Iterating yields answer text as it is generated;
+    afterwards `state` holds the final graph state and `ttft` / `total` the time to first
+    token and total time in seconds.
+    """
+
+    def __init__(self, inputs, config, graph=None):
+        self.inputs = inputs
+        self.config = config
+        self.graph = graph or app
+        self.state = None
+        self.ttft = None
+        self.total = None
+
+    def __iter__(self):
+        start = time.perf_counter()
+        streamed_nodes = set()
+        for mode, chunk in self.graph.stream(self.inputs, self.config, stream_mode=["messages", "values"]):
+            if mode == "values":
+                self.state = chunk
+                continue
+            message, metadata = chunk
+            node = metadata.get("langgraph_node")
+            if not isinstance(message, AIMessageChunk):
+                if not isinstance(message, AIMessage) or node in streamed_nodes:
+                    continue # the node's final message repeats text already streamed
+            streamed_nodes.add(node)
+            text = _content_text(message.content)
+            if text:
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - start
+                yield text
+        self.total = time.perf_counter() - start
+        if self.ttft is not None:
+            observe("llm_ttft", self.ttft)
+        observe("answer_total", self.total)
+        ttft_ms = f"{self.ttft * 1000:.0f} ms" if self.ttft is not None else "n/a"
+        trace(f"---TTFT {ttft_ms}, total {self.total * 1000:.0f} ms---")
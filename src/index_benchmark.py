@@ -0,0 +1,109 @@
+"""
+Recall-vs-latency report for the supported FAISS index types.
+
+Every index type is built from the vectors of the current knowledge base and
+compared against exact (flat) search on a sample of corpus chunks used as queries.
+
+Usage: python -m src.index_benchmark [--queries 200] [--k 4]
+"""
+import argparse
+import time
+import faiss
+import numpy as np
+from src.config import Config
+from src.vector_store import (
+    all_vectors, apply_search_params, build_index, load_index_version, resolve_index_path
+)
+
+# (index type, search parameter name, values to sweep)
+SWEEP = [
+    ("flat", None, [None]),
+    ("ivf_flat", "IVF_NPROBE", [1, 4, 8, 16, 64]),
+    ("hnsw", "HNSW_EF_SEARCH", [16, 32, 64, 128]),
+    ("ivf_pq", "IVF_NPROBE", [1, 4, 8, 16, 64]),
+]
+
+
+def _search_latencies(index, queries, k):
+    """Search one query at a time (as the app does) and return (ids, per-query seconds)."""
+    ids = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        ids[i] = found[0]
+    return ids, np.array(latencies)
+
+
+def _recall(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def run_benchmark(vectors, n_queries=200, k=4, seed=0):
+    """Return one result dict per (index type, search setting)."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    exact = build_index(vectors, "flat")
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type, param, values in SWEEP:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type)
+        build_seconds = time.perf_counter() - start
+        for value in values:
+            if param:
+                original = getattr(Config, param)
+                setattr(Config, param, value)
+                apply_search_params(index)
+                setattr(Config, param, original)
+            found, latencies = _search_latencies(index, queries, k)
+            results.append({
+                "index": index_type,
+                "setting": f"{param.lower()}={value}" if param else "-",
+                "recall": _recall(found, truth),
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                "build_s": build_seconds,
+                "size_mb": _index_bytes(index) / 1e6,
+            })
+    return results
+
+
+def _index_bytes(index):
+    return len(faiss.serialize_index(index))
+
+
+def print_report(results, k):
+    print(f"{'index':<10} {'setting':<18} {'recall@' + str(k):>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'size MB':>8}")
+    for r in results:
+        print(f"{r['index']:<10} {r['setting']:<18} {r['recall']:>9.3f} {r['p50_ms']:>8.3f} "
+              f"{r['p99_ms']:>8.3f} {r['build_s']:>8.2f} {r['size_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--collection", default=None, help="Collection shard to benchmark (default: the general one)")
+    args = parser.parse_args()
+
+    from src.ingestion import IngestionEngine
+    from src.shards import collection_path
+
+    _, path = resolve_index_path(collection_path(args.collection))
+    if not path:
+        raise SystemExit("No vector store found. Please run ingestion first.")
+    ingestion = IngestionEngine()
+    store = load_index_version(path, ingestion.embeddings)
+    if isinstance(store.index, faiss.IndexFlat):
+        vectors = all_vectors(store.index)
+    else:
+        # Compressed indexes can't give back exact vectors; re-embed (mostly cache hits)
+        texts = [store.docstore.search(store.index_to_docstore_id[i]).page_content
+                 for i in range(store.index.ntotal)]
+        vectors = ingestion.embed_texts(texts)
+
+    print(f"Benchmarking {len(vectors)} vectors, {args.queries} queries, k={args.k}")
+    print_report(run_benchmark(vectors, args.queries, args.k), args.k)
@@ -1,162 +1,851 @@
+import hashlib
 import os
+import queue
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from typing import List
-from langchain_community.document_loaders import WebBaseLoader, RecursiveUrlLoader
+from urllib.parse import urlparse
+import faiss
+import numpy as np
+from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from src.config import Config
+from src.crawler import DocCrawler
+from src.dedup import ChunkDeduplicator
+from src.embedding_cache import EmbeddingCache
+from src.lexical import BM25Index
+from src.models import get_embeddings
+from src.metrics import inc, span, timed
+from src.shards import collection_names, collection_of, collection_path
+from src.staging import StagingArea
+from src.vector_store import (
+    all_vectors, build_index, get_store_manager, load_index_version, load_manifest,
+    resolve_index_path, save_vector_store, supports_removal, vectors_by_id
+)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def _load_file(file_path):
+    """
+    Load one PDF or text file, returning (docs, error).
+    Module-level so it can run in a worker process.
+    """
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+    try:
+        if file_path.lower().endswith(".pdf"):
+            return PyPDFLoader(file_path).load(), None
+        return TextLoader(file_path).load(), None
+    except Exception as e:
+        return [], e
+
+
+def _prefetch(iterable, maxsize):
+    """
+    Run an iterable in a background thread and yield its items through a bounded queue.
+    The producer blocks when the consumer falls behind; producer errors are re-raised here.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                put(("item", item))
+        except BaseException as e:
+            put(("error", e))
+        finally:
+            put(("end", end))
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+class _CollectionDedups(dict):
+    """
+    collection -> ChunkDeduplicator for one ingestion run. Each is created on first use
+    and seeded with the chunks its collection already indexes, so boilerplate indexed
+    under other sources in earlier runs is recognized too.
+    """
+
+    def __init__(self, shards):
+        super().__init__()
+        self.shards = shards
+
+    def __missing__(self, collection):
+        dedup = self[collection] = ChunkDeduplicator()
+        store = self.shards[collection]["store"] if collection in self.shards else None
+        if store is not None:
+            with span("ingest_dedup_seed"):
+                for chunk_id in list(store.index_to_docstore_id.values()):
+                    doc = store.docstore.search(chunk_id)
+                    if not isinstance(doc, str):
+                        dedup.add(doc.page_content, chunk_id)
+        return dedup
+
 
 class IngestionEngine:
-    def __init__(self):
-        # Use local embeddings to avoid API rate limits
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=Config.EMBEDDING_MODEL
-        )
+    def __init__(self, embeddings=None, backend=None):
+        # Shared local embedding model (backend defaults to Config.EMBEDDING_BACKEND);
+        # it is only loaded on the first embedding call
+        self.embeddings = embeddings or get_embeddings(backend)
+        # Re-ingestion only embeds chunks whose text changed since the last run
+        self.embedding_cache = EmbeddingCache(backend=backend) if Config.EMBEDDING_CACHE_ENABLED else None
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
             separators=["\n\n", "\n", " ", ""]
         )
+        self._host_limits = {}
+        self._host_limits_lock = threading.Lock()
+
+    def _host_limit(self, url):
+        """Semaphore capping concurrent requests to one host."""
+        host = urlparse(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(Config.HTTP_PER_HOST_LIMIT)
+            return self._host_limits[host]
+
+    def _fetch_url(self, url):
+        with self._host_limit(url):
+            loader = WebBaseLoader(
+                url,
+                requests_kwargs={"timeout": Config.HTTP_TIMEOUT},
+                raise_for_status=True,
+                show_progress=False,
+            )
+            return loader.load()
 
     def load_urls(self, urls: List[str]):
-        """Load content from a list of specific URLs."""
-        docs = []
-        for url in urls:
-            try:
-                loader = WebBaseLoader(url)
-                docs.extend(loader.load())
-            except Exception as e:
-                print(f"Error loading {url}: {e}")
-        return docs
+        """Load content from a list of specific URLs concurrently (results keep input order)."""
+        results = [[] for _ in urls]
+        with ThreadPoolExecutor(max_workers=Config.HTTP_MAX_WORKERS) as pool:
+            futures = {pool.submit(self._fetch_url, url): i for i, url in enumerate(urls)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"Error loading {urls[i]}: {e}")
+        return [doc for docs in results for doc in docs]
 
     def load_pdf(self, file_path):
         """Load a PDF file."""
-        from langchain_community.document_loaders import PyPDFLoader
-        try:
-            loader = PyPDFLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            print(f"Error loading PDF {file_path}: {e}")
-            return []
+        docs, error = _load_file(file_path)
+        if error:
+            print(f"Error loading PDF {file_path}: {error}")
+        return docs
             
     def load_text(self, file_path):
         """Load a text/markdown file."""
-        from langchain_community.document_loaders import TextLoader
+        docs, error = _load_file(file_path)
+        if error:
+            print(f"Error loading text {file_path}: {error}")
+        return docs
+
+    def load_files(self, file_paths):
+        """
+        Load PDF/text files, parsing PDFs in a process pool (CPU-bound) while text files
+        are read in this process. Results keep input order; failures are reported per file.
+        """
+        results = [None] * len(file_paths)
+        pdfs = {i for i, path in enumerate(file_paths) if path.lower().endswith(".pdf")}
+
+        pool = None
+        if len(pdfs) > 1 and Config.PDF_PARSE_PROCESSES > 1:
+            pool = ProcessPoolExecutor(max_workers=min(Config.PDF_PARSE_PROCESSES, len(pdfs)))
         try:
-            loader = TextLoader(file_path)
-            return loader.load()
-        except Exception as e:
-            print(f"Error loading text {file_path}: {e}")
-            return []
+            futures = {pool.submit(_load_file, file_paths[i]): i for i in pdfs} if pool else {}
+            for i, path in enumerate(file_paths):
+                if i not in pdfs or pool is None:
+                    results[i] = _load_file(path)
+            for future, i in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception as e: # e.g. a worker process died
+                    results[i] = ([], e)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        docs = []
+        for path, (file_docs, error) in zip(file_paths, results):
+            if error:
+                print(f"Error loading {path}: {error}")
+            docs.extend(file_docs)
+        return docs
 
     def load_directory(self, directory_path):
         """Load all supported files from a directory."""
-        docs = []
         if not os.path.exists(directory_path):
             print(f"Directory {directory_path} does not exist.")
-            return docs
+            return []
             
+        file_paths = []
         for root, _, files in os.walk(directory_path):
             for file in files:
-                file_path = os.path.join(root, file)
-                if file.lower().endswith(".pdf"):
-                    docs.extend(self.load_pdf(file_path))
-                elif file.lower().endswith((".txt", ".md")):
-                    docs.extend(self.load_text(file_path))
-        return docs
+                if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                    file_paths.append(os.path.join(root, file))
+        return self.load_files(file_paths)
 
+    @timed("ingest_split")
     def process_documents(self, docs):
         """Split documents into chunks."""
         splits = self.text_splitter.split_documents(docs)
         return splits
 
+    def embed_texts(self, texts):
+        """Embed texts into a normalized float32 matrix (one row per text).
+        Cached vectors are reused; only cache misses go to the model, in one call."""
+        if self.embedding_cache is None:
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        else:
+            rows = self.embedding_cache.lookup(texts)
+            missing = [i for i, row in enumerate(rows) if row is None]
+            if missing:
+                inc("embedding_cache_misses", len(missing))
+                missing_texts = [texts[i] for i in missing]
+                fresh = np.asarray(self.embeddings.embed_documents(missing_texts), dtype=np.float32)
+                self.embedding_cache.store(missing_texts, fresh)
+                for row, i in zip(fresh, missing):
+                    rows[i] = row
+            inc("embedding_cache_hits", len(texts) - len(missing))
+            vectors = np.vstack(rows).astype(np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def chunk_vectors(self, docs):
+        """
+        Unit-length vectors of retrieved chunks, read back from their shard's FAISS index by
+        docstore ID. Only chunks the live index no longer holds (e.g. after a reload) are embedded.
+        """
+        rows = [None] * len(docs)
+        by_collection = defaultdict(list)
+        for i, doc in enumerate(docs):
+            by_collection[doc.metadata.get("collection") or Config.DEFAULT_COLLECTION].append(i)
+        for collection, members in by_collection.items():
+            store = self.get_vector_store(collection) if collection in collection_names() else None
+            if store is not None:
+                found = vectors_by_id(store, [docs[i].id for i in members])
+                for i, row in zip(members, found):
+                    rows[i] = row
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            for i, row in zip(missing, self.embed_texts([docs[i].page_content for i in missing])):
+                rows[i] = row
+        vectors = np.vstack(rows).astype(np.float32)
+        faiss.normalize_L2(vectors) # PQ reconstructions are only approximately unit-length
+        return vectors
+
+    def new_vector_store(self, dimension, docstore=None):
+        """Create an empty FAISS store (plus BM25 index) that chunks are bulk-added into."""
+        vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.IndexFlatL2(dimension),
+            docstore=docstore or InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        vectorstore.lexical = BM25Index() if Config.HYBRID_SEARCH else None
+        return vectorstore
+
+    @staticmethod
+    @timed("ingest_index")
+    def _add_embeddings(vectorstore, chunks, ids, vectors):
+        """Add embedded chunks to the FAISS store and its BM25 index under the same IDs."""
+        texts = [c.page_content for c in chunks]
+        vectorstore.add_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            metadatas=[c.metadata for c in chunks],
+            ids=ids,
+        )
+        if getattr(vectorstore, "lexical", None) is not None:
+            vectorstore.lexical.add(ids, texts)
+
+    @staticmethod
+    def _source_of(doc):
+        return doc.metadata.get("source", "unknown")
+
+    def _group_by_source(self, docs):
+        groups = defaultdict(list)
+        for doc in docs:
+            groups[self._source_of(doc)].append(doc)
+        return groups
+
+    @staticmethod
+    def _content_hash(docs):
+        h = hashlib.sha256()
+        for doc in docs:
+            h.update(doc.page_content.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def _chunk_ids(source, chunks):
+        """Deterministic IDs from (source, chunk text, occurrence), so unchanged chunks keep their ID."""
+        seen = defaultdict(int)
+        ids = []
+        for chunk in chunks:
+            key = f"{source}\0{chunk.page_content}"
+            ids.append(hashlib.sha256(f"{key}\0{seen[key]}".encode("utf-8")).hexdigest())
+            seen[key] += 1
+        return ids
+
     def create_vector_store(self, splits):
-        """Create and save FAISS vector store with rate limit handling."""
+        """
+        Build fresh shards from chunks, replacing each collection the chunks belong to.
+        Returns {collection: vector store}, or None on failure.
+        """
         if not splits:
             print("No documents to index.")
             return None
-            
+
+        dedups = defaultdict(ChunkDeduplicator) if Config.DEDUP_ENABLED else None
+        by_collection = defaultdict(lambda: ({"sources": {}}, [], []))
+        for source, source_chunks in self._group_by_source(splits).items():
+            manifest, chunks, ids = by_collection[collection_of(source)]
+            chunk_ids = self._chunk_ids(source, source_chunks)
+            if dedups is not None:
+                source_chunks, chunk_ids, _ = self._drop_duplicates(
+                    dedups[collection_of(source)], source_chunks, chunk_ids
+                )
+            manifest["sources"][source] = {"hash": None, "ids": chunk_ids}
+            for chunk in source_chunks:
+                chunk.metadata["collection"] = collection_of(source)
+            chunks.extend(source_chunks)
+            ids.extend(chunk_ids)
+
+        stores = {}
+        for collection, (manifest, chunks, ids) in by_collection.items():
+            vectorstore = self._add_chunks(None, chunks, ids)
+            if vectorstore is None:
+                print(f"Failed to create vector store for collection '{collection}'.")
+                return None
+            self._finalize_index(vectorstore)
+            self._save(vectorstore, manifest, collection)
+            stores[collection] = vectorstore
+        if dedups is not None:
+            self._report_duplicates(dedups.values())
+        return stores
+
+    def update_vector_store(self, docs, prune_missing=False):
+        """
+        Incrementally sync loaded documents into the existing index.
+        Sources whose content hash is unchanged are skipped; for changed sources only
+        new chunks are embedded and chunks that disappeared are deleted.
+        With prune_missing=True, indexed sources absent from docs are removed.
+        Returns a summary dict, or None if the update failed (index left untouched).
+        """
+        try:
+            return self._sync_sources(
+                self._group_by_source(docs).items(), prune_missing, checkpoint_every=None
+            )
+        except Exception as e:
+            print(f"Incremental update failed; existing index left untouched: {e}")
+            return None
+
+    def ingest_stream(self, sources, prune_missing=False, checkpoint_every=None):
+        """
+        Stream files, directories and URLs through load -> split -> embed -> add with
+        bounded queues between stages, so memory is bounded by the queue sizes rather
+        than the corpus. Changes are staged on disk (src.staging) and checkpointed every
+        INGEST_CHECKPOINT_EVERY chunks; the new version is only published at the end. After
+        a crash, re-running with the same sources replays the last checkpoint and skips the
+        sources it recorded.
+        """
+        try:
+            return self._sync_sources(
+                self._iter_sources(sources),
+                prune_missing,
+                checkpoint_every=checkpoint_every or Config.INGEST_CHECKPOINT_EVERY,
+            )
+        except Exception as e:
+            print(f"Streaming ingestion aborted; last checkpoint kept: {e}")
+            return None
+
+    def crawl(self, start_urls, max_depth=None, max_pages=None, prefixes=None, prune_missing=False,
+              checkpoint_every=None):
+        """
+        Crawl doc sites from start_urls (see src.crawler) and stream the pages through the
+        same pipeline as ingest_stream. Pages that are unchanged since they were indexed are
+        skipped with conditional GETs, so only new or changed pages reach the splitter.
+        """
+        indexed = {
+            source: entry["hash"]
+            for name in collection_names()
+            for source, entry in (load_manifest(collection_path(name)) or {"sources": {}})["sources"].items()
+        }
+        crawler = DocCrawler(self._content_hash, self._host_limit, max_depth=max_depth, max_pages=max_pages)
+        try:
+            summary = self._sync_sources(
+                crawler.crawl(start_urls, prefixes, indexed),
+                prune_missing,
+                checkpoint_every=checkpoint_every or Config.INGEST_CHECKPOINT_EVERY,
+            )
+        except Exception as e:
+            print(f"Crawl aborted; last checkpoint kept: {e}")
+            return None
+        summary.update(crawler.stats)
+        return summary
+
+    def _load_shard(self, collection):
+        """
+        Vector store and manifest state of one collection, for the ingestion pipeline.
+        The store's chunks stay on disk and changes go to the shard's staging area; changes
+        staged by an interrupted run are replayed first.
+        """
+        path = collection_path(collection)
+        staging = StagingArea(path)
         vectorstore = None
-        batch_size = 5 # Increased slightly as local embeddings are fast, but FAISS might need care? 
-                       # Actually the rate limit was for embedding API if used, but we use local HuggingFace.
-                       # Wait, we use HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2") which is local.
-                       # The previous code had rate limit logic likely because the user MIGHT switch to OpenAI/Gemini embeddings.
-                       # I'll keep the logic but it's less critical for local embeddings.
-                       
+        if staging.version_path:
+            vectorstore = load_index_version(staging.version_path, self.embeddings, staging=staging)
+        manifest = load_manifest(path) if vectorstore else None
+        if vectorstore and manifest is None:
+            print(f"Existing '{collection}' index has no manifest; its chunks cannot be tracked "
+                  "and will be kept as-is.")
+        manifest = manifest or {"sources": {}}
+        shard = {
+            "store": vectorstore,
+            "staging": staging,
+            "manifest": manifest,
+            "indexed": manifest["sources"],
+            "partial": defaultdict(list), # chunk IDs added for sources not yet in the manifest
+            "changed": set(), # sources whose manifest entry changed since the last checkpoint
+            "dirty": False,
+        }
+        if staging.resumed:
+            self._replay_staged(shard, collection)
+        return shard
+
+    def _replay_staged(self, shard, collection):
+        """Re-apply the changes an interrupted run checkpointed onto the freshly loaded base."""
+        staging = shard["staging"]
+        with staging.replay():
+            if shard["store"] is not None:
+                indexed_ids = set(shard["store"].index_to_docstore_id.values())
+                # IDs added and removed within the run were never in the base
+                removed = [i for i in staging.removed_ids() if i in indexed_ids]
+                if removed:
+                    self._delete_chunks(shard["store"], removed)
+            added = 0
+            for chunks, ids, vectors in staging.iter_added(Config.EMBEDDING_BATCH_SIZE):
+                if shard["store"] is None:
+                    shard["store"] = self.new_vector_store(vectors.shape[1], staging.docstore())
+                self._add_embeddings(shard["store"], chunks, ids, vectors)
+                added += len(ids)
+        for source, entry in staging.staged_sources().items():
+            if entry is None:
+                shard["indexed"].pop(source, None)
+            else:
+                shard["indexed"][source] = entry
+        shard["dirty"] = True
+        print(f"Resuming '{collection}' from its last checkpoint: {added} staged chunks re-added.")
+
+    def _sync_sources(self, source_stream, prune_missing, checkpoint_every):
+        """
+        Apply (source, docs) pairs to the collection shards through the staged pipeline.
+        Checkpoints commit the shards' staging areas; new versions are saved at the end.
+        """
+        shards = {}
+        try:
+            for name in collection_names():
+                shards[name] = self._load_shard(name)
+            summary = self._apply_changes(shards, source_stream, prune_missing, checkpoint_every)
+            for collection, shard in shards.items():
+                if shard["dirty"] and shard["store"] is not None:
+                    self._finalize_index(shard["store"])
+                    self._save(shard["store"], shard["manifest"], collection)
+                shard["staging"].discard()
+            return summary
+        finally:
+            for shard in shards.values():
+                shard["staging"].close()
+
+    def _apply_changes(self, shards, source_stream, prune_missing, checkpoint_every):
         import time
 
-        print(f"Ingesting {len(splits)} chunks in batches of {batch_size}...")
-        
-        # Simple loop without tqdm
-        for i in range(0, len(splits), batch_size):
-            batch = splits[i:i+batch_size]
-            retries = 3
-            success = False
-            for attempt in range(retries):
+        # Where each source is indexed now, so a source whose collection changed is moved
+        owners = {source: name for name, shard in shards.items() for source in shard["indexed"]}
+
+        summary = {"added": 0, "removed": 0, "unchanged_sources": 0}
+        # Chunks are only deduplicated against their own collection, which holds the kept copy
+        dedups = _CollectionDedups(shards) if Config.DEDUP_ENABLED else None
+        seen = set()
+        removed_ids = set()
+        since_checkpoint = 0
+        start = time.perf_counter()
+        if self.embedding_cache is not None:
+            self.embedding_cache.reset_stats()
+
+        def delete(shard, ids):
+            if ids:
+                self._delete_chunks(shard["store"], ids)
+                summary["removed"] += len(ids)
+                removed_ids.update(ids)
+                shard["dirty"] = True
+
+        snapshot = {name: dict(shard["indexed"]) for name, shard in shards.items()}
+        queue_size = Config.PIPELINE_QUEUE_SIZE
+        loaded = _prefetch(source_stream, queue_size)
+        changes = _prefetch(self._iter_changes(loaded, snapshot, seen, summary, dedups), queue_size)
+        for chunks, ids, vectors, markers in _prefetch(self._iter_batches(changes), queue_size):
+            rows_by_collection = defaultdict(list)
+            for row, chunk in enumerate(chunks):
+                rows_by_collection[chunk.metadata["collection"]].append(row)
+            for collection, rows in rows_by_collection.items():
+                shard = shards[collection]
+                if shard["store"] is None:
+                    shard["store"] = self.new_vector_store(vectors.shape[1], shard["staging"].docstore())
+                self._add_embeddings(
+                    shard["store"], [chunks[r] for r in rows], [ids[r] for r in rows], vectors[rows]
+                )
+                shard["staging"].store_vectors([ids[r] for r in rows], vectors[rows])
+                for r in rows:
+                    shard["partial"][self._source_of(chunks[r])].append(ids[r])
+                shard["dirty"] = True
+            summary["added"] += len(chunks)
+            since_checkpoint += len(chunks)
+
+            for source, entry, delete_ids in markers:
+                collection = collection_of(source)
+                shard = shards[collection]
+                delete(shard, delete_ids)
+                previous_owner = owners.get(source)
+                if previous_owner not in (None, collection):
+                    old = shards[previous_owner]
+                    delete(old, old["indexed"].pop(source)["ids"])
+                    old["changed"].add(source)
+                shard["indexed"][source] = entry
+                shard["partial"].pop(source, None)
+                shard["changed"].add(source)
+                shard["dirty"] = True
+                owners[source] = collection
+
+            if checkpoint_every and since_checkpoint >= checkpoint_every:
+                print(f"Checkpoint: {summary['added']} chunks added so far.")
+                for shard in shards.values():
+                    if shard["dirty"]:
+                        self._checkpoint(shard)
+                since_checkpoint = 0
+
+        if prune_missing:
+            for shard in shards.values():
+                stale = [s for s in shard["indexed"] if s not in seen]
+                delete(shard, [i for s in stale for i in shard["indexed"].pop(s)["ids"]])
+                shard["dirty"] = shard["dirty"] or bool(stale)
+
+        if removed_ids:
+            # A source whose duplicates were kept as a now removed chunk is re-checked on
+            # the next run, which indexes its own copy
+            for shard in shards.values():
+                for entry in shard["indexed"].values():
+                    if entry["hash"] is not None and removed_ids.intersection(entry.get("duplicates", ())):
+                        entry["hash"] = None
+                        shard["dirty"] = True
+
+        elapsed = time.perf_counter() - start
+        inc("ingest_chunks_added", summary["added"])
+        inc("ingest_chunks_removed", summary["removed"])
+        print(f"Incremental update: {summary['added']} chunks added, {summary['removed']} removed, "
+              f"{summary['unchanged_sources']} unchanged sources skipped in {elapsed:.1f}s "
+              f"({summary['added'] / max(elapsed, 1e-9):.1f} chunks/sec)")
+        if self.embedding_cache is not None:
+            stats = self.embedding_cache.stats()
+            print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate)")
+        if dedups is not None:
+            summary.update(self._report_duplicates(dedups.values(), summary["added"]))
+        return summary
+
+    @timed("ingest_checkpoint")
+    def _checkpoint(self, shard):
+        """
+        Commit a shard's staging area with the manifest entries changed since the last
+        checkpoint. Half-applied sources get no hash (so a resumed run re-diffs them) and
+        list both their previous and already-added chunk IDs.
+        """
+        entries = {source: shard["indexed"].get(source) for source in shard["changed"]}
+        for source, added_ids in shard["partial"].items():
+            previous = shard["indexed"].get(source, {"ids": []})
+            entries[source] = {"hash": None, "ids": previous["ids"] + added_ids}
+        shard["staging"].checkpoint(entries)
+        shard["changed"] = set()
+        if getattr(shard["store"], "lexical", None) is not None:
+            shard["store"].lexical.flush()
+
+    def _iter_sources(self, sources):
+        """Lazily load (source, docs) one file or URL at a time; directories are walked in order."""
+        for source in sources:
+            if source.startswith(("http://", "https://")):
                 try:
-                    if vectorstore is None:
-                        vectorstore = FAISS.from_documents(documents=batch, embedding=self.embeddings)
-                    else:
-                        new_vectorstore = FAISS.from_documents(documents=batch, embedding=self.embeddings)
-                        vectorstore.merge_from(new_vectorstore)
-                    
-                    # Small buffer
-                    # time.sleep(0.5) 
-                    success = True
-                    break # Success, move to next batch
+                    with span("ingest_load"):
+                        docs = self._fetch_url(source)
                 except Exception as e:
-                    if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                        wait_time = (attempt + 1) * 5
-                        print(f"Rate limit hit on batch {i}. Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                    else:
-                        print(f"Error processing batch {i}: {e}")
-                        break # Non-retryable error
-            
-            if not success:
-                print(f"Failed to process batch {i} after {retries} retries. Aborting.")
+                    print(f"Error loading {source}: {e}")
+                    continue
+            elif os.path.isdir(source):
+                for root, dirs, files in os.walk(source):
+                    dirs.sort()
+                    for file in sorted(files):
+                        if file.lower().endswith(SUPPORTED_EXTENSIONS):
+                            yield from self._iter_sources([os.path.join(root, file)])
+                continue
+            else:
+                with span("ingest_load"):
+                    docs, error = _load_file(source)
+                if error:
+                    print(f"Error loading {source}: {error}")
+                    continue
+            yield from self._group_by_source(docs).items()
+
+    def _diff_source(self, source, source_docs, previous, dedup=None):
+        """
+        Split a source and diff its chunk IDs against what is indexed.
+        Duplicate chunks found by dedup are neither added nor listed in the manifest entry,
+        which lists the IDs of the chunks kept in their place under "duplicates".
+        Returns (manifest entry, chunks to add, their IDs, IDs to delete), or None if unchanged.
+        """
+        content_hash = self._content_hash(source_docs)
+        if previous and previous["hash"] == content_hash:
+            return None
+
+        chunks = self.process_documents(source_docs)
+        chunk_ids = self._chunk_ids(source, chunks)
+        old_ids = set(previous["ids"]) if previous else set()
+        canonical = []
+        if dedup is not None:
+            # This source's chunks that are about to be deleted cannot stand for new ones
+            dedup.discard(old_ids.difference(chunk_ids))
+            chunks, chunk_ids, canonical = self._drop_duplicates(dedup, chunks, chunk_ids, old_ids)
+        to_add = [(c, i) for c, i in zip(chunks, chunk_ids) if i not in old_ids]
+        entry = {"hash": content_hash, "ids": chunk_ids}
+        if canonical:
+            entry["duplicates"] = canonical
+        return (
+            entry,
+            [c for c, _ in to_add],
+            [i for _, i in to_add],
+            sorted(old_ids - set(chunk_ids)),
+        )
+
+    def _iter_changes(self, source_stream, indexed, seen, summary, dedups=None):
+        """
+        Split stage: yield ("chunk", chunk, id) for every chunk to add, followed by
+        ("done", source, entry, delete_ids) once all chunks of a source were emitted.
+        indexed maps collection -> {source: manifest entry}; chunks are tagged with
+        their collection in metadata. Sources with docs None are known to be unchanged.
+        dedups maps collection -> ChunkDeduplicator.
+        """
+        for source, source_docs in source_stream:
+            seen.add(source)
+            if source_docs is None:
+                summary["unchanged_sources"] += 1
+                continue
+            collection = collection_of(source)
+            diff = self._diff_source(
+                source, source_docs, indexed[collection].get(source),
+                dedups[collection] if dedups is not None else None,
+            )
+            if diff is None:
+                summary["unchanged_sources"] += 1
+                continue
+            entry, chunks, ids, delete_ids = diff
+            for chunk, chunk_id in zip(chunks, ids):
+                chunk.metadata["collection"] = collection
+                yield ("chunk", chunk, chunk_id)
+            yield ("done", source, entry, delete_ids)
+
+    @staticmethod
+    @timed("ingest_dedup")
+    def _drop_duplicates(dedup, chunks, ids, keep_ids=()):
+        """
+        Filter (chunks, ids) through the deduplicator. Chunks in keep_ids are already
+        indexed, so they are kept and only remembered.
+        Returns (kept chunks, kept IDs, sorted IDs of the chunks kept for the dropped ones).
+        """
+        kept_chunks, kept_ids, canonical = [], [], set()
+        for chunk, chunk_id in zip(chunks, ids):
+            if chunk_id in keep_ids:
+                dedup.add(chunk.page_content, chunk_id)
+            elif match := dedup.check(chunk.page_content, chunk_id):
+                canonical.add(match[1])
+                continue
+            kept_chunks.append(chunk)
+            kept_ids.append(chunk_id)
+        return kept_chunks, kept_ids, sorted(canonical)
+
+    @staticmethod
+    def _report_duplicates(dedups, added=None):
+        """Log and count the chunks (and embedding batches) saved by the per-collection deduplicators."""
+        exact = sum(dedup.stats["exact"] for dedup in dedups)
+        near = sum(dedup.stats["near"] for dedup in dedups)
+        inc("ingest_duplicates_exact", exact)
+        inc("ingest_duplicates_near", near)
+        added = sum(dedup.stats["kept"] for dedup in dedups) if added is None else added
+        batch = Config.EMBEDDING_BATCH_SIZE
+        batches_saved = (added + exact + near + batch - 1) // batch - (added + batch - 1) // batch
+        print(f"Deduplication: {exact + near} chunks skipped ({exact} exact, {near} near-duplicate "
+              f"at Jaccard >= {Config.DEDUP_THRESHOLD}), {batches_saved} fewer embedding batches")
+        return {"duplicates_exact": exact, "duplicates_near": near}
+
+    def _iter_batches(self, changes):
+        """
+        Embed stage: group chunks into EMBEDDING_BATCH_SIZE batches and yield
+        (chunks, ids, vectors, markers), where markers are the sources completed by this batch.
+        """
+        chunks, ids, markers = [], [], []
+        for item in changes:
+            if item[0] == "chunk":
+                chunks.append(item[1])
+                ids.append(item[2])
+            else:
+                markers.append(item[1:])
+            if len(chunks) >= Config.EMBEDDING_BATCH_SIZE:
+                yield chunks, ids, self._embed_with_retry(chunks), markers
+                chunks, ids, markers = [], [], []
+        if chunks or markers:
+            yield chunks, ids, self._embed_with_retry(chunks) if chunks else None, markers
+
+    @timed("ingest_embed")
+    def _embed_with_retry(self, chunks):
+        """Embed one batch, retrying on rate limits (kept for remote embedding providers)."""
+        import time
+
+        texts = [d.page_content for d in chunks]
+        retries = 3
+        for attempt in range(retries):
+            try:
+                return self.embed_texts(texts)
+            except Exception as e:
+                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+                    wait_time = (attempt + 1) * 5
+                    print(f"Rate limit hit. Retrying in {wait_time}s...")
+                    time.sleep(wait_time)
+                else:
+                    raise
+        raise RuntimeError(f"Embedding failed after {retries} retries.")
+
+    @timed("ingest_index")
+    def _delete_chunks(self, vectorstore, ids):
+        if not supports_removal(vectorstore.index):
+            # HNSW and IVF can't delete in place; fall back to flat, _finalize_index rebuilds it
+            vectorstore.index = build_index(all_vectors(vectorstore.index), "flat")
+        vectorstore.delete(ids)
+        if getattr(vectorstore, "lexical", None) is not None:
+            vectorstore.lexical.remove(ids)
+
+    @timed("ingest_index")
+    def _finalize_index(self, vectorstore):
+        """Convert a flat index to the configured ANN type, training on the whole corpus."""
+        if Config.VECTOR_INDEX_TYPE != "flat" and isinstance(vectorstore.index, faiss.IndexFlat):
+            vectorstore.index = build_index(all_vectors(vectorstore.index))
+
+    @timed("ingest_save")
+    def _save(self, vectorstore, manifest, collection=None):
+        path = collection_path(collection)
+        version = save_vector_store(vectorstore, path, manifest=manifest)
+        get_store_manager(self.embeddings, path).invalidate()
+        print(f"Vector store saved to {path} (version {version})")
+
+    def _add_chunks(self, vectorstore, chunks, ids):
+        """
+        Embed chunks in large batches and bulk-add them under the given IDs.
+        Creates the store if vectorstore is None; returns None on failure.
+        """
+        import time
+
+        batch_size = Config.EMBEDDING_BATCH_SIZE
+        print(f"Ingesting {len(chunks)} chunks in batches of {batch_size}...")
+        start = time.perf_counter()
+        if self.embedding_cache is not None:
+            self.embedding_cache.reset_stats()
+
+        for i in range(0, len(chunks), batch_size):
+            batch = chunks[i:i+batch_size]
+            try:
+                vectors = self._embed_with_retry(batch)
+            except Exception as e:
+                print(f"Error processing batch {i}: {e}")
                 return None
 
-        if vectorstore:
-            vectorstore.save_local(Config.VECTOR_STORE_PATH)
-            print(f"Vector store saved to {Config.VECTOR_STORE_PATH}")
-        else:
-            print("Failed to create vector store.")
-            
+            if vectorstore is None:
+                vectorstore = self.new_vector_store(vectors.shape[1])
+            self._add_embeddings(vectorstore, batch, ids[i:i+batch_size], vectors)
+
+        elapsed = time.perf_counter() - start
+        print(f"Embedded {len(chunks)} chunks in {elapsed:.1f}s "
+              f"({len(chunks) / max(elapsed, 1e-9):.1f} chunks/sec)")
+        if self.embedding_cache is not None:
+            stats = self.embedding_cache.stats()
+            print(f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate)")
         return vectorstore
 
-    def load_vector_store(self):
-        """Load existing vector store."""
-        if os.path.exists(Config.VECTOR_STORE_PATH):
-            return FAISS.load_local(
-                Config.VECTOR_STORE_PATH, 
-                self.embeddings,
-                allow_dangerous_deserialization=True
-            )
+    def load_vector_store(self, collection=None):
+        """Load a collection's vector store from disk (a fresh, writable copy, not the shared handle)."""
+        _, path = resolve_index_path(collection_path(collection))
+        if path:
+            return load_index_version(path, self.embeddings, writable=True)
         return None
 
+    def get_vector_store(self, collection=None):
+        """Shared, process-wide vector store of a collection; loaded once and hot-swapped on new versions."""
+        return get_store_manager(self.embeddings, collection_path(collection)).get()
+
+    def get_vector_stores(self, collections=None):
+        """{collection: shared vector store} for the given (default: all) collections that have an index."""
+        stores = {}
+        for name in collections or collection_names():
+            store = self.get_vector_store(name)
+            if store is not None:
+                stores[name] = store
+        return stores
+
+    def index_version(self):
+        """Combined version of every loaded shard, or None if there is no knowledge base."""
+        self.get_vector_stores() # picks up newly saved versions
+        versions = [
+            f"{name}@{get_store_manager(self.embeddings, collection_path(name)).version}"
+            for name in collection_names()
+            if get_store_manager(self.embeddings, collection_path(name)).version is not None
+        ]
+        return ",".join(versions) or None
+
 if __name__ == "__main__":
-    # Test ingestion
+    # Usage: python -m src.ingestion [file|directory|url ...]
+    #        python -m src.ingestion --crawl start_url [start_url ...]
     ingestion = IngestionEngine()
-    
-    # 1. Load URLs
-    print("Loading Web Docs...")
-    sample_urls = [
-         "https://python.langchain.com/docs/get_started/introduction",
+    if sys.argv[1:2] == ["--crawl"]:
+        print(f"Crawling from {len(sys.argv) - 2} start URLs...")
+        ingestion.crawl(sys.argv[2:])
+        sys.exit(0)
+    sources = sys.argv[1:] or [
+        "https://python.langchain.com/docs/get_started/introduction",
+        "data",
     ]
-    web_docs = ingestion.load_urls(sample_urls)
-    
-    # 2. Load Local Data (if exists)
-    print("Loading Local Data...")
-    local_docs = ingestion.load_directory("data")
-    
-    all_docs = web_docs + local_docs
-    print(f"Total Loaded {len(all_docs)} documents.")
-    
-    if all_docs:
-        print("Splitting docs...")
-        splits = ingestion.process_documents(all_docs)
-        print(f"Created {len(splits)} chunks.")
-        
-        print("Creating vector store...")
-        ingestion.create_vector_store(splits)
+    print(f"Streaming {len(sources)} sources into the vector store...")
+    ingestion.ingest_stream(sources)
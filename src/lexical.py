@@ -0,0 +1,205 @@
+import math
+import re
+from collections import Counter, OrderedDict, defaultdict
+import numpy as np
+
+LEXICAL_FILE = "lexical.npz"
+MERGED_POSTINGS_CACHE_SIZE = 1024 # terms whose base + delta postings are kept concatenated
+DF_CUTOFF_MIN_DOCS = 20 # smaller indexes score every term, however common
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text):
+    """
+    Lowercased word tokens. Identifiers are kept whole (so `merge_from` or
+    `GoogleGenerativeAIEmbeddings` match exactly) and also split into their
+    snake_case / CamelCase parts.
+    """
+    tokens = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        tokens.append(lower)
+        if "_" in word or (word != lower and word[1:] != lower[1:]):
+            parts = [p.lower() for piece in word.split("_") for p in _SUBWORD.findall(piece)]
+            if len(parts) > 1:
+                tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring, keyed by the same chunk IDs as the FAISS docstore.
+    Postings are numpy arrays so a query costs a few vectorized ops per query term.
+    Removed chunks are tombstoned and dropped when the index is compacted on save.
+    Long ingestion runs flush() pending postings into array segments at checkpoints.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, max_df_ratio=0.5):
+        self.k1 = k1
+        self.b = b
+        # Terms in more than this share of chunks ("the", "and") barely move BM25 scores
+        # but have the longest postings, so queries skip them (from DF_CUTOFF_MIN_DOCS chunks on)
+        self.max_df_ratio = max_df_ratio
+        self.doc_ids = [] # slot -> chunk id
+        self.doc_len = []
+        self.alive = []
+        self.slots = {} # chunk id -> slot
+        self.total_len = 0
+        self._base = {} # term -> (slots, tfs) arrays from the last load/compaction
+        self._segments = defaultdict(list) # term -> [(slots, tfs)] flushed since then
+        self._pending = defaultdict(list) # term -> [(slot, tf)] added since the last flush
+        self._cache = OrderedDict() # term -> merged postings, least recently used first
+        self._arrays = None # (doc_len, alive) as numpy, rebuilt after changes
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self, ids, texts):
+        for chunk_id, text in zip(ids, texts):
+            if chunk_id in self.slots:
+                self.remove([chunk_id])
+            slot = len(self.doc_ids)
+            counts = Counter(tokenize(text))
+            length = sum(counts.values())
+            self.doc_ids.append(chunk_id)
+            self.doc_len.append(length)
+            self.alive.append(True)
+            self.slots[chunk_id] = slot
+            self.total_len += length
+            for term, tf in counts.items():
+                self._pending[term].append((slot, tf))
+                self._cache.pop(term, None)
+        self._arrays = None
+
+    def remove(self, ids):
+        for chunk_id in ids:
+            slot = self.slots.pop(chunk_id, None)
+            if slot is not None:
+                self.alive[slot] = False
+                self.total_len -= self.doc_len[slot]
+        self._arrays = None
+
+    def _postings(self, term):
+        base = self._base.get(term)
+        segments = self._segments.get(term, [])
+        pending = self._pending.get(term)
+        if not segments and not pending:
+            return base # no delta since the last load/compaction: the base arrays as they are
+        if term in self._cache:
+            self._cache.move_to_end(term)
+            return self._cache[term]
+        parts = ([base] if base is not None else []) + segments
+        slots = [p[0] for p in parts]
+        tfs = [p[1] for p in parts]
+        if pending:
+            slots.append(np.array([s for s, _ in pending], dtype=np.int32))
+            tfs.append(np.array([t for _, t in pending], dtype=np.float32))
+        merged = self._cache[term] = (np.concatenate(slots), np.concatenate(tfs).astype(np.float32))
+        if len(self._cache) > MERGED_POSTINGS_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return merged
+
+    def search(self, query, k):
+        """Return up to k (chunk id, score) pairs, best first."""
+        n_docs = len(self.slots)
+        if not n_docs:
+            return []
+        if self._arrays is None:
+            self._arrays = (np.array(self.doc_len, dtype=np.float32), np.array(self.alive, dtype=bool))
+        doc_len, alive = self._arrays
+        avgdl = self.total_len / n_docs or 1.0
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            slots, tfs = postings
+            if n_docs >= DF_CUTOFF_MIN_DOCS and len(slots) > self.max_df_ratio * n_docs:
+                continue
+            live = alive[slots]
+            slots, tfs = slots[live], tfs[live]
+            if not len(slots):
+                continue
+            idf = math.log(1 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_len[slots] / avgdl)
+            scores[slots] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.doc_ids[s], float(scores[s])) for s in top]
+
+    def flush(self):
+        """Turn pending (slot, tf) tuples into compact array segments, without a full compaction."""
+        for term, pending in self._pending.items():
+            self._segments[term].append((
+                np.array([s for s, _ in pending], dtype=np.int32),
+                np.array([t for _, t in pending], dtype=np.float32),
+            ))
+        self._pending = defaultdict(list)
+
+    def compact(self):
+        """Drop tombstoned chunks and merge pending postings into flat arrays."""
+        keep = [s for s, alive in enumerate(self.alive) if alive]
+        remap = np.full(len(self.doc_ids), -1, dtype=np.int32)
+        remap[keep] = np.arange(len(keep), dtype=np.int32)
+
+        base = {}
+        for term in set(self._base) | set(self._segments) | set(self._pending):
+            slots, tfs = self._postings(term)
+            slots = remap[slots]
+            live = slots >= 0
+            if live.any():
+                base[term] = (slots[live], tfs[live])
+
+        self.doc_ids = [self.doc_ids[s] for s in keep]
+        self.doc_len = [self.doc_len[s] for s in keep]
+        self.alive = [True] * len(keep)
+        self.slots = {chunk_id: i for i, chunk_id in enumerate(self.doc_ids)}
+        self._base, self._cache, self._arrays = base, OrderedDict(), None
+        self._segments, self._pending = defaultdict(list), defaultdict(list)
+
+    def save(self, path):
+        """Write as a plain .npz (no pickle): one concatenated postings array with term offsets."""
+        self.compact()
+        terms = sorted(self._base)
+        lengths = [len(self._base[t][0]) for t in terms]
+        np.savez(
+            path,
+            terms=np.array(terms, dtype=str),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            slots=np.concatenate([self._base[t][0] for t in terms]) if terms else np.array([], np.int32),
+            tfs=np.concatenate([self._base[t][1] for t in terms]) if terms else np.array([], np.float32),
+            doc_ids=np.array(self.doc_ids, dtype=str),
+            doc_len=np.array(self.doc_len, dtype=np.int32),
+            params=np.array([self.k1, self.b, self.max_df_ratio]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        index = cls(*data["params"].tolist())
+        index.doc_ids = data["doc_ids"].tolist()
+        index.doc_len = data["doc_len"].tolist()
+        index.alive = [True] * len(index.doc_ids)
+        index.slots = {chunk_id: i for i, chunk_id in enumerate(index.doc_ids)}
+        index.total_len = int(sum(index.doc_len))
+        offsets, slots, tfs = data["offsets"], data["slots"], data["tfs"]
+        index._base = {
+            term: (slots[offsets[i]:offsets[i + 1]], tfs[offsets[i]:offsets[i + 1]])
+            for i, term in enumerate(data["terms"].tolist())
+        }
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Build from the chunks of an existing FAISS store (e.g. one saved before hybrid search)."""
+        index = cls()
+        ids = list(vectorstore.index_to_docstore_id.values())
+        index.add(ids, [vectorstore.docstore.search(i).page_content for i in ids])
+        return index
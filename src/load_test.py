@@ -0,0 +1,93 @@
+"""
+Load test for the question service: throughput and p50/p99 latency under concurrency.
+
+By default an in-process server is started with a stub LLM (no Gemini calls) and the
+answer cache disabled, so the numbers reflect retrieval plus serving overhead and the
+LLM concurrency limit. Point --url at a running `python -m src.server` to test that instead.
+
+Usage: python -m src.load_test [--requests 200] [--concurrency 32] [--stub-latency 0.5]
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.config import Config
+
+QUESTIONS = [
+    "How do I create a StateGraph in LangGraph?",
+    "What is the purpose of .invoke in LangChain runnables?",
+    "How can I merge two DataFrames in Pandas?",
+    "How do I add a node to a LangGraph workflow?",
+    "Explain the difference between loc and iloc in Pandas.",
+    "What is the maximum expense allowance for a meal at Acme Corp?",
+]
+
+
+def _ask(url, question):
+    request = urllib.request.Request(
+        f"{url}/ask",
+        data=json.dumps({"question": question}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        json.loads(response.read())
+    return time.perf_counter() - start
+
+
+def run_load_test(url, n_requests, concurrency):
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(_ask, url, QUESTIONS[i % len(QUESTIONS)]) for i in range(n_requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"Request failed: {e}")
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "requests": n_requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+    }
+
+
+def format_latency(report):
+    """p50/p99 line of a report; there are no percentiles when every request failed."""
+    if report["p50_ms"] is None:
+        return "Latency: n/a (no successful requests)"
+    return f"Latency: p50 {report['p50_ms']:.0f} ms, p99 {report['p99_ms']:.0f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="Existing server to test (default: start one in-process)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="Stub LLM latency in seconds")
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        from src.models import StubChatModel, set_llm
+        from src.server import create_server
+        Config.ANSWER_CACHE_ENABLED = False
+        set_llm(StubChatModel(latency=args.stub_latency))
+        server = create_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+    print(f"Sending {args.requests} requests to {url} with concurrency {args.concurrency}...")
+    report = run_load_test(url, args.requests, args.concurrency)
+    print(f"Throughput: {report['throughput_rps']:.1f} req/s over {report['seconds']:.1f}s "
+          f"({report['errors']} errors)")
+    print(format_latency(report))
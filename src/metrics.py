@@ -0,0 +1,252 @@
+"""
+Lightweight in-process instrumentation (off unless METRICS_ENABLED=true).
+
+    with span("retrieve"):        # latency histogram per span name
+        ...
+    inc("chunks_retrieved", 4)    # counters (tokens, chunks, cache hits, ...)
+
+Spans cover every graph node, the retrieval steps (query embedding, FAISS and BM25
+search, index load), the LLM call and every ingestion stage (load, split, embed, index,
+save); streamed answers also record llm_ttft (time to first token) and answer_total. Metrics are exported as Prometheus text (GET /metrics on src.server, or a
+standalone endpoint on METRICS_PORT) and/or appended as JSON lines to METRICS_JSONL_PATH.
+
+With PROFILE_SAMPLE_INTERVAL > 0, a sampling profiler records the stacks of all threads
+and writes them in collapsed format (flamegraph.pl / speedscope) to PROFILE_OUTPUT at exit.
+
+When disabled, span() returns a shared no-op context manager and inc() returns at once.
+Per-query progress lines (trace()) are only printed with LOG_QUERY_TRACE=true.
+"""
+import atexit
+import functools
+import inspect
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.config import Config
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+class MetricsRegistry:
+    """Span latency histograms and counters, shared by every thread of the process."""
+
+    def __init__(self, jsonl_path=None):
+        self.counters = Counter()
+        self.spans = {} # name -> [count, sum, errors, per-bucket counts]
+        self._lock = threading.Lock()
+        self._jsonl = open(jsonl_path, "a", buffering=1) if jsonl_path else None # line-buffered
+
+    def span(self, name):
+        return _Span(self, name)
+
+    def observe(self, name, seconds, error=False):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = [0, 0.0, 0, [0] * len(BUCKETS)]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += error
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    stats[3][i] += 1
+                    break
+            if self._jsonl:
+                self._jsonl.write(json.dumps({
+                    "ts": time.time(), "span": name, "ms": round(seconds * 1000, 3),
+                    "thread": threading.current_thread().name, "error": error,
+                }) + "\n")
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+            if self._jsonl:
+                self._jsonl.write(json.dumps({"ts": time.time(), "counter": name, "value": value}) + "\n")
+
+    def snapshot(self):
+        """Plain-dict copy: {"spans": {name: {count, total_ms, mean_ms, errors}}, "counters": {...}}."""
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"count": c, "total_ms": s * 1000, "mean_ms": s * 1000 / c, "errors": e}
+                    for name, (c, s, e, _) in self.spans.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def prometheus_text(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            "# HELP rag_span_seconds Latency of instrumented spans.",
+            "# TYPE rag_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, (count, total, errors, buckets) in sorted(self.spans.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, buckets):
+                    cumulative += n
+                    lines.append(f'rag_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'rag_span_seconds_bucket{{span="{name}",le="+Inf"}} {count}')
+                lines.append(f'rag_span_seconds_sum{{span="{name}"}} {total:.6f}')
+                lines.append(f'rag_span_seconds_count{{span="{name}"}} {count}')
+            lines += ["# HELP rag_span_errors_total Spans that raised.", "# TYPE rag_span_errors_total counter"]
+            lines += [f'rag_span_errors_total{{span="{name}"}} {s[2]}' for name, s in sorted(self.spans.items())]
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE rag_{name}_total counter")
+                lines.append(f"rag_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread every `interval` seconds from a daemon
+    thread and counts identical stacks; write() emits collapsed stacks, one per line.
+    """
+
+    def __init__(self, interval, output):
+        self.interval = interval
+        self.output = output
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self):
+        with open(self.output, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Profiler: {sum(self.samples.values())} samples written to {self.output}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = get_registry().prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry, or None when instrumentation is off. Starts the configured exporters."""
+    global _registry
+    if _registry is None and Config.METRICS_ENABLED:
+        with _registry_lock:
+            if _registry is None:
+                registry = MetricsRegistry(Config.METRICS_JSONL_PATH or None)
+                atexit.register(registry.close)
+                if Config.METRICS_PORT:
+                    server = ThreadingHTTPServer(("127.0.0.1", Config.METRICS_PORT), _MetricsHandler)
+                    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+                    print(f"Metrics on http://127.0.0.1:{Config.METRICS_PORT}/metrics")
+                if Config.PROFILE_SAMPLE_INTERVAL > 0:
+                    profiler = SamplingProfiler(Config.PROFILE_SAMPLE_INTERVAL, Config.PROFILE_OUTPUT).start()
+                    atexit.register(lambda: (profiler.stop(), profiler.write()))
+                _registry = registry
+    return _registry
+
+
+def enabled():
+    return (_registry or get_registry()) is not None
+
+
+def span(name):
+    """Context manager timing a block under `name`; a shared no-op when metrics are off."""
+    registry = _registry or get_registry()
+    return registry.span(name) if registry else _NULL_SPAN
+
+
+def inc(name, value=1):
+    registry = _registry or get_registry()
+    if registry and value:
+        registry.inc(name, value)
+
+
+def observe(name, seconds):
+    """Record a latency measured outside a span (e.g. time to the first streamed token)."""
+    registry = _registry or get_registry()
+    if registry:
+        registry.observe(name, seconds)
+
+
+def trace(message):
+    """Print a per-query progress line (---RETRIEVE---, ---CONTEXT: ...---) if LOG_QUERY_TRACE is on."""
+    if Config.LOG_QUERY_TRACE:
+        print(message)
+
+
+def timed(name):
+    """Decorator: time every call of a sync or async function as span `name`."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,177 @@
+"""
+Process-wide, lazily created model singletons.
+
+Nothing heavy happens at import time: the sentence-transformers model (PyTorch or ONNX
+Runtime, per EMBEDDING_BACKEND) is loaded on the first embedding call, the cross-encoder
+on the first rerank and the Gemini client on the first generation. All are then reused by
+every IngestionEngine, graph invocation and Streamlit rerun in the process.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from src.config import Config
+
+_lock = threading.Lock()
+_embeddings = None
+_backend_embeddings = {} # explicitly requested non-default backends, e.g. by the benchmark
+_llm = None
+_cross_encoder = None
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings wrapper that builds the underlying model on first use."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+
+def _quantized_onnx_model():
+    """
+    Export EMBEDDING_MODEL to ONNX with int8 dynamic quantization (once, into ONNX_MODEL_DIR).
+    Returns (model directory, quantized file name inside it).
+    """
+    path = os.path.join(Config.ONNX_MODEL_DIR, Config.EMBEDDING_MODEL.replace("/", "__"))
+    file_name = f"onnx/model_qint8_{Config.ONNX_QUANTIZATION}.onnx"
+    if not os.path.exists(os.path.join(path, file_name)):
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+        print(f"Exporting {Config.EMBEDDING_MODEL} to int8 ONNX ({Config.ONNX_QUANTIZATION}) in {path}...")
+        model = SentenceTransformer(Config.EMBEDDING_MODEL, backend="onnx")
+        model.save(path)
+        export_dynamic_quantized_onnx_model(model, Config.ONNX_QUANTIZATION, path)
+    return path, file_name
+
+
+def _backend_model_kwargs(backend):
+    """(model name or path, SentenceTransformer kwargs) for an embedding backend."""
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected one of {EMBEDDING_BACKENDS}")
+    if backend == "torch":
+        if Config.EMBEDDING_THREADS:
+            import torch
+            torch.set_num_threads(Config.EMBEDDING_THREADS)
+        return Config.EMBEDDING_MODEL, {}
+
+    session_kwargs = {}
+    if Config.EMBEDDING_THREADS:
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = Config.EMBEDDING_THREADS
+        session_kwargs["session_options"] = options
+    model_name = Config.EMBEDDING_MODEL
+    if backend == "onnx_int8":
+        model_name, session_kwargs["file_name"] = _quantized_onnx_model()
+    return model_name, {"backend": "onnx", "model_kwargs": session_kwargs}
+
+
+def _load_huggingface_embeddings(backend=None):
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    model_name, model_kwargs = _backend_model_kwargs(backend or Config.EMBEDDING_BACKEND)
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        # Unit-length vectors so queries match the normalized index rows
+        encode_kwargs={"normalize_embeddings": True}
+    )
+
+
+def get_embeddings(backend=None):
+    """
+    Shared embedding model (local, so no API rate limits); loads on first embed call.
+    backend overrides Config.EMBEDDING_BACKEND, with one shared instance per backend.
+    """
+    global _embeddings
+    if backend and backend != Config.EMBEDDING_BACKEND:
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS}")
+        with _lock:
+            if backend not in _backend_embeddings:
+                _backend_embeddings[backend] = LazyEmbeddings(lambda: _load_huggingface_embeddings(backend))
+        return _backend_embeddings[backend]
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = LazyEmbeddings(_load_huggingface_embeddings)
+    return _embeddings
+
+
+def get_cross_encoder():
+    """Shared sentence-transformers CrossEncoder for reranking; loaded on first call."""
+    global _cross_encoder
+    if _cross_encoder is None:
+        with _lock:
+            if _cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+                _cross_encoder = CrossEncoder(Config.RERANK_MODEL)
+    return _cross_encoder
+
+
+def get_llm():
+    """Shared Gemini chat client, or None if no API key is configured."""
+    global _llm
+    if _llm is not None:
+        return _llm
+    if not Config.GOOGLE_API_KEY:
+        return None
+    with _lock:
+        if _llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            _llm = ChatGoogleGenerativeAI(
+                model=Config.MODEL_NAME,
+                google_api_key=Config.GOOGLE_API_KEY,
+                temperature=0
+            )
+    return _llm
+
+
+def set_llm(llm):
+    """Replace the shared LLM, e.g. with a StubChatModel for offline load tests."""
+    global _llm
+    _llm = llm
+
+
+class StubChatModel(BaseChatModel):
+    """Offline stand-in for Gemini: answers after a fixed latency without any API call."""
+
+    latency: float = 0.5
+    response: str = "Stub answer."
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
@@ -0,0 +1,83 @@
+"""
+Cross-encoder reranking with a process-wide cache of (question, chunk) scores.
+
+A cross-encoder reads the question and chunk together, so it ranks far better than
+embedding distance but costs a model pass per pair. Pairs are scored in batches and
+cached, so repeated or overlapping questions only pay for chunks not seen before.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from src.config import Config
+from src.metrics import inc, span, trace
+from src.models import get_cross_encoder
+
+
+class CrossEncoderReranker:
+    def __init__(self, model=None, max_cache_entries=None):
+        self._model = model
+        self.max_cache_entries = max_cache_entries or Config.RERANK_CACHE_SIZE
+        self._scores = OrderedDict() # pair key -> score, least recently used first
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_cross_encoder()
+        return self._model
+
+    @staticmethod
+    def _key(question, text):
+        return hashlib.sha256(f"{question}\0{text}".encode("utf-8")).hexdigest()
+
+    def score(self, question, texts):
+        """Relevance score per text; returns (scores, number of pairs served from cache)."""
+        keys = [self._key(question, t) for t in texts]
+        scores = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[i] = self._scores[key]
+        missing = [i for i, s in enumerate(scores) if s is None]
+        if missing:
+            with span("rerank_predict"):
+                fresh = self.model.predict(
+                    [(question, texts[i]) for i in missing], batch_size=Config.RERANK_BATCH_SIZE
+                )
+            with self._lock:
+                for i, value in zip(missing, fresh):
+                    scores[i] = float(value)
+                    self._scores[keys[i]] = scores[i]
+                while len(self._scores) > self.max_cache_entries:
+                    self._scores.popitem(last=False)
+        inc("rerank_cached_scores", len(texts) - len(missing))
+        inc("rerank_scored_pairs", len(missing))
+        return scores, len(texts) - len(missing)
+
+    def rerank(self, question, docs, top_k):
+        """Return the top_k docs by cross-encoder score, best first."""
+        if not docs:
+            return []
+        start = time.perf_counter()
+        scores, cached = self.score(question, [d.page_content for d in docs])
+        ranked = sorted(zip(scores, range(len(docs))), key=lambda x: x[0], reverse=True)
+        kept = [docs[i] for _, i in ranked[:top_k]]
+        trace(f"---RERANK: {len(docs)} candidates ({cached} cached scores) -> top {len(kept)} "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms---")
+        return kept
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    """Process-wide reranker, so the score cache is shared by every request."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = CrossEncoderReranker()
+    return _reranker
@@ -0,0 +1,120 @@
+"""
+Chunk retrieval shared by the graph and batch runs.
+
+Searches one or more collection shards (in parallel when there are several). Dense hits
+are merged by distance (same embedding model, so distances are comparable). BM25 scores
+are not comparable across shards (each has its own IDF and average length), so with
+HYBRID_SEARCH on, the merged dense ranking and every shard's BM25 ranking are each cut to
+HYBRID_FETCH_K candidates and combined with weighted reciprocal-rank fusion; otherwise
+the dense ranking is used as-is.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from src.config import Config
+from src.metrics import span
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _search_pool():
+    """Threads for searching shards concurrently (FAISS releases the GIL while searching)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=len(Config.COLLECTIONS) + 1, thread_name_prefix="shard-search"
+                )
+    return _pool
+
+
+def rrf_fuse(rankings, weights, rrf_k=None):
+    """
+    Merge ranked ID lists: score(id) = sum of weight / (rrf_k + rank) over the lists
+    it appears in (rank starting at 1). Returns IDs, best first.
+    """
+    rrf_k = Config.RRF_K if rrf_k is None else rrf_k
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _as_list(stores):
+    if isinstance(stores, dict):
+        return list(stores.values())
+    if isinstance(stores, (list, tuple)):
+        return list(stores)
+    return [stores]
+
+
+def search_many(stores, questions, vectors, k):
+    """
+    Top-k chunk IDs per question across shards, with one multi-query FAISS search per shard.
+    vectors holds one unit-length query embedding per question.
+    Returns (ID lists, {chunk id: vector store holding it}).
+    """
+    stores = _as_list(stores)
+    hybrid = Config.HYBRID_SEARCH and any(getattr(s, "lexical", None) is not None for s in stores)
+    fetch_k = max(k, Config.HYBRID_FETCH_K) if hybrid else k
+    vectors = np.asarray(vectors, dtype=np.float32)
+
+    def search(store):
+        with span("faiss_search"):
+            distances, rows = store.index.search(vectors, fetch_k)
+            dense = [
+                [(float(d), store.index_to_docstore_id[int(r)]) for d, r in zip(d_row, r_row) if r != -1]
+                for d_row, r_row in zip(distances, rows)
+            ]
+        lexical = getattr(store, "lexical", None)
+        with span("bm25_search"):
+            bm25 = [lexical.search(q, fetch_k) if hybrid and lexical is not None else [] for q in questions]
+        return store, dense, bm25
+
+    if len(stores) == 1:
+        results = [search(stores[0])]
+    else:
+        results = list(_search_pool().map(search, stores))
+
+    owners = {}
+    for store, dense, bm25 in results:
+        owners.update((doc_id, store) for hits in dense for _, doc_id in hits)
+        owners.update((doc_id, store) for hits in bm25 for doc_id, _ in hits)
+
+    ranked = []
+    for qi in range(len(questions)):
+        dense = [doc_id for _, doc_id in sorted(h for _, d, _ in results for h in d[qi])]
+        if not hybrid:
+            ranked.append(dense[:k])
+            continue
+        bm25 = [[doc_id for doc_id, _ in b[qi][:fetch_k]] for _, _, b in results if b[qi]]
+        fused = rrf_fuse(
+            [dense[:fetch_k]] + bm25,
+            [Config.HYBRID_DENSE_WEIGHT] + [Config.HYBRID_LEXICAL_WEIGHT] * len(bm25),
+        )
+        ranked.append(fused[:k])
+    return ranked, owners
+
+
+def get_documents(owners, ids):
+    """Look chunk IDs up in the docstore of the shard holding them, skipping any that are gone."""
+    docs = []
+    with span("fetch_chunks"):
+        for doc_id in ids:
+            doc = owners[doc_id].docstore.search(doc_id)
+            if not isinstance(doc, str): # InMemoryDocstore returns a message for unknown IDs
+                docs.append(doc)
+    return docs
+
+
+def retrieve_documents(stores, question, k=None):
+    """Top-k chunks for a question from one vector store, or a list/dict of collection shards."""
+    k = k or Config.RETRIEVAL_K
+    stores = _as_list(stores)
+    with span("embed_query"):
+        vector = stores[0].embedding_function.embed_query(question)
+    ranked, owners = search_many(stores, [question], [vector], k)
+    return get_documents(owners, ranked[0])
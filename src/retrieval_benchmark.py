@@ -0,0 +1,173 @@
+"""
+LLM-free retrieval quality benchmark.
+
+Chunks a corpus (data/ by default, or the files/directories given with --corpus) under
+each chunk size, builds each index type, and scores retrieval for every question in
+src/manage_dataset.py. A chunk is a gold passage for a question when it contains one of
+the example's "evidence" phrases; questions without any gold chunk in the corpus are
+skipped. Retrieval goes through the same search_many as the app, dense-only or hybrid.
+
+Reports recall@k, MRR, nDCG@k, p50/p99 search latency and index build time for every
+(chunk size, index type, mode) combination in one table.
+
+Usage: python -m src.retrieval_benchmark [--corpus data docs/] [--k 4]
+           [--chunk-sizes 500,1000,1500] [--index-types flat,hnsw] [--modes dense,hybrid]
+"""
+import argparse
+import math
+import os
+import time
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.config import Config
+from src.lexical import BM25Index
+from src.retrieval import search_many
+from src.vector_store import build_index
+
+MODES = ("dense", "hybrid")
+
+
+def load_corpus(engine, paths):
+    docs = []
+    for path in paths:
+        docs.extend(engine.load_directory(path) if os.path.isdir(path) else engine.load_files([path]))
+    return docs
+
+
+def gold_labels(examples, chunks):
+    """Per answerable example: (question, set of chunk positions containing its evidence)."""
+    lowered = [c.page_content.lower() for c in chunks]
+    labeled = []
+    for example in examples:
+        phrases = [p.lower() for p in example.get("evidence", [])]
+        gold = {i for i, text in enumerate(lowered) if any(p in text for p in phrases)}
+        if gold:
+            labeled.append((example["input"], gold))
+    return labeled
+
+
+def score_ranking(ranked, gold, k):
+    """(recall@k, reciprocal rank, nDCG@k) for one ranked list of chunk positions."""
+    top = ranked[:k]
+    hits = [1 if i in gold else 0 for i in top]
+    recall = sum(hits) / min(len(gold), k)
+    rr = next((1 / (rank + 1) for rank, hit in enumerate(hits) if hit), 0.0)
+    dcg = sum(hit / math.log2(rank + 2) for rank, hit in enumerate(hits))
+    ideal = sum(1 / math.log2(rank + 2) for rank in range(min(len(gold), k)))
+    return recall, rr, dcg / ideal
+
+
+def _split(docs, chunk_size, overlap):
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=int(chunk_size * overlap),
+        separators=["\n\n", "\n", " ", ""]
+    )
+    return splitter.split_documents(docs)
+
+
+def _store(engine, chunks, vectors, index_type):
+    """A FAISS store (plus BM25 index) over the chunks; chunk IDs are their positions."""
+    start = time.perf_counter()
+    index = build_index(vectors, index_type)
+    build_seconds = time.perf_counter() - start
+    ids = [str(i) for i in range(len(chunks))]
+    store = FAISS(
+        embedding_function=engine.embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    store.lexical = BM25Index()
+    store.lexical.add(ids, [c.page_content for c in chunks])
+    return store, build_seconds
+
+
+def _evaluate(store, labeled, query_vectors, k, hybrid):
+    original = Config.HYBRID_SEARCH
+    Config.HYBRID_SEARCH = hybrid
+    try:
+        metrics, latencies = [], []
+        for (question, gold), vector in zip(labeled, query_vectors):
+            start = time.perf_counter()
+            ranked, _ = search_many(store, [question], vector[None, :], k)
+            latencies.append(time.perf_counter() - start)
+            metrics.append(score_ranking([int(i) for i in ranked[0]], gold, k))
+    finally:
+        Config.HYBRID_SEARCH = original
+    recall, mrr, ndcg = np.mean(metrics, axis=0)
+    latencies = np.array(latencies) * 1000
+    return {
+        f"recall@{k}": float(recall),
+        "mrr": float(mrr),
+        f"ndcg@{k}": float(ndcg),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_benchmark(engine, docs, examples, chunk_sizes, index_types, modes, k=4, overlap=0.2):
+    """Return one result dict per (chunk size, index type, mode)."""
+    results = []
+    for chunk_size in chunk_sizes:
+        chunks = _split(docs, chunk_size, overlap)
+        labeled = gold_labels(examples, chunks)
+        if not labeled:
+            print(f"chunk size {chunk_size}: no question has a gold passage in the corpus; skipping.")
+            continue
+        vectors = engine.embed_texts([c.page_content for c in chunks])
+        query_vectors = engine.embed_texts([question for question, _ in labeled])
+        for index_type in index_types:
+            store, build_seconds = _store(engine, chunks, vectors, index_type)
+            for mode in modes:
+                result = {
+                    "chunk_size": chunk_size,
+                    "chunks": len(chunks),
+                    "index": index_type,
+                    "mode": mode,
+                    "questions": len(labeled),
+                    "build_s": build_seconds,
+                }
+                result.update(_evaluate(store, labeled, query_vectors, k, mode == "hybrid"))
+                results.append(result)
+    return results
+
+
+def print_report(results, k):
+    print(f"{'chunk':>6} {'chunks':>7} {'index':<9} {'mode':<7} {'qs':>4} {'recall@' + str(k):>9} "
+          f"{'MRR':>6} {'nDCG@' + str(k):>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for r in results:
+        print(f"{r['chunk_size']:>6} {r['chunks']:>7} {r['index']:<9} {r['mode']:<7} {r['questions']:>4} "
+              f"{r[f'recall@{k}']:>9.3f} {r['mrr']:>6.3f} {r[f'ndcg@{k}']:>7.3f} "
+              f"{r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['build_s']:>8.3f}")
+
+
+def _csv(value, cast=str):
+    return [cast(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", nargs="+", default=[os.path.join(Config.PROJECT_ROOT, "data")])
+    parser.add_argument("--k", type=int, default=Config.RETRIEVAL_K)
+    parser.add_argument("--chunk-sizes", type=lambda v: _csv(v, int), default=[500, 1000, 1500])
+    parser.add_argument("--overlap", type=float, default=0.2, help="Chunk overlap as a fraction of chunk size")
+    parser.add_argument("--index-types", type=_csv, default=[Config.VECTOR_INDEX_TYPE])
+    parser.add_argument("--modes", type=_csv, default=list(MODES))
+    args = parser.parse_args()
+    unknown = [m for m in args.modes if m not in MODES]
+    if unknown:
+        raise SystemExit(f"Unknown modes {unknown}, expected some of {list(MODES)}")
+
+    from src.ingestion import IngestionEngine
+    from src.manage_dataset import examples
+
+    engine = IngestionEngine()
+    docs = load_corpus(engine, args.corpus)
+    if not docs:
+        raise SystemExit("No documents found in the corpus.")
+    results = run_benchmark(engine, docs, examples, args.chunk_sizes, args.index_types, args.modes,
+                            args.k, args.overlap)
+    print_report(results, args.k)
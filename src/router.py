@@ -0,0 +1,112 @@
+"""
+LLM-free question router.
+
+Decides per turn whether a question needs retrieval:
+  - "direct":  greetings / thanks, or questions far from everything in the corpus
+               (cosine similarity to the corpus centroid below ROUTER_MIN_CORPUS_SIM);
+               answered without context.
+  - "history": short follow-ups in a thread ("show an example of that") whose content
+               words are already covered by the previous turn; answered from the
+               previously retrieved context plus recent turns.
+  - "retrieve": everything else.
+"""
+import re
+import threading
+import numpy as np
+from src.config import Config
+from src.lexical import tokenize
+from src.metrics import trace
+
+ROUTES = ("retrieve", "history", "direct")
+
+_CHITCHAT = re.compile(
+    r"^(hi|hello|hey|thanks|thank you|thx|ok|okay|cool|great|nice|bye|goodbye|"
+    r"good (morning|afternoon|evening))( (you|so much|a lot|again|there|everyone|all))?[\s!.?]*$"
+)
+_FOLLOWUP = re.compile(
+    r"\b(it|its|that|this|these|those|them|they|above|previous|earlier|same|more|"
+    r"elaborate|example|examples|again|why|instead)\b"
+)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from give how i in is it its me "
+    "more my of on or please show tell than that the them these they this those to use "
+    "using was what when where which why will with would you your".split()
+)
+
+
+def _content_words(text):
+    return {w for w in tokenize(text) if w not in _STOPWORDS and len(w) > 2 and not w.isdigit()}
+
+
+class QuestionRouter:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self._centroid = None
+        self._centroid_version = None
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(ROUTES, 0)
+
+    def _corpus_centroid(self, stores, version):
+        """Unit-length mean of (a sample of) the vectors of every shard, computed once per index version."""
+        with self._lock:
+            if version != self._centroid_version:
+                self._centroid_version = version
+                self._centroid = None
+                try:
+                    sample = np.vstack([
+                        store.index.reconstruct_n(0, min(store.index.ntotal, 10000)) for store in stores
+                    ])
+                    centroid = sample.mean(axis=0)
+                    self._centroid = centroid / (np.linalg.norm(centroid) + 1e-12)
+                except RuntimeError:
+                    pass # IVF without a direct map: skip the off-corpus check
+            return self._centroid
+
+    def classify(self, question, history, context, stores=None, version=None, query_vector=None):
+        """Return (route, reason). query_vector is the question's embedding, if already computed."""
+        text = question.strip().lower()
+        if _CHITCHAT.match(text):
+            return "direct", "small talk"
+
+        if history and context:
+            words = text.split()
+            previous = history[-1]
+            known = _content_words(f"{previous['question']} {previous['answer']} {context}")
+            novel = _content_words(question) - known
+            if (len(words) <= Config.ROUTER_FOLLOWUP_MAX_WORDS and _FOLLOWUP.search(text)
+                    and len(novel) <= Config.ROUTER_MAX_NOVEL_TERMS):
+                return "history", "follow-up"
+
+        if stores and Config.ROUTER_MIN_CORPUS_SIM > 0:
+            centroid = self._corpus_centroid(stores, version)
+            if centroid is not None:
+                if query_vector is None:
+                    query_vector = self.embeddings.embed_query(question)
+                query = np.asarray(query_vector, dtype=np.float32)
+                similarity = float(query @ centroid / (np.linalg.norm(query) + 1e-12))
+                if similarity < Config.ROUTER_MIN_CORPUS_SIM:
+                    return "direct", f"off-corpus (similarity {similarity:.2f})"
+        return "retrieve", "needs documents"
+
+    def route(self, question, history, context, stores=None, version=None, query_vector=None):
+        route, reason = self.classify(question, history, context, stores, version, query_vector)
+        with self._lock:
+            self.counts[route] += 1
+            total = sum(self.counts.values())
+            skipped = total - self.counts["retrieve"]
+        trace(f"---ROUTE: {route} ({reason}); {skipped}/{total} turns skipped retrieval---")
+        return route
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router(embeddings):
+    """Process-wide router (shares the corpus centroid across requests)."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = QuestionRouter(embeddings)
+    return _router
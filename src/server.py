@@ -0,0 +1,152 @@
+"""
+Lightweight HTTP/JSON question-answering service.
+
+One process serves many concurrent questions: HTTP connections are handled on threads,
+and every question runs through the async graph (app.ainvoke) on a single shared event
+loop, reusing the resident vector store and capping in-flight LLM calls at
+Config.LLM_MAX_CONCURRENCY.
+
+    POST /ask     {"question": "...", "thread_id": "optional", "collections": ["optional", ...]}
+                  -> {"answer", "context", "cache_hit", "latency_ms"}
+    GET  /health  -> {"status": "ok", "index_version": ...}
+    GET  /metrics -> Prometheus text (with METRICS_ENABLED=true)
+
+Usage: python -m src.server [--host 127.0.0.1] [--port 8000] [--stub-llm 0.5]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from langchain_core.messages import HumanMessage
+from src.config import Config
+from src.metrics import get_registry
+from src.shards import select_collections
+
+
+class QuestionService:
+    """Owns the event loop that runs the async graph for every request."""
+
+    def __init__(self):
+        from src.graph import app as rag_app, ingestion
+        self.rag_app = rag_app
+        self.ingestion = ingestion
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def warm_up(self):
+        """Load the embedding model and every collection shard before the first request."""
+        self.ingestion.embeddings.embed_query("warm up")
+        self.ingestion.get_vector_stores()
+
+    async def _answer(self, question, thread_id, collections=None):
+        start = time.perf_counter()
+        # Always set collections, so a thread doesn't keep an earlier request's selection
+        inputs = {
+            "question": question,
+            "messages": [HumanMessage(content=question)],
+            "collections": collections or [],
+        }
+        result = await self.rag_app.ainvoke(
+            inputs,
+            config={"configurable": {"thread_id": thread_id}}
+        )
+        return {
+            "answer": result["messages"][-1].content,
+            "context": result.get("context", ""),
+            "cache_hit": result.get("cache_hit", False),
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        }
+
+    def answer(self, question, thread_id=None, collections=None):
+        """Blocking entry point used by the HTTP handler threads."""
+        future = asyncio.run_coroutine_threadsafe(
+            self._answer(question, thread_id or str(uuid.uuid4()), collections), self.loop
+        )
+        return future.result()
+
+    def index_version(self):
+        return self.ingestion.index_version()
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {"status": "ok", "index_version": service.index_version()})
+            elif self.path == "/metrics" and get_registry() is not None:
+                body = get_registry().prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/ask":
+                self._send_json(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                question = payload["question"]
+                collections = payload.get("collections")
+                if collections:
+                    select_collections(question, collections) # reject unknown names up front
+            except (ValueError, KeyError):
+                self._send_json(400, {"error": "expected JSON body with a 'question' field "
+                                               "and optional known 'collections'"})
+                return
+            try:
+                self._send_json(200, service.answer(question, payload.get("thread_id"), collections))
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass # keep request logging off the hot path
+
+    return Handler
+
+
+def create_server(host=None, port=None):
+    """Build (but don't start) the HTTP server; port 0 picks a free port."""
+    service = QuestionService()
+    service.warm_up()
+    server = ThreadingHTTPServer(
+        (host or Config.SERVER_HOST, Config.SERVER_PORT if port is None else port),
+        make_handler(service),
+    )
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--stub-llm", type=float, metavar="SECONDS", default=None,
+                        help="Answer with a stub LLM of this latency instead of Gemini")
+    args = parser.parse_args()
+
+    if args.stub_llm is not None:
+        from src.models import StubChatModel, set_llm
+        set_llm(StubChatModel(latency=args.stub_llm))
+
+    server = create_server(args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serving questions on http://{host}:{port} (POST /ask, GET /health, GET /metrics)")
+    server.serve_forever()
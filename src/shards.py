@@ -0,0 +1,56 @@
+"""
+Named collections: one FAISS index shard per library (Config.COLLECTIONS).
+
+Every shard is a normal versioned vector store directory with its own CURRENT pointer,
+manifest and BM25 index, so ingestion, hot reload and pruning work per shard.
+"""
+import os
+from src.config import Config
+
+
+def collection_names():
+    return list(Config.COLLECTIONS) + [Config.DEFAULT_COLLECTION]
+
+
+def collection_path(name=None):
+    """Directory of a collection's shard; the default collection is the original VECTOR_STORE_PATH."""
+    name = name or Config.DEFAULT_COLLECTION
+    if name == Config.DEFAULT_COLLECTION:
+        return Config.VECTOR_STORE_PATH
+    if name not in Config.COLLECTIONS:
+        raise ValueError(f"Unknown collection '{name}', expected one of {collection_names()}")
+    return f"{Config.VECTOR_STORE_PATH}_{name}"
+
+
+def collection_of(source):
+    """Collection a source (file path or URL) belongs to, by keyword."""
+    source = str(source)
+    if source.startswith(Config.PROJECT_ROOT):
+        source = source[len(Config.PROJECT_ROOT):] # don't match on where the project is checked out
+    source = source.lower()
+    for name, keywords in Config.COLLECTIONS.items():
+        if any(keyword in source for keyword in keywords):
+            return name
+    return Config.DEFAULT_COLLECTION
+
+
+def select_collections(question, explicit=None):
+    """
+    Shards to search: the explicit list if given, else the collections whose keywords
+    appear in the question, else all of them (None).
+    """
+    if explicit:
+        unknown = [name for name in explicit if name not in collection_names()]
+        if unknown:
+            raise ValueError(f"Unknown collections {unknown}, expected some of {collection_names()}")
+        return list(explicit)
+    question = question.lower()
+    inferred = [
+        name for name, keywords in Config.COLLECTIONS.items()
+        if any(keyword in question for keyword in keywords)
+    ]
+    return inferred or None
+
+
+def shard_exists(name):
+    return os.path.isdir(collection_path(name))
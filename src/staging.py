@@ -0,0 +1,187 @@
+"""
+Staging area of an ingestion run, one per shard: <shard>/staging.sqlite.
+
+Chunks added by the run (text, metadata and vector) and the IDs it removes are written here
+as they happen, so the writer's docstore lives on disk on top of the chunks of the base
+version, instead of in memory. A checkpoint only commits what was staged since the last one,
+together with the manifest entries that changed; nothing is published until the run ends
+and saves a new version.
+
+After a crash, the next run reloads the base version and replays the staging area onto it,
+as long as the base is still the live version; otherwise the staged changes are discarded.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+from src.vector_store import acquire_lease, release_lease, resolve_index_path
+
+STAGING_FILE = "staging.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS added (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL, metadata TEXT NOT NULL, vector BLOB
+);
+CREATE TABLE IF NOT EXISTS removed (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, entry TEXT);
+"""
+
+
+class StagingDocstore(Docstore, AddableMixin):
+    """Writer docstore: chunks staged by this run, over the read-only chunks of the base version."""
+
+    def __init__(self, staging, base=None):
+        self.staging = staging
+        self.base = base
+
+    def add(self, texts):
+        if self.staging.replaying:
+            return
+        rows = [(i, doc.page_content, json.dumps(doc.metadata, default=str)) for i, doc in texts.items()]
+        try:
+            self.staging.execute("INSERT INTO added (id, text, metadata) VALUES (?, ?, ?)", rows, many=True)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Tried to add ids that already exist: {e}")
+
+    def delete(self, ids):
+        if self.staging.replaying:
+            return
+        rows = [(i,) for i in ids]
+        self.staging.execute("DELETE FROM added WHERE id = ?", rows, many=True)
+        self.staging.execute("INSERT OR IGNORE INTO removed VALUES (?)", rows, many=True)
+
+    def search(self, search):
+        found = self.staging.execute("SELECT text, metadata FROM added WHERE id = ?", (search,))
+        if found:
+            text, metadata = found[0]
+            return Document(id=search, page_content=text, metadata=json.loads(metadata))
+        if self.base is None or self.staging.execute("SELECT 1 FROM removed WHERE id = ?", (search,)):
+            return f"ID {search} not found." # same contract as InMemoryDocstore
+        return self.base.search(search)
+
+
+class StagingArea:
+    """The staged, not yet published changes of an ingestion run to one shard."""
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.path = os.path.join(base_path, STAGING_FILE)
+        self.version, self.version_path = resolve_index_path(base_path)
+        self.replaying = False
+        self._lock = threading.Lock()
+        self._db = None
+        self._lease = None
+        # Untouched shards get no staging file (nor directory)
+        self.resumed = os.path.exists(self.path) and self._open()
+        if self.version_path:
+            self._lease = acquire_lease(self.version_path) # the base's chunks are read until the run ends
+
+    @property
+    def _conn(self):
+        if self._db is None:
+            self._open()
+        return self._db
+
+    def _open(self):
+        """Open (creating if needed) the staging database; returns whether it holds staged changes."""
+        os.makedirs(self.base_path, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        found = self._db.execute("SELECT value FROM meta WHERE key = 'base'").fetchone()
+        if found and found[0] != (self.version or "") and self._has_changes():
+            print(f"Discarding changes staged on version {found[0] or '(none)'} in {self.base_path}: "
+                  f"version {self.version} is live now.")
+            self._db.executescript("DELETE FROM added; DELETE FROM removed; DELETE FROM sources;")
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('base', ?)", (self.version or "",))
+        self._db.commit()
+        return self._has_changes()
+
+    def _has_changes(self):
+        return any(
+            self._db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone()
+            for table in ("added", "removed", "sources")
+        )
+
+    def execute(self, sql, params=(), many=False):
+        with self._lock:
+            if many:
+                self._conn.executemany(sql, params)
+                return None
+            return self._conn.execute(sql, params).fetchall()
+
+    def docstore(self, base=None):
+        """Docstore that stages additions and removals here, over the base version's docstore."""
+        return StagingDocstore(self, base)
+
+    def store_vectors(self, ids, vectors):
+        """Keep the vectors of staged chunks, so a resumed run can re-add them without embedding."""
+        if not self.replaying:
+            rows = [(np.asarray(v, dtype=np.float32).tobytes(), i) for i, v in zip(ids, vectors)]
+            self.execute("UPDATE added SET vector = ? WHERE id = ?", rows, many=True)
+
+    def checkpoint(self, entries):
+        """Commit everything staged so far with the manifest entries that changed ({source: entry or None})."""
+        rows = [(s, None if e is None else json.dumps(e)) for s, e in entries.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO sources VALUES (?, ?)", rows)
+            self._conn.commit()
+
+    def staged_sources(self):
+        """{source: manifest entry, or None if the run removed the source} from the last checkpoint."""
+        return {
+            source: None if entry is None else json.loads(entry)
+            for source, entry in self.execute("SELECT source, entry FROM sources")
+        }
+
+    def removed_ids(self):
+        return [r[0] for r in self.execute("SELECT id FROM removed")]
+
+    def iter_added(self, batch_size):
+        """Yield (documents, ids, vectors) of the staged chunks in the order they were added."""
+        last = 0
+        while True:
+            rows = self.execute(
+                "SELECT seq, id, text, metadata, vector FROM added WHERE seq > ? AND vector IS NOT NULL "
+                "ORDER BY seq LIMIT ?", (last, batch_size),
+            )
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield (
+                [Document(id=i, page_content=t, metadata=json.loads(m)) for _, i, t, m, _ in rows],
+                [r[1] for r in rows],
+                np.vstack([np.frombuffer(r[4], dtype=np.float32) for r in rows]),
+            )
+
+    @contextmanager
+    def replay(self):
+        """Re-apply staged changes to a freshly loaded store without staging them again."""
+        self.replaying = True
+        try:
+            yield
+        finally:
+            self.replaying = False
+
+    def close(self):
+        """Drop uncommitted changes and the lease on the base; checkpointed changes stay staged."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._lease is not None:
+            release_lease(self._lease)
+            self._lease = None
+
+    def discard(self):
+        """Remove the staging area, once its changes are published."""
+        self.close()
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            try:
+                os.remove(self.path + suffix)
+            except FileNotFoundError:
+                pass
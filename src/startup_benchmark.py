@@ -0,0 +1,73 @@
+"""
+Cold-start benchmark: import time of each app module in a fresh interpreter, plus the
+one-off cost of loading the embedding model and serving the first retrieval.
+
+Usage: python -m src.startup_benchmark [--runs 5]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from src.config import Config
+
+MODULES = ["streamlit", "src.config", "src.models", "src.vector_store", "src.ingestion", "src.graph"]
+
+_IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def import_time_ms(module, runs):
+    """Median wall time (ms) to import a module in a fresh interpreter."""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", _IMPORT_SNIPPET.format(module=module)],
+            cwd=Config.PROJECT_ROOT, capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return None
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def first_use_ms():
+    """Time the lazy steps the first question pays for, in this process."""
+    from src.models import get_embeddings
+    from src.ingestion import IngestionEngine
+
+    timings = {}
+    start = time.perf_counter()
+    ingestion = IngestionEngine()
+    timings["IngestionEngine()"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    get_embeddings().embed_query("warm up")
+    timings["embedding model load + first query"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    stores = ingestion.get_vector_stores()
+    timings["vector store load (all shards)"] = (time.perf_counter() - start) * 1000
+    if stores:
+        from src.retrieval import retrieve_documents
+        start = time.perf_counter()
+        retrieve_documents(stores, "How do I create a StateGraph?")
+        timings["warm retrieval"] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'import':<40} {'median ms':>10}")
+    for module in MODULES:
+        ms = import_time_ms(module, args.runs)
+        print(f"{module:<40} {ms:>10.1f}" if ms is not None else f"{module:<40} {'failed':>10}")
+
+    print(f"\n{'first use':<40} {'ms':>10}")
+    for step, ms in first_use_ms().items():
+        print(f"{step:<40} {ms:>10.1f}")
@@ -0,0 +1,361 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from src.config import Config
+from src.docstore import (
+    DOCSTORE_FILE, SqliteDocstore, SqliteRowMap, read_all_chunks, read_index, write_index_files
+)
+from src.lexical import LEXICAL_FILE, BM25Index
+from src.metrics import timed
+
+# Pointer file naming the live index version inside Config.VECTOR_STORE_PATH
+CURRENT_FILE = "CURRENT"
+# Per-version record of which chunk IDs came from which source
+MANIFEST_FILE = "manifest.json"
+
+
+def resolve_index_path(base_path=None):
+    """
+    Return (version, path) of the live index, or (None, None) if nothing is saved.
+    Falls back to the legacy flat layout (index.faiss directly in base_path).
+    """
+    base_path = base_path or Config.VECTOR_STORE_PATH
+    current = os.path.join(base_path, CURRENT_FILE)
+    try:
+        with open(current) as f:
+            version = f.read().strip()
+        if version:
+            return version, os.path.join(base_path, version)
+    except FileNotFoundError:
+        pass
+
+    legacy = os.path.join(base_path, "index.faiss")
+    if os.path.exists(legacy):
+        return f"legacy-{os.path.getmtime(legacy)}", base_path
+    return None, None
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+
+def _ivf_nlist(n_vectors):
+    """Configured IVF list count, or ~4*sqrt(n) capped so every list gets enough training points."""
+    nlist = Config.IVF_NLIST or int(4 * np.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // 39))
+
+
+def build_index(vectors, index_type=None):
+    """
+    Build a populated FAISS index of the given type from a float32 matrix.
+    Falls back to a flat index when there are too few vectors to train on.
+    """
+    index_type = index_type or Config.VECTOR_INDEX_TYPE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown VECTOR_INDEX_TYPE '{index_type}', expected one of {INDEX_TYPES}")
+    n, dimension = vectors.shape
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, Config.HNSW_M)
+        index.hnsw.efConstruction = Config.HNSW_EF_CONSTRUCTION
+    elif index_type == "ivf_flat" and n >= 39:
+        index = faiss.index_factory(dimension, f"IVF{_ivf_nlist(n)},Flat")
+    elif index_type == "ivf_pq" and n >= 39 * 2 ** Config.PQ_NBITS and dimension % Config.PQ_M == 0:
+        index = faiss.index_factory(dimension, f"IVF{_ivf_nlist(n)},PQ{Config.PQ_M}x{Config.PQ_NBITS}")
+    else:
+        if index_type != "flat":
+            print(f"Not enough vectors ({n}) to train a {index_type} index; using flat.")
+        index = faiss.IndexFlatL2(dimension)
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index):
+    """Apply the configured nprobe / efSearch to an IVF or HNSW index."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = Config.HNSW_EF_SEARCH
+        return
+    try:
+        faiss.extract_index_ivf(index).nprobe = Config.IVF_NPROBE
+    except RuntimeError:
+        pass # Flat index, nothing to tune
+
+
+def supports_removal(index):
+    """
+    Only flat indexes delete in place: remove_ids compacts them, so rows stay aligned with
+    the docstore mapping that FAISS.delete renumbers. HNSW graphs cannot delete at all and
+    IVF lists keep the old ids after a removal, so both are rebuilt instead.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+
+_direct_map_lock = threading.Lock()
+
+
+def _ensure_direct_map(index):
+    """IVF indexes need a row -> list entry map before they can reconstruct vectors."""
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.type == faiss.DirectMap.NoMap:
+        with _direct_map_lock:
+            if index.direct_map.type == faiss.DirectMap.NoMap:
+                index.make_direct_map()
+
+
+def all_vectors(index):
+    """Reconstruct every stored vector (exact for flat and HNSW, approximate for PQ)."""
+    _ensure_direct_map(index)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def vectors_by_id(vectorstore, ids):
+    """
+    Stored vectors of chunks by docstore ID (None for IDs the store doesn't hold), so
+    retrieved chunks don't have to be embedded again. Approximate for PQ indexes.
+    """
+    mapping = vectorstore.index_to_docstore_id
+    if isinstance(mapping, SqliteRowMap):
+        rows = mapping.rows_of(ids)
+    else: # in-memory writer or pickle-format store: one pass over the mapping
+        wanted = set(ids)
+        rows = {doc_id: row for row, doc_id in mapping.items() if doc_id in wanted}
+    _ensure_direct_map(vectorstore.index)
+    return [vectorstore.index.reconstruct(int(rows[i])) if i in rows else None for i in ids]
+
+
+def load_manifest(base_path=None):
+    """Return the manifest saved with the live index, or None if there isn't one."""
+    _, path = resolve_index_path(base_path)
+    if not path:
+        return None
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def attach_lexical_index(vectorstore, path):
+    """
+    Load the BM25 index saved next to a FAISS index onto vectorstore.lexical, building
+    it from the docstore if the version predates hybrid search. None when disabled.
+    """
+    vectorstore.lexical = None
+    if not Config.HYBRID_SEARCH:
+        return vectorstore
+    lexical_path = os.path.join(path, LEXICAL_FILE)
+    if os.path.exists(lexical_path):
+        vectorstore.lexical = BM25Index.load(lexical_path)
+    else:
+        print("No BM25 index saved with this version; building it from the docstore...")
+        vectorstore.lexical = BM25Index.from_vectorstore(vectorstore)
+    return vectorstore
+
+
+@timed("index_load")
+def load_index_version(path, embeddings, writable=False, staging=None):
+    """
+    Load one saved index version. Serving (writable=False) memory-maps the index and reads
+    chunks from SQLite on demand; writers get in-memory copies they can add to and delete
+    from. With a StagingArea (src.staging), a writer's chunks stay on disk and its changes
+    are staged there. Versions saved in the old pickle format are still readable.
+    """
+    if os.path.exists(os.path.join(path, DOCSTORE_FILE)):
+        if staging is not None:
+            docstore = SqliteDocstore(path)
+            index_to_docstore_id = dict(enumerate(docstore.all_ids()))
+        elif writable:
+            docstore, index_to_docstore_id = read_all_chunks(path)
+        else:
+            docstore = SqliteDocstore(path)
+            index_to_docstore_id = SqliteRowMap(docstore)
+        store = FAISS(
+            embedding_function=embeddings,
+            index=read_index(path, mmap=not writable and staging is None),
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+    else:
+        print(f"Loading pickle-format index at {path}; it is rewritten in the new format on the next save.")
+        store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+    apply_search_params(store.index)
+    attach_lexical_index(store, path)
+    if staging is not None:
+        store.docstore = staging.docstore(store.docstore)
+    return store
+
+
+def save_vector_store(vectorstore, base_path=None, manifest=None):
+    """
+    Save a vector store (with its manifest and BM25 index) as a new version and atomically
+    point CURRENT at it.
+    Readers either see the previous version or the new one, never a partial write.
+    """
+    base_path = base_path or Config.VECTOR_STORE_PATH
+    os.makedirs(base_path, exist_ok=True)
+
+    version = f"{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    version_path = os.path.join(base_path, version)
+    write_index_files(vectorstore, version_path)
+    lexical = getattr(vectorstore, "lexical", None)
+    if lexical is not None:
+        lexical.save(os.path.join(version_path, LEXICAL_FILE))
+    if manifest is not None:
+        with open(os.path.join(version_path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+
+    tmp = os.path.join(base_path, f"{CURRENT_FILE}.{version}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(base_path, CURRENT_FILE))
+
+    _prune_versions(base_path, keep=Config.VECTOR_STORE_KEEP_VERSIONS)
+    return version
+
+
+def _prune_versions(base_path, keep):
+    """
+    Delete old version directories, keeping the newest `keep` (live one included) and
+    any version another process still has loaded.
+    """
+    live, _ = resolve_index_path(base_path)
+    versions = sorted(
+        d for d in os.listdir(base_path)
+        if os.path.isdir(os.path.join(base_path, d)) and d != live
+    )
+    for old in versions[:max(0, len(versions) - (keep - 1))]:
+        path = os.path.join(base_path, old)
+        if not is_leased(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# A process that loads a version drops a lease file (.lease-<pid>-<token>) into its
+# directory, so others (e.g. an ingestion run saving new versions) don't prune it from
+# under it. Each holder (a served store, an ingestion run's base) has its own file.
+LEASE_PREFIX = ".lease-"
+
+
+def acquire_lease(path):
+    """
+    Mark a version directory as loaded by this process; fails if it was already pruned.
+    Returns the lease, to pass to release_lease.
+    """
+    lease = os.path.join(path, f"{LEASE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    open(lease, "w").close()
+    return lease
+
+
+def release_lease(lease):
+    try:
+        os.remove(lease)
+    except FileNotFoundError:
+        pass
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return True # os.kill(pid, 0) would terminate it; treat leases as held
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass # alive, owned by another user
+    return True
+
+
+def is_leased(path):
+    """True if a running process holds a lease on the version directory."""
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return False
+    pids = {name[len(LEASE_PREFIX):].split("-")[0] for name in names if name.startswith(LEASE_PREFIX)}
+    return any(pid.isdigit() and _process_alive(int(pid)) for pid in pids)
+
+
+class VectorStoreManager:
+    """
+    Long-lived handle to the on-disk FAISS index.
+    The index is loaded once and swapped in place when a new version is saved; the BM25
+    index rides along as store.lexical, so both always come from the same version.
+    """
+
+    def __init__(self, embeddings, base_path=None, check_interval=None):
+        self.embeddings = embeddings
+        self.base_path = base_path or Config.VECTOR_STORE_PATH
+        self.check_interval = (
+            Config.VECTOR_STORE_RELOAD_INTERVAL if check_interval is None else check_interval
+        )
+        self._store = None
+        self._version = None
+        self._lease = None
+        self._last_check = float("-inf")
+        self._lock = threading.Lock()
+        atexit.register(self._release)
+
+    @property
+    def version(self):
+        return self._version
+
+    def get(self):
+        """Return the current vector store, reloading only if a new version landed."""
+        if time.monotonic() - self._last_check < self.check_interval:
+            return self._store
+
+        with self._lock:
+            self._last_check = time.monotonic()
+            version, path = resolve_index_path(self.base_path)
+            if version is None or version == self._version:
+                return self._store
+            lease = None
+            try:
+                lease = acquire_lease(path)
+                store = load_index_version(path, self.embeddings)
+            except Exception as e:
+                # Keep serving the previous version if the new one can't be read yet
+                print(f"Error loading vector store version {version}: {e}")
+                if lease:
+                    release_lease(lease)
+                return self._store
+            self._release()
+            self._store, self._version, self._lease = store, version, lease
+            print(f"Loaded vector store version {version}")
+        return self._store
+
+    def _release(self):
+        """Drop the lease on the version served so far (in-flight reads keep their open files)."""
+        if self._lease is not None:
+            release_lease(self._lease)
+
+    def invalidate(self):
+        """Force a version check on the next get()."""
+        self._last_check = float("-inf")
+
+
+_managers = {}
+_manager_lock = threading.Lock()
+
+
+def get_store_manager(embeddings, base_path=None):
+    """Process-wide VectorStoreManager per index directory, shared by the graph and every Streamlit session."""
+    base_path = base_path or Config.VECTOR_STORE_PATH
+    manager = _managers.get(base_path)
+    if manager is None:
+        with _manager_lock:
+            manager = _managers.get(base_path)
+            if manager is None:
+                manager = _managers[base_path] = VectorStoreManager(embeddings, base_path)
+    return manager
@@ -0,0 +1,122 @@
+"""
+Shared fixtures: every test gets its own data directories and an offline embedding model;
+loader and crawler tests get a local HTTP docs site.
+"""
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src import models
+from src.config import Config
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Point every on-disk store at tmp_path and embed with a deterministic fake model."""
+    for name, relative in (
+        ("VECTOR_STORE_PATH", "faiss_index"),
+        ("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite"),
+        ("CHECKPOINT_PATH", "checkpoints/checkpoints.sqlite"),
+        ("EVAL_CACHE_PATH", "eval_cache/verdicts.sqlite"),
+        ("CRAWL_STATE_PATH", "crawl_state/pages.sqlite"),
+    ):
+        monkeypatch.setattr(Config, name, str(tmp_path / relative))
+    monkeypatch.setattr(models, "_embeddings", models.LazyEmbeddings(lambda: DeterministicFakeEmbedding(size=32)))
+    return tmp_path
+
+
+class DocServer:
+    """
+    Local HTTP docs site. Serves pages (path -> HTML) with ETag and/or Last-Modified,
+    answers matching conditional GETs with 304, and records every request.
+    """
+
+    def __init__(self, etag=True, last_modified=True, delay=0.0):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.delay = delay # seconds per response, to observe concurrency
+        self.pages = {}
+        self.modified = {}
+        self.requests = [] # (path, If-None-Match, If-Modified-Since)
+        self.active = self.max_active = 0
+        self._clock = 1_700_000_000
+        self._lock = threading.Lock()
+        self._server = None
+
+    def set(self, path, html):
+        self._clock += 60
+        self.pages[path] = html
+        self.modified[path] = formatdate(self._clock, usegmt=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self._server.server_port}{path}"
+
+    def paths(self, conditional=None):
+        """Requested paths, optionally only the (non-)conditional requests."""
+        return sorted(
+            path for path, etag, since in self.requests
+            if conditional is None or conditional == bool(etag or since)
+        )
+
+    def handle(self, handler):
+        path = handler.path
+        etag_header, since = handler.headers.get("If-None-Match"), handler.headers.get("If-Modified-Since")
+        with self._lock:
+            self.requests.append((path, etag_header, since))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if path not in self.pages:
+                handler.send_error(404)
+                return
+            html = self.pages[path]
+            etag = f'"{hashlib.md5(html.encode()).hexdigest()}"'
+            if (self.etag and etag_header == etag) or (
+                self.last_modified and not etag_header and since == self.modified[path]
+            ):
+                handler.send_response(304)
+                handler.end_headers()
+                return
+            data = html.encode()
+            handler.send_response(200)
+            handler.send_header("Content-Type", "text/html; charset=utf-8")
+            handler.send_header("Content-Length", str(len(data)))
+            if self.etag:
+                handler.send_header("ETag", etag)
+            if self.last_modified:
+                handler.send_header("Last-Modified", self.modified[path])
+            handler.end_headers()
+            handler.wfile.write(data)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def doc_server():
+    """Start a DocServer; tests tweak its options and pages before requesting anything."""
+    server = DocServer().start()
+    yield server
+    server.stop()
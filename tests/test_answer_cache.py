@@ -0,0 +1,35 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src import answer_cache, graph
+from src.answer_cache import SemanticAnswerCache
+from src.config import Config
+from src.ingestion import IngestionEngine
+
+
+def test_entries_only_match_the_same_collection_selection():
+    cache = SemanticAnswerCache(DeterministicFakeEmbedding(size=32), max_entries=2)
+    cache.store("How do I read a CSV?", "pandas answer", "ctx", "v1", collections=["pandas", "numpy"])
+
+    assert cache.lookup("How do I read a CSV?", "v1") is None
+    assert cache.lookup("How do I read a CSV?", "v1", collections=["langchain"]) is None
+    entry = cache.lookup("How do I read a CSV?", "v1", collections=["numpy", "pandas"])
+    assert entry["answer"] == "pandas answer"
+
+    cache.store("How do I read a CSV?", "default answer", "ctx", "v1")
+    assert cache.lookup("How do I read a CSV?", "v1", collections=[])["answer"] == "default answer"
+    # LRU eviction removes entries from their own selection's index
+    cache.store("Another question?", "another", "ctx", "v1", collections=["pandas"])
+    assert cache.lookup("How do I read a CSV?", "v1", collections=["pandas", "numpy"]) is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_check_cache_uses_the_requested_collections(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(answer_cache, "_cache", None)
+    monkeypatch.setattr(graph, "ingestion", IngestionEngine())
+    monkeypatch.setattr(graph, "_index_version", lambda: "v1")
+    graph._remember_answer("What is a DataFrame?", "from pandas", "ctx", collections=["pandas"])
+
+    assert graph.check_cache({"question": "What is a DataFrame?", "collections": []})["cache_hit"] is False
+    hit = graph.check_cache({"question": "What is a DataFrame?", "collections": ["pandas"], "history": []})
+    assert hit["cache_hit"] is True
+    assert hit["messages"][-1].content == "from pandas"
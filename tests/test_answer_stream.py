@@ -0,0 +1,39 @@
+import time
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from src import graph, metrics
+from src.config import Config
+from src.ingestion import IngestionEngine
+
+
+def test_answer_is_streamed_with_ttft(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+    monkeypatch.setattr(metrics, "_registry", metrics.MetricsRegistry())
+    monkeypatch.setattr(graph, "ingestion", IngestionEngine())
+    answer = "Streaming works token by token."
+    monkeypatch.setattr(graph, "get_llm", lambda: FakeListChatModel(responses=[answer], sleep=0.005))
+
+    question = "Does streaming work?"
+    stream = graph.AnswerStream(
+        {"question": question, "messages": [HumanMessage(content=question)]},
+        {"configurable": {"thread_id": "stream-test"}},
+        graph=graph.workflow.compile(checkpointer=InMemorySaver()),
+    )
+    start = time.perf_counter()
+    arrivals, chunks = [], []
+    for text in stream:
+        arrivals.append(time.perf_counter() - start)
+        chunks.append(text)
+
+    assert "".join(chunks) == answer
+    assert len(chunks) > 1 and arrivals[0] < arrivals[-1] # incrementally, not in one piece
+    assert 0 < stream.ttft <= stream.total
+    assert stream.state["messages"][-1].content == answer
+    spans = metrics.get_registry().snapshot()["spans"]
+    assert spans["llm_ttft"]["count"] == 1
+    assert spans["answer_total"]["count"] == 1
+    assert spans["llm_ttft"]["total_ms"] <= spans["answer_total"]["total_ms"]
@@ -0,0 +1,109 @@
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+from src import answer_cache, batch, graph, router
+from src.config import Config
+from src.ingestion import IngestionEngine
+
+
+DOCS = [
+    Document(page_content=f"Page {i} explains the setting number {i} of the tool.",
+             metadata={"source": f"/docs/page{i}.md"})
+    for i in range(5)
+]
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake model that counts the texts embedded per call type."""
+
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(("documents", len(texts)))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append(("query", 1))
+        return super().embed_query(text)
+
+
+def _engine(monkeypatch, embeddings=None):
+    monkeypatch.setattr(answer_cache, "_cache", None)
+    monkeypatch.setattr(router, "_router", None)
+    engine = IngestionEngine(embeddings)
+    monkeypatch.setattr(graph, "ingestion", engine)
+    monkeypatch.setattr(batch, "ingestion", engine)
+    return engine
+
+
+def test_batch_goes_through_the_answer_cache(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    _engine(monkeypatch).update_vector_store(DOCS)
+    llm = FakeListChatModel(responses=["first", "second"])
+    monkeypatch.setattr(batch, "get_llm", lambda: llm)
+
+    questions = ["What is setting 1?", "What is setting 2?", "What is setting 1?"]
+    results = batch.answer_batch(questions)
+    assert [r["question"] for r in results] == questions
+    assert not any(r["cache_hit"] or r["error"] for r in results)
+    assert results[0]["answer"] == results[2]["answer"] # duplicates are answered once
+    assert all(r["sources"] for r in results)
+
+    def no_llm():
+        raise AssertionError("cached questions were sent to the LLM")
+
+    monkeypatch.setattr(batch, "get_llm", no_llm)
+    again = batch.answer_batch(questions)
+    assert all(r["cache_hit"] and r["route"] == "retrieve" for r in again)
+    assert [r["answer"] for r in again] == [r["answer"] for r in results]
+
+
+def test_questions_are_embedded_once(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", True)
+    monkeypatch.setattr(Config, "ROUTER_MIN_CORPUS_SIM", -1.0) # off-corpus check on, never triggered
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(Config, "CONTEXT_BUILDER", True)
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    embeddings = CountingEmbeddings(size=32, calls=[])
+    engine = _engine(monkeypatch, embeddings)
+    engine.update_vector_store(DOCS)
+    monkeypatch.setattr(batch, "get_llm", lambda: FakeListChatModel(responses=["answer"]))
+
+    embeddings.calls.clear()
+    results = batch.answer_batch(["What is setting 1?", "What is setting 2?", "What is setting 1?"])
+    assert all(r["route"] == "retrieve" and r["sources"] for r in results)
+    assert embeddings.calls == [("documents", 2)]
+
+
+def test_batch_without_shards_gets_the_ingestion_hint(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", False)
+    _engine(monkeypatch)
+    prompts = []
+
+    def fake_llm():
+        llm = FakeListChatModel(responses=["no docs"])
+        return RunnableLambda(lambda prompt: prompts.append(prompt.to_string()) or prompt) | llm
+
+    monkeypatch.setattr(batch, "get_llm", fake_llm)
+    results = batch.answer_batch(["What is setting 1?"])
+    assert results[0]["answer"] == "no docs" and results[0]["error"] is None
+    assert results[0]["sources"] == []
+    assert graph.NO_DOCUMENTS in prompts[0]
+
+
+def test_chunks_missing_from_the_docstore_are_skipped(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "DEDUP_ENABLED", False)
+    engine = _engine(monkeypatch)
+    engine.update_vector_store(DOCS)
+    store = engine.get_vector_store()
+    search = store.docstore.search
+    missing = store.index_to_docstore_id[0]
+    monkeypatch.setattr(store.docstore, "search",
+                        lambda doc_id: f"ID {doc_id} not found." if doc_id == missing else search(doc_id))
+
+    [docs] = batch.retrieve_batch(["What is setting 0?"], k=5)
+    assert len(docs) == 4
+    assert all(isinstance(d, Document) for d in docs)
@@ -0,0 +1,97 @@
+import os
+import random
+import pytest
+from src import ingestion as ingestion_module
+from src.config import Config
+from src.ingestion import IngestionEngine
+from src.staging import STAGING_FILE
+from src.vector_store import resolve_index_path
+
+
+@pytest.fixture
+def corpus(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "EMBEDDING_BATCH_SIZE", 8)
+    monkeypatch.setattr(Config, "DEDUP_ENABLED", False)
+    rng = random.Random(0)
+    docs_dir = workspace / "docs"
+    docs_dir.mkdir()
+    for i in range(20):
+        paragraphs = [" ".join(f"w{rng.randrange(5000)}" for _ in range(150)) for _ in range(2)]
+        (docs_dir / f"page{i:02d}.md").write_text("\n\n".join(paragraphs))
+    return str(docs_dir)
+
+
+def test_interrupted_run_resumes_from_staged_checkpoint(corpus, monkeypatch):
+    saves = []
+    save = ingestion_module.save_vector_store
+    monkeypatch.setattr(ingestion_module, "save_vector_store", lambda *a, **kw: saves.append(1) or save(*a, **kw))
+
+    engine = IngestionEngine()
+    embed = engine._embed_with_retry
+    calls = []
+
+    def failing_embed(chunks):
+        calls.append(1)
+        if len(calls) > 3:
+            raise RuntimeError("embedding service down")
+        return embed(chunks)
+
+    monkeypatch.setattr(engine, "_embed_with_retry", failing_embed)
+    assert engine.ingest_stream([corpus], checkpoint_every=8) is None
+    # Checkpoints are staged, never published
+    assert resolve_index_path(Config.VECTOR_STORE_PATH) == (None, None)
+    assert os.path.exists(os.path.join(Config.VECTOR_STORE_PATH, STAGING_FILE))
+    assert not saves
+
+    engine = IngestionEngine()
+    summary = engine.ingest_stream([corpus], checkpoint_every=8)
+    assert 0 < summary["added"] < 40
+    assert len(saves) == 1
+    assert not os.path.exists(os.path.join(Config.VECTOR_STORE_PATH, STAGING_FILE))
+
+    store = engine.load_vector_store()
+    assert store.index.ntotal == len(set(store.index_to_docstore_id.values())) == 40
+    assert len(store.lexical) == 40
+    for i in (0, 19):
+        with open(os.path.join(corpus, f"page{i:02d}.md")) as f:
+            first_paragraph = f.read().split("\n\n")[0]
+        assert store.similarity_search(first_paragraph, k=1)[0].page_content == first_paragraph
+
+    # Nothing left to do on the next run
+    summary = engine.ingest_stream([corpus], checkpoint_every=8)
+    assert (summary["added"], summary["unchanged_sources"]) == (0, 20)
+
+
+def test_resumed_run_replays_removals_onto_the_base(corpus, monkeypatch):
+    engine = IngestionEngine()
+    engine.ingest_stream([corpus])
+    base_version, _ = resolve_index_path(Config.VECTOR_STORE_PATH)
+    rng = random.Random(1)
+    for i in range(0, 20, 2):
+        path = os.path.join(corpus, f"page{i:02d}.md")
+        with open(path) as f:
+            first, _ = f.read().split("\n\n")
+        with open(path, "w") as f:
+            f.write(first + "\n\n" + " ".join(f"w{rng.randrange(5000)}" for _ in range(150)))
+
+    embed = engine._embed_with_retry
+    calls = []
+
+    def failing_embed(chunks):
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("embedding service down")
+        return embed(chunks)
+
+    monkeypatch.setattr(engine, "_embed_with_retry", failing_embed)
+    assert engine.ingest_stream([corpus], checkpoint_every=4) is None
+    assert resolve_index_path(Config.VECTOR_STORE_PATH)[0] == base_version
+
+    summary = IngestionEngine().ingest_stream([corpus], checkpoint_every=4)
+    assert summary["added"] < 10 and summary["removed"] < 10
+    store = engine.load_vector_store()
+    assert store.index.ntotal == len(set(store.index_to_docstore_id.values())) == len(store.lexical) == 40
+    texts = {store.docstore.search(i).page_content for i in store.index_to_docstore_id.values()}
+    for i in range(20):
+        with open(os.path.join(corpus, f"page{i:02d}.md")) as f:
+            assert set(f.read().split("\n\n")) <= texts
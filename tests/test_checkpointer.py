@@ -0,0 +1,107 @@
+import operator
+import time
+from typing import Annotated, TypedDict
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, StateGraph
+from src import graph
+from src.checkpointer import SqliteCheckpointSaver
+from src.config import Config
+from src.ingestion import IngestionEngine
+
+
+class CounterState(TypedDict):
+    turns: Annotated[list, operator.add]
+
+
+def _counter_app(saver):
+    workflow = StateGraph(CounterState)
+    workflow.add_node("count", lambda state: {"turns": [len(state["turns"])]})
+    workflow.set_entry_point("count")
+    workflow.add_edge("count", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def _config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def _stored_checkpoints(saver, thread_id):
+    return saver._conn.execute(
+        "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+    ).fetchone()[0]
+
+
+def test_only_the_newest_checkpoints_of_a_thread_are_kept(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "cp.sqlite"), keep_per_thread=2, thread_ttl=0)
+    app = _counter_app(saver)
+    for _ in range(5):
+        app.invoke({"turns": []}, _config("t"))
+    app.invoke({"turns": []}, _config("other"))
+
+    assert _stored_checkpoints(saver, "t") == 2
+    assert _stored_checkpoints(saver, "other") == 2
+    assert app.get_state(_config("t")).values["turns"] == [0, 1, 2, 3, 4]
+
+
+def test_idle_threads_are_evicted(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "cp.sqlite"), thread_ttl=60, sweep_interval=0)
+    app = _counter_app(saver)
+    app.invoke({"turns": []}, _config("idle"))
+    app.invoke({"turns": []}, _config("active"))
+    saver._conn.execute("UPDATE threads SET last_used = ? WHERE thread_id = 'idle'", (time.time() - 3600,))
+
+    app.invoke({"turns": []}, _config("active"))
+    assert saver.get_tuple(_config("idle")) is None
+    assert _stored_checkpoints(saver, "idle") == 0
+    assert saver.thread_count() == 1
+    assert app.get_state(_config("active")).values["turns"] == [0, 1]
+
+
+def test_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cp.sqlite")
+    app = _counter_app(SqliteCheckpointSaver(path=path))
+    app.invoke({"turns": []}, _config("t"))
+    app.invoke({"turns": []}, _config("t"))
+
+    restarted = _counter_app(SqliteCheckpointSaver(path=path))
+    assert restarted.get_state(_config("t")).values["turns"] == [0, 1]
+    restarted.invoke({"turns": []}, _config("t"))
+    assert restarted.get_state(_config("t")).values["turns"] == [0, 1, 2]
+
+
+def test_state_history_is_newest_first(tmp_path):
+    saver = SqliteCheckpointSaver(path=str(tmp_path / "cp.sqlite"), keep_per_thread=100)
+    app = _counter_app(saver)
+    for _ in range(3):
+        app.invoke({"turns": []}, _config("t"))
+
+    history = list(app.get_state_history(_config("t")))
+    steps = [snapshot.metadata["step"] for snapshot in history]
+    assert steps == list(range(7, -2, -1)) # input, start and node checkpoint per turn, newest first
+    assert history[0].values["turns"] == [0, 1, 2]
+    assert history[-1].metadata["source"] == "input"
+    # Each checkpoint's parent is the next (older) one in the list
+    for newer, older in zip(history, history[1:]):
+        assert newer.parent_config["configurable"]["checkpoint_id"] == older.config["configurable"]["checkpoint_id"]
+
+
+def test_history_is_bounded_with_a_summary_of_older_turns(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(Config, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(Config, "RERANK_ENABLED", False)
+    monkeypatch.setattr(Config, "ROUTER_HISTORY_TURNS", 2)
+    monkeypatch.setattr(graph, "ingestion", IngestionEngine())
+    answers = [f"Answer {i}. More detail." for i in range(5)]
+    llm = FakeListChatModel(responses=answers)
+    monkeypatch.setattr(graph, "get_llm", lambda: llm)
+    app = graph.workflow.compile(checkpointer=SqliteCheckpointSaver(path=str(workspace / "cp.sqlite")))
+
+    for i in range(5):
+        question = f"Question {i}?"
+        app.invoke({"question": question, "messages": [HumanMessage(content=question)]}, _config("chat"))
+
+    state = app.get_state(_config("chat")).values
+    assert [turn["question"] for turn in state["history"]] == ["Question 3?", "Question 4?"]
+    assert state["summary"].split("\n") == [f"- Question {i}? -> Answer {i}" for i in range(3)]
+    assert len(state["messages"]) == 1
@@ -0,0 +1,21 @@
+import asyncio
+from src import graph
+from src.load_test import format_latency, run_load_test
+
+
+def test_llm_semaphore_is_per_event_loop():
+    async def use():
+        semaphore = graph._llm_semaphore()
+        async with semaphore:
+            assert graph._llm_semaphore() is semaphore
+        return semaphore
+
+    # A semaphore first used in a finished loop must not leak into the next one
+    first, second = asyncio.run(use()), asyncio.run(use())
+    assert first is not second
+
+
+def test_load_test_report_without_successful_requests():
+    report = run_load_test("http://127.0.0.1:9", n_requests=2, concurrency=2)
+    assert (report["errors"], report["p50_ms"]) == (2, None)
+    assert format_latency(report) == "Latency: n/a (no successful requests)"
@@ -0,0 +1,46 @@
+import random
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from src.config import Config
+from src.ingestion import IngestionEngine
+from src.retrieval import retrieve_documents
+from src.vector_store import INDEX_TYPES
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_chunk_vectors_are_read_from_the_index(workspace, monkeypatch, index_type):
+    monkeypatch.setattr(Config, "VECTOR_INDEX_TYPE", index_type)
+    monkeypatch.setattr(Config, "PQ_M", 8)
+    monkeypatch.setattr(Config, "PQ_NBITS", 4)
+    monkeypatch.setattr(Config, "DEDUP_ENABLED", False)
+    rng = random.Random(0)
+    docs = [
+        Document(page_content=" ".join(f"w{rng.randrange(5000)}" for _ in range(60)),
+                 metadata={"source": f"/docs/page{i}.md"})
+        for i in range(700)
+    ]
+    engine = IngestionEngine()
+    engine.update_vector_store(docs)
+    hits = retrieve_documents(engine.get_vector_store(), docs[5].page_content, k=6)
+    expected = engine.embed_texts([d.page_content for d in hits])
+
+    def no_embedding(texts):
+        raise AssertionError("retrieved chunks were embedded again")
+
+    monkeypatch.setattr(engine, "embed_texts", no_embedding)
+    vectors = engine.chunk_vectors(hits)
+    assert vectors.shape == expected.shape
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    # PQ codes are lossy; the other index types store the vectors themselves
+    similarity = np.sum(vectors * expected, axis=1)
+    assert similarity.min() >= (0.8 if index_type == "ivf_pq" else 0.9999)
+
+
+def test_chunks_missing_from_the_index_are_embedded(workspace):
+    engine = IngestionEngine()
+    engine.update_vector_store([Document(page_content="indexed chunk", metadata={"source": "/docs/a.md"})])
+    hit = retrieve_documents(engine.get_vector_store(), "indexed chunk", k=1)[0]
+    gone = Document(id="not-in-index", page_content="gone chunk", metadata={"source": "/docs/b.md"})
+    vectors = engine.chunk_vectors([hit, gone])
+    assert np.allclose(vectors, engine.embed_texts(["indexed chunk", "gone chunk"]), atol=1e-6)
@@ -0,0 +1,71 @@
+import random
+import pytest
+from src.ingestion import IngestionEngine
+
+
+def _text(rng):
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(150))
+
+
+@pytest.fixture
+def site(doc_server):
+    rng = random.Random(0)
+    links = {
+        "/docs/index.html": ["a.html", "b.html#usage", "/other/x.html", "logo.png"],
+        "/docs/a.html": ["sub/c.html"],
+        "/docs/b.html": [],
+        "/docs/sub/c.html": [],
+        "/other/x.html": [],
+    }
+    for path, hrefs in links.items():
+        anchors = " ".join(f'<a href="{href}">{href}</a>' for href in hrefs)
+        doc_server.set(path, f"<html><title>{path}</title><body><p>{_text(rng)}</p>{anchors}</body></html>")
+    return doc_server
+
+
+def _crawl(engine, site):
+    site.requests.clear()
+    return engine.crawl([site.url("/docs/index.html")], max_depth=2)
+
+
+def _count_splits(engine, monkeypatch):
+    splits = []
+    split = engine.process_documents
+    monkeypatch.setattr(engine, "process_documents", lambda docs: splits.append(docs) or split(docs))
+    return splits
+
+
+CRAWLED = ["/docs/a.html", "/docs/b.html", "/docs/index.html", "/docs/sub/c.html"]
+
+
+@pytest.mark.parametrize("validator", ["etag", "last_modified"])
+def test_unchanged_pages_are_skipped(workspace, monkeypatch, site, validator):
+    site.etag = validator == "etag"
+    site.last_modified = validator == "last_modified"
+    engine = IngestionEngine()
+    summary = _crawl(engine, site)
+    # Links stay under /docs/, fragments are dropped and images are not followed
+    assert site.paths() == CRAWLED
+    assert (summary["pages_fetched"], summary["unchanged_sources"]) == (4, 0)
+
+    splits = _count_splits(engine, monkeypatch)
+    summary = _crawl(engine, site)
+    assert site.paths(conditional=True) == CRAWLED
+    assert (summary["pages_unchanged"], summary["added"], summary["removed"]) == (4, 0, 0)
+    assert not splits
+
+    site.set("/docs/b.html", site.pages["/docs/b.html"].replace("<p>", "<p>changed "))
+    summary = _crawl(engine, site)
+    assert (summary["pages_fetched"], summary["pages_unchanged"]) == (1, 3)
+    assert [docs[0].metadata["source"] for docs in splits] == [site.url("/docs/b.html")]
+    assert summary["added"] >= 1
+
+
+def test_pages_missing_from_the_index_are_fetched_in_full(workspace, site):
+    engine = IngestionEngine()
+    _crawl(engine, site)
+    engine_without_index = IngestionEngine()
+    workspace.joinpath("faiss_index", "CURRENT").unlink()
+    summary = _crawl(engine_without_index, site)
+    assert site.paths(conditional=False) == CRAWLED
+    assert summary["pages_fetched"] == 4
@@ -0,0 +1,79 @@
+import random
+from langchain_core.documents import Document
+from src.ingestion import IngestionEngine
+from src.vector_store import load_manifest
+from src.shards import collection_path
+
+
+def _text(seed):
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(150)) # ~750 chars: one chunk per paragraph
+
+
+def _doc(source, *texts):
+    return Document(page_content="\n\n".join(texts), metadata={"source": source})
+
+
+def _sources(collection=None):
+    return load_manifest(collection_path(collection))["sources"]
+
+
+def test_only_sources_whose_kept_copy_was_removed_are_rechecked(workspace):
+    footer = _text("footer")
+    docs = [
+        _doc("/docs/a.md", _text("a"), footer),
+        _doc("/docs/b.md", _text("b"), footer),
+        _doc("/docs/c.md", _text("c"), _text("shared")),
+        _doc("/docs/d.md", _text("d"), _text("shared")),
+    ]
+    engine = IngestionEngine()
+    engine.update_vector_store(docs)
+    sources = _sources()
+    assert "duplicates" not in sources["/docs/a.md"]
+    assert set(sources["/docs/b.md"]["duplicates"]) <= set(sources["/docs/a.md"]["ids"])
+
+    # a.md held the kept footer: only b.md is re-checked, and then indexes its own copy
+    summary = engine.update_vector_store(docs[1:], prune_missing=True)
+    assert summary["removed"] == 2
+    sources = _sources()
+    assert sources["/docs/b.md"]["hash"] is None
+    assert sources["/docs/d.md"]["hash"] is not None
+
+    summary = engine.update_vector_store(docs[1:])
+    assert (summary["added"], summary["unchanged_sources"]) == (1, 2)
+    store = engine.load_vector_store()
+    assert any(doc.page_content == footer for doc in store.similarity_search(footer, k=2))
+
+
+def test_duplicates_are_kept_once_per_collection(workspace):
+    shared = _text("shared")
+    docs = [
+        _doc("/docs/pandas/io.md", _text("io"), shared),
+        _doc("/docs/handbook.md", _text("handbook"), shared),
+    ]
+    summary = IngestionEngine().update_vector_store(docs)
+    assert summary["duplicates_exact"] == 0
+    assert "duplicates" not in _sources("pandas")["/docs/pandas/io.md"]
+    assert "duplicates" not in _sources()["/docs/handbook.md"]
+
+
+def test_new_sources_are_checked_against_chunks_indexed_earlier(workspace):
+    footer = _text("footer")
+    engine = IngestionEngine()
+    engine.update_vector_store([_doc("/docs/a.md", _text("a"), footer)])
+
+    summary = engine.update_vector_store([_doc("/docs/e.md", _text("e"), footer)])
+    assert (summary["added"], summary["duplicates_exact"]) == (1, 1)
+    sources = _sources()
+    assert set(sources["/docs/e.md"]["duplicates"]) <= set(sources["/docs/a.md"]["ids"])
+
+
+def test_an_edited_chunk_is_not_a_duplicate_of_the_version_it_replaces(workspace):
+    words = _text("page").split()
+    engine = IngestionEngine()
+    engine.update_vector_store([_doc("/docs/a.md", " ".join(words))])
+
+    words[-1] = "typo"
+    summary = engine.update_vector_store([_doc("/docs/a.md", " ".join(words))])
+    assert (summary["added"], summary["removed"], summary["duplicates_near"]) == (1, 1, 0)
+    assert "duplicates" not in _sources()["/docs/a.md"]
@@ -0,0 +1,82 @@
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src.config import Config
+from src.docstore import SqliteDocstore, SqliteRowMap, read_index, write_index_files
+from src.ingestion import IngestionEngine
+from src.vector_store import vectors_by_id
+
+
+def _docs(n, version=0):
+    return [
+        Document(page_content=f"Page {i} (v{version}) describes option number {i}.",
+                 metadata={"source": f"/docs/page{i}.md", "page": i})
+        for i in range(n)
+    ]
+
+
+def _served(path, embeddings):
+    docstore = SqliteDocstore(path)
+    return FAISS(embedding_function=embeddings, index=read_index(path, mmap=True),
+                 docstore=docstore, index_to_docstore_id=SqliteRowMap(docstore))
+
+
+def test_written_index_files_serve_the_same_results(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=32)
+    docs = _docs(12)
+    store = FAISS.from_documents(docs, embeddings, ids=[f"chunk-{i}" for i in range(12)])
+    store.delete(["chunk-0", "chunk-5"]) # rows behind the removed ones move up
+    path = str(tmp_path / "version")
+    write_index_files(store, path)
+
+    served = _served(path, embeddings)
+    assert len(served.index_to_docstore_id) == served.index.ntotal == 10
+    assert list(served.index_to_docstore_id.values()) == [store.index_to_docstore_id[r] for r in range(10)]
+    for doc in docs:
+        expected = store.similarity_search_with_score(doc.page_content, k=3)
+        found = served.similarity_search_with_score(doc.page_content, k=3)
+        assert [(d.id, d.page_content, d.metadata) for d, _ in found] == [
+            (d.id, d.page_content, d.metadata) for d, _ in expected
+        ]
+        assert np.allclose([s for _, s in found], [s for _, s in expected])
+
+    ids = ["chunk-6", "chunk-0", "chunk-11"]
+    assert served.index_to_docstore_id.rows_of(ids) == {
+        doc_id: row for row, doc_id in store.index_to_docstore_id.items() if doc_id in ids
+    }
+    assert served.docstore.search("chunk-0") == "ID chunk-0 not found."
+    served_vectors, stored_vectors = vectors_by_id(served, ids), vectors_by_id(store, ids)
+    assert served_vectors[1] is None and stored_vectors[1] is None
+    assert np.array_equal(served_vectors[0], stored_vectors[0])
+    assert np.array_equal(served_vectors[2], stored_vectors[2])
+
+
+def test_row_map_follows_removals_and_rebuilds(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "DEDUP_ENABLED", False)
+    engine = IngestionEngine()
+    docs = _docs(8)
+    engine.update_vector_store(docs)
+    before = engine.get_vector_store()
+    assert isinstance(before.index_to_docstore_id, SqliteRowMap)
+    old_ids = list(before.index_to_docstore_id.values())
+
+    docs[1] = _docs(2, version=1)[1]
+    del docs[4]
+    summary = engine.update_vector_store(docs, prune_missing=True)
+    assert (summary["added"], summary["removed"]) == (1, 2)
+
+    after = engine.get_vector_store()
+    assert isinstance(after.index_to_docstore_id, SqliteRowMap)
+    mapping = after.index_to_docstore_id
+    new_ids = list(mapping.values())
+    assert len(new_ids) == after.index.ntotal == 7
+    removed = set(old_ids) - set(new_ids)
+    assert len(removed) == 2
+    rows = mapping.rows_of(new_ids + sorted(removed))
+    assert rows == {doc_id: row for row, doc_id in enumerate(new_ids)}
+    assert all(mapping[row] == doc_id for doc_id, row in rows.items())
+
+    for doc in docs:
+        [hit] = after.similarity_search(doc.page_content, k=1)
+        assert (hit.page_content, hit.metadata["source"]) == (doc.page_content, doc.metadata["source"])
@@ -0,0 +1,15 @@
+import numpy as np
+from src.embedding_cache import EmbeddingCache
+
+
+def test_entries_are_separate_per_backend_and_quantization(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    torch = EmbeddingCache(path, model_name="m", backend="torch")
+    torch.store(["text"], np.ones((1, 4), dtype=np.float32))
+    assert torch.lookup(["text"])[0] is not None
+
+    assert EmbeddingCache(path, model_name="m", backend="onnx").lookup(["text"]) == [None]
+    avx2 = EmbeddingCache(path, model_name="m", backend="onnx_int8", quantization="int8-avx2")
+    avx2.store(["text"], np.zeros((1, 4), dtype=np.float32))
+    assert EmbeddingCache(path, model_name="m", backend="onnx_int8", quantization="int8-arm64").lookup(["text"]) == [None]
+    assert np.array_equal(torch.lookup(["text"])[0], np.ones(4, dtype=np.float32))
@@ -0,0 +1,106 @@
+import asyncio
+from types import SimpleNamespace
+from src.eval_runner import EvaluationRunner, VerdictCache
+from src.models import StubChatModel
+
+
+class Gauge:
+    """Tracks how many calls are in flight at once."""
+
+    def __init__(self):
+        self.active = self.max_active = self.calls = 0
+
+    def __enter__(self):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+
+    def __exit__(self, *exc):
+        self.active -= 1
+
+
+class FakeRagApp:
+    """Async stand-in for the compiled graph: answers after a delay, records deleted threads."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.gauge = Gauge()
+        self.answers = {}
+        self.deleted = []
+        self.checkpointer = SimpleNamespace(adelete_thread=self._delete)
+
+    async def _delete(self, thread_id):
+        self.deleted.append(thread_id)
+
+    async def ainvoke(self, inputs, config):
+        with self.gauge:
+            await asyncio.sleep(self.delay)
+        question = inputs["question"]
+        return {"messages": [SimpleNamespace(content=self.answers.get(question, f"About {question}"))],
+                "context": f"Docs on {question}"}
+
+
+class StubJudge:
+    """The offline stub judge, with its calls and concurrency tracked."""
+
+    model = "stub-judge"
+
+    def __init__(self, latency=0.0):
+        self.stub = StubChatModel(latency=latency, response="Score: 1.0\nReason: Stub verdict.")
+        self.gauge = Gauge()
+
+    async def ainvoke(self, messages):
+        with self.gauge:
+            return await self.stub.ainvoke(messages)
+
+
+EXAMPLES = [{"question": f"Question {i}?", "answer": f"Reference {i}"} for i in range(8)]
+
+
+def _runner(tmp_path, judge, app, concurrency):
+    runner = EvaluationRunner(judge, VerdictCache(str(tmp_path / "verdicts.sqlite")), concurrency)
+    runner.rag_app = app
+    return runner
+
+
+def test_examples_run_with_bounded_concurrency(tmp_path):
+    app = FakeRagApp()
+    judge = StubJudge(latency=0.01)
+    results = _runner(tmp_path, judge, app, concurrency=3).run(EXAMPLES)
+
+    assert [r["question"] for r in results] == [e["question"] for e in EXAMPLES]
+    assert all(r["error"] is None and r["scores"] == {"correctness": 1.0, "faithfulness": 1.0} for r in results)
+    assert app.gauge.max_active == 3
+    assert judge.gauge.calls == 2 * len(EXAMPLES)
+    assert judge.gauge.max_active > 3 # both judges of an example are called concurrently
+    assert len(set(app.deleted)) == len(EXAMPLES) # every example's thread is cleaned up
+
+
+def test_verdicts_are_reused_across_runs(tmp_path):
+    app = FakeRagApp(delay=0)
+    first = StubJudge()
+    _runner(tmp_path, first, app, concurrency=4).run(EXAMPLES)
+    assert first.gauge.calls == 2 * len(EXAMPLES)
+
+    app.answers["Question 0?"] = "A different answer"
+    second = StubJudge()
+    runner = _runner(tmp_path, second, app, concurrency=4)
+    results = runner.run(EXAMPLES)
+    assert second.gauge.calls == 2 # only the changed answer is judged again
+    assert (runner.cache.hits, runner.cache.misses) == (2 * len(EXAMPLES) - 2, 2)
+    assert not any(v["cached"] for v in results[0]["verdicts"])
+    assert all(v["cached"] for r in results[1:] for v in r["verdicts"])
+
+
+def test_failed_verdicts_are_not_cached(tmp_path):
+    class FailingJudge(StubJudge):
+        async def ainvoke(self, messages):
+            raise RuntimeError("quota exceeded")
+
+    app = FakeRagApp(delay=0)
+    results = _runner(tmp_path, FailingJudge(), app, concurrency=2).run(EXAMPLES[:2])
+    assert all("quota exceeded" in v["comment"] for r in results for v in r["verdicts"])
+
+    judge = StubJudge()
+    _runner(tmp_path, judge, app, concurrency=2).run(EXAMPLES[:2])
+    assert judge.gauge.calls == 4
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+import faiss
+import numpy as np
+from src.config import Config
+from src.lexical import BM25Index
+from src.retrieval import search_many
+
+
+def _shard(name, texts):
+    ids = [f"{name}-{i}" for i in range(len(texts))]
+    index = faiss.IndexFlatL2(4)
+    index.add(np.random.RandomState(len(texts)).rand(len(texts), 4).astype(np.float32))
+    lexical = BM25Index()
+    lexical.add(ids, texts)
+    return SimpleNamespace(index=index, index_to_docstore_id=dict(enumerate(ids)), lexical=lexical)
+
+
+def test_bm25_rankings_are_fused_per_shard(monkeypatch):
+    monkeypatch.setattr(Config, "HYBRID_SEARCH", True)
+    monkeypatch.setattr(Config, "HYBRID_DENSE_WEIGHT", 0.0)
+    # "merge" is rare in the large shard, so its BM25 scores there dwarf the small shard's
+    large = _shard("large", ["merge " * (3 - i) + "alpha" for i in range(3)]
+                   + [f"filler text {i}" for i in range(97)])
+    small = _shard("small", ["merge merge beta", "merge gamma", "merge delta"]
+                   + [f"other {i}" for i in range(3)])
+    large_hits = large.lexical.search("merge", 3)
+    small_hits = small.lexical.search("merge", 3)
+    assert small_hits[0][1] < large_hits[-1][1]
+
+    ranked, owners = search_many([large, small], ["merge"], np.zeros((1, 4), dtype=np.float32), k=2)
+    assert set(ranked[0]) == {large_hits[0][0], small_hits[0][0]}
+    assert owners[small_hits[0][0]] is small
@@ -0,0 +1,45 @@
+import random
+import pytest
+from langchain_core.documents import Document
+from src.config import Config
+from src.ingestion import IngestionEngine
+from src.vector_store import INDEX_TYPES
+
+
+def _page(rng):
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(60))
+
+
+@pytest.fixture
+def small_index_settings(monkeypatch):
+    # Small enough to train IVF / PQ on a few hundred 32-d vectors, and search every list
+    monkeypatch.setattr(Config, "PQ_M", 8)
+    monkeypatch.setattr(Config, "PQ_NBITS", 4)
+    monkeypatch.setattr(Config, "IVF_NPROBE", 1024)
+    monkeypatch.setattr(Config, "DEDUP_ENABLED", False)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_search_after_incremental_update(workspace, monkeypatch, small_index_settings, index_type):
+    monkeypatch.setattr(Config, "VECTOR_INDEX_TYPE", index_type)
+    rng = random.Random(0)
+    docs = [Document(page_content=_page(rng), metadata={"source": f"/docs/page{i}.md"}) for i in range(700)]
+    engine = IngestionEngine()
+    assert engine.update_vector_store(docs)["added"] == 700
+
+    # Change early sources, so most rows sit behind the deleted ones
+    for i in (0, 3):
+        docs[i] = Document(page_content=_page(rng), metadata={"source": f"/docs/page{i}.md"})
+    summary = engine.update_vector_store(docs)
+    assert (summary["added"], summary["removed"]) == (2, 2)
+
+    store = engine.get_vector_store()
+    assert store.index.ntotal == len(store.index_to_docstore_id) == 700
+    queries = [docs[i].page_content for i in range(0, 700, 7)] + [docs[-1].page_content]
+    found = 0
+    for text in queries:
+        hits = store.similarity_search(text, k=4)
+        assert len(hits) == 4
+        found += any(hit.page_content == text for hit in hits)
+    # PQ codes are lossy; every other index type must find each chunk by its own text
+    assert found / len(queries) >= (0.8 if index_type == "ivf_pq" else 1.0)
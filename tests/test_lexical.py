@@ -0,0 +1,40 @@
+from src import lexical
+from src.lexical import BM25Index
+
+
+def test_a_single_chunk_is_found():
+    index = BM25Index()
+    index.add(["only"], ["How to configure the retriever"])
+    assert [doc_id for doc_id, _ in index.search("configure retriever", 3)] == ["only"]
+
+
+def test_very_common_terms_are_skipped_on_larger_indexes():
+    index = BM25Index()
+    index.add([f"d{i}" for i in range(lexical.DF_CUTOFF_MIN_DOCS)],
+              [f"common text {i}" for i in range(lexical.DF_CUTOFF_MIN_DOCS)])
+    assert index.search("common", 3) == []
+    assert [doc_id for doc_id, _ in index.search("common 7", 3)] == ["d7"]
+
+
+def test_merged_postings_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(lexical, "MERGED_POSTINGS_CACHE_SIZE", 2)
+    texts = [f"alpha beta gamma delta term{i}" for i in range(30)]
+    index = BM25Index()
+    index.add([f"d{i}" for i in range(30)], texts)
+    index.save(tmp_path / "lexical.npz")
+    loaded = BM25Index.load(tmp_path / "lexical.npz")
+
+    # Without a delta, queries read the loaded arrays and cache nothing
+    for i in range(10):
+        loaded.search(f"term{i}", 3)
+    assert len(loaded._cache) == 0
+
+    loaded.add(["new"], ["term1 term2 term3 epsilon"])
+    loaded.flush()
+    loaded.add(["newer"], ["term2 zeta"])
+    for i in range(10):
+        loaded.search(f"term{i}", 5)
+        assert len(loaded._cache) <= 2
+    assert {doc_id for doc_id, _ in loaded.search("term2", 5)} == {"d2", "new", "newer"}
+    assert {doc_id for doc_id, _ in loaded.search("term3", 5)} == {"d3", "new"}
+    assert [doc_id for doc_id, _ in loaded.search("term5", 5)] == ["d5"]
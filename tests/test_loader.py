@@ -0,0 +1,44 @@
+import pytest
+from src.config import Config
+from src.crawler import DocCrawler
+from src.ingestion import IngestionEngine
+
+
+@pytest.fixture
+def pages(doc_server):
+    for i in range(8):
+        doc_server.set(f"/docs/page{i}.html",
+                       f'<html lang="en"><title>Page {i}</title><body><p>Body of page {i}.</p></body></html>')
+    return doc_server
+
+
+def test_load_urls_keeps_order_and_skips_failures(workspace, pages):
+    urls = [pages.url(f"/docs/page{i}.html") for i in (3, 1, 0)]
+    urls.insert(1, pages.url("/docs/missing.html"))
+    docs = IngestionEngine().load_urls(urls)
+    assert [d.metadata["title"] for d in docs] == ["Page 3", "Page 1", "Page 0"]
+    assert docs[0].metadata["source"] == urls[0]
+    assert "Body of page 3." in docs[0].page_content
+
+
+def test_load_urls_caps_requests_per_host(workspace, monkeypatch, pages):
+    monkeypatch.setattr(Config, "HTTP_PER_HOST_LIMIT", 2)
+    monkeypatch.setattr(Config, "HTTP_MAX_WORKERS", 8)
+    pages.delay = 0.2
+    urls = [pages.url(f"/docs/page{i}.html") for i in range(8)]
+    assert len(IngestionEngine().load_urls(urls)) == 8
+    assert pages.max_active == 2
+
+    # The limit is per host: a second host name for the same server gets its own slots
+    pages.max_active = 0
+    other_host = [url.replace("127.0.0.1", "localhost") for url in urls[:4]]
+    assert len(IngestionEngine().load_urls(urls[4:] + other_host)) == 8
+    assert pages.max_active == 4
+
+
+def test_crawler_builds_the_same_documents_as_the_loader(workspace, pages):
+    engine = IngestionEngine()
+    url = pages.url("/docs/page2.html")
+    loaded = engine.load_urls([url])
+    crawled, _ = DocCrawler(engine._content_hash, engine._host_limit).fetch(url)
+    assert [(d.page_content, d.metadata) for d in crawled] == [(d.page_content, d.metadata) for d in loaded]
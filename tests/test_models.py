@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import pytest
+from langchain_community import embeddings as community_embeddings
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from src import models
+from src.config import Config
+from src.embedding_cache import EmbeddingCache
+from src.ingestion import IngestionEngine
+
+
+LOADS = [] # (model_name, model_kwargs, encode_kwargs) per loaded model
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    """Stands in for HuggingFaceEmbeddings and records how each model was loaded."""
+
+    def __init__(self, model_name, model_kwargs, encode_kwargs):
+        super().__init__(size=8)
+        LOADS.append((model_name, model_kwargs, encode_kwargs))
+
+
+@pytest.fixture
+def loads(tmp_path, monkeypatch):
+    monkeypatch.setattr(community_embeddings, "HuggingFaceEmbeddings", RecordingEmbeddings)
+    LOADS.clear()
+    monkeypatch.setattr(models, "_embeddings", None)
+    monkeypatch.setattr(models, "_backend_embeddings", {})
+    monkeypatch.setattr(Config, "EMBEDDING_THREADS", 0)
+    monkeypatch.setattr(Config, "EMBEDDING_MODEL", "org/model")
+    monkeypatch.setattr(Config, "ONNX_MODEL_DIR", str(tmp_path / "onnx_models"))
+    monkeypatch.setattr(Config, "ONNX_QUANTIZATION", "avx2")
+    return LOADS
+
+
+def _exported_int8_model():
+    """Pretend onnx_int8 was exported before, so no export runs."""
+    path = os.path.join(Config.ONNX_MODEL_DIR, "org__model")
+    os.makedirs(os.path.join(path, "onnx"))
+    open(os.path.join(path, "onnx", "model_qint8_avx2.onnx"), "w").close()
+    return path
+
+
+def test_the_configured_backend_is_loaded_on_first_use(loads, monkeypatch):
+    int8_path = _exported_int8_model()
+    expected = {
+        "torch": ("org/model", {}),
+        "onnx": ("org/model", {"backend": "onnx", "model_kwargs": {}}),
+        "onnx_int8": (int8_path, {"backend": "onnx", "model_kwargs": {"file_name": "onnx/model_qint8_avx2.onnx"}}),
+    }
+    for backend, (model_name, model_kwargs) in expected.items():
+        monkeypatch.setattr(Config, "EMBEDDING_BACKEND", backend)
+        monkeypatch.setattr(models, "_embeddings", None)
+        loads.clear()
+        embeddings = models.get_embeddings()
+        assert models.get_embeddings() is embeddings
+        assert not embeddings.loaded and loads == []
+
+        embeddings.embed_query("hello")
+        assert loads == [(model_name, model_kwargs, {"normalize_embeddings": True})]
+
+
+def test_other_backends_get_their_own_shared_instance(loads, monkeypatch):
+    monkeypatch.setattr(Config, "EMBEDDING_BACKEND", "torch")
+    default = models.get_embeddings()
+    onnx = models.get_embeddings("onnx")
+    assert onnx is not default
+    assert models.get_embeddings("onnx") is onnx
+    assert models.get_embeddings("torch") is default
+
+    onnx.embed_query("hello")
+    assert [kwargs.get("backend") for _, kwargs, _ in loads] == ["onnx"]
+
+
+def test_unknown_backends_are_rejected(loads, monkeypatch):
+    with pytest.raises(ValueError):
+        models.get_embeddings("tensorrt")
+    monkeypatch.setattr(Config, "EMBEDDING_BACKEND", "tensorrt")
+    with pytest.raises(ValueError):
+        models.get_embeddings().embed_query("hello")
+
+
+def test_switching_backend_switches_the_embedding_cache_key(workspace, loads, monkeypatch):
+    vector = np.ones((1, 4), dtype=np.float32)
+    monkeypatch.setattr(Config, "EMBEDDING_BACKEND", "torch")
+    IngestionEngine().embedding_cache.store(["text"], vector)
+    assert EmbeddingCache().lookup(["text"])[0] is not None
+
+    for backend in ("onnx", "onnx_int8"):
+        monkeypatch.setattr(Config, "EMBEDDING_BACKEND", backend)
+        assert IngestionEngine().embedding_cache.lookup(["text"]) == [None]
+    IngestionEngine().embedding_cache.store(["text"], vector)
+
+    # int8 vectors also depend on the instruction set the model was quantized for
+    monkeypatch.setattr(Config, "ONNX_QUANTIZATION", "arm64")
+    assert EmbeddingCache().lookup(["text"]) == [None]
+    monkeypatch.setattr(Config, "ONNX_QUANTIZATION", "avx2")
+    assert EmbeddingCache().lookup(["text"])[0] is not None
+    assert loads == [] # nothing was embedded, so no model was loaded
@@ -0,0 +1,11 @@
+import pytest
+from src import graph
+from src.config import Config
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_per_query_lines_follow_log_query_trace(workspace, monkeypatch, capsys, enabled):
+    monkeypatch.setattr(Config, "LOG_QUERY_TRACE", enabled)
+    monkeypatch.setattr(Config, "CONTEXT_BUILDER", False)
+    graph._context_update("question", [])
+    assert ("---DEBUG: Retrieved 0 docs---" in capsys.readouterr().out) is enabled
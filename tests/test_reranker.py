@@ -0,0 +1,50 @@
+from langchain_core.documents import Document
+from src import graph
+from src.config import Config
+from src.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by the number of text words that occur in the question; records every batch."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32):
+        self.batches.append((len(pairs), batch_size))
+        return [sum(word in question.split() for word in text.split()) for question, text in pairs]
+
+
+def _docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def test_rerank_orders_by_score_and_caches_pairs(monkeypatch):
+    monkeypatch.setattr(Config, "RERANK_BATCH_SIZE", 16)
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, max_cache_entries=10)
+    docs = _docs("nothing here", "merge frames", "merge two data frames", "data")
+
+    kept = reranker.rerank("merge data frames", docs, top_k=2)
+    assert [d.page_content for d in kept] == ["merge two data frames", "merge frames"]
+    assert model.batches == [(4, 16)] # one batch for all pairs
+
+    # Only the pair not scored before reaches the model
+    kept = reranker.rerank("merge data frames", docs + _docs("merge data frames frames"), top_k=1)
+    assert [d.page_content for d in kept] == ["merge data frames frames"]
+    assert model.batches == [(4, 16), (1, 16)]
+    assert reranker.score("merge data frames", ["data"]) == ([1.0], 1)
+    assert reranker.rerank("merge", [], top_k=3) == []
+
+
+def test_score_cache_is_bounded():
+    reranker = CrossEncoderReranker(model=FakeCrossEncoder(), max_cache_entries=2)
+    reranker.score("q", ["a", "b", "c"])
+    assert len(reranker._scores) == 2
+    assert reranker.score("q", ["c"])[1] == 1 # most recent pairs are kept
+    assert reranker.score("q", ["a"])[1] == 0
+
+
+def test_rerank_node_keeps_the_no_documents_hint():
+    state = {"question": "How?", "documents": [], "context": graph.NO_DOCUMENTS}
+    assert graph.rerank(state) == {}
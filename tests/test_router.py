@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+import faiss
+import numpy as np
+import pytest
+from src import graph, router
+from src.config import Config
+from src.ingestion import IngestionEngine
+from src.router import QuestionRouter
+
+HISTORY = [{"question": "How do I merge two DataFrames in pandas?",
+            "answer": "Use pd.merge with the on argument to join on a key column."}]
+CONTEXT = "pandas.merge(left, right, on=None, how='inner') joins DataFrames on key columns."
+
+
+class FixedEmbeddings:
+    """Returns preset vectors and counts the questions embedded."""
+
+    def __init__(self, vectors=None):
+        self.vectors = vectors or {}
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self.vectors[text]
+
+
+def _store(*vectors):
+    index = faiss.IndexFlatIP(3)
+    index.add(np.asarray(vectors, dtype=np.float32))
+    return SimpleNamespace(index=index)
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_MIN_CORPUS_SIM", 0.05)
+    monkeypatch.setattr(Config, "ROUTER_FOLLOWUP_MAX_WORDS", 12)
+    monkeypatch.setattr(Config, "ROUTER_MAX_NOVEL_TERMS", 1)
+
+
+@pytest.mark.parametrize("question", ["Hi!", "thanks so much", "Good morning everyone."])
+def test_small_talk_is_answered_directly(question):
+    embeddings = FixedEmbeddings()
+    assert QuestionRouter(embeddings).classify(question, [], "") == ("direct", "small talk")
+    assert embeddings.calls == 0
+
+
+def test_follow_up_reuses_the_previous_context():
+    embeddings = FixedEmbeddings()
+    classify = QuestionRouter(embeddings).classify
+    assert classify("Show an example of that", HISTORY, CONTEXT)[0] == "history"
+    assert classify("Why does it need the on key?", HISTORY, CONTEXT)[0] == "history"
+    assert embeddings.calls == 0
+    # Not a follow-up: no previous turn, too many new terms, or too long
+    assert classify("Show an example of that", [], "")[0] == "retrieve"
+    assert classify("Why is groupby with rolling windows slow?", HISTORY, CONTEXT)[0] == "retrieve"
+    long_question = "Can you show that again but " + "with more words " * 4
+    assert classify(long_question, HISTORY, CONTEXT)[0] == "retrieve"
+
+
+def test_questions_far_from_the_corpus_are_answered_directly():
+    # Corpus centroid is close to the x axis; cosine similarity to it decides
+    stores = [_store([1, 0, 0], [0.8, 0.6, 0]), _store([1, 0, 0])]
+    embeddings = FixedEmbeddings({
+        "on corpus": [1, 0.1, 0],
+        "orthogonal": [0, 0, 1],
+        "just below": [0.04, 0, 0.999],
+        "just above": [0.06, 0, 0.998],
+    })
+    classify = QuestionRouter(embeddings).classify
+    assert classify("on corpus", [], "", stores, "v1")[0] == "retrieve"
+    assert classify("orthogonal", [], "", stores, "v1")[0] == "direct"
+    assert classify("just below", [], "", stores, "v1")[0] == "direct"
+    assert classify("just above", [], "", stores, "v1")[0] == "retrieve"
+    # A precomputed question vector is used as-is
+    calls = embeddings.calls
+    assert classify("not embedded", [], "", stores, "v1", query_vector=[0, 0, 1])[0] == "direct"
+    assert embeddings.calls == calls
+
+
+def test_off_corpus_check_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_MIN_CORPUS_SIM", 0)
+    embeddings = FixedEmbeddings({"orthogonal": [0, 0, 1]})
+    assert QuestionRouter(embeddings).classify("orthogonal", [], "", [_store([1, 0, 0])], "v1")[0] == "retrieve"
+    assert embeddings.calls == 0
+
+
+def test_centroid_is_recomputed_per_index_version():
+    router_ = QuestionRouter(FixedEmbeddings())
+    first = router_._corpus_centroid([_store([1, 0, 0])], "v1")
+    assert np.allclose(router_._corpus_centroid([_store([0, 1, 0])], "v1"), first)
+    assert np.allclose(router_._corpus_centroid([_store([0, 1, 0])], "v2"), [0, 1, 0])
+
+
+def test_history_route_answers_from_the_checkpointed_context(workspace, monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", True)
+    monkeypatch.setattr(router, "_router", None)
+    monkeypatch.setattr(graph, "ingestion", IngestionEngine())
+    state = {"question": "Show an example of that", "history": HISTORY, "context": CONTEXT,
+             "summary": "", "cache_hit": True}
+
+    update = graph.route(state)
+    assert update == {"route": "history", "cache_hit": False} # context is left as checkpointed
+    assert graph.route_question({**state, **update}) == "generate"
+    prompt, inputs = graph._prompt_inputs({**state, **update})
+    assert prompt is graph.FOLLOWUP_PROMPT
+    assert inputs["context"] == CONTEXT
+    assert HISTORY[0]["answer"] in inputs["history"]
@@ -0,0 +1,13 @@
+import pytest
+from src import graph
+from src.config import Config
+
+
+@pytest.mark.parametrize("router_enabled", [True, False])
+def test_router_clears_the_previous_turns_cache_hit(workspace, monkeypatch, router_enabled):
+    monkeypatch.setattr(Config, "ROUTER_ENABLED", router_enabled)
+    # State as checkpointed after a turn answered from the answer cache
+    state = {"question": "hello!", "cache_hit": True, "context": "cached context", "history": []}
+    update = graph.route(state)
+    assert update["cache_hit"] is False
+    assert update["route"] == ("direct" if router_enabled else "retrieve")
@@ -0,0 +1,51 @@
+import os
+import shutil
+import threading
+from langchain_core.documents import Document
+from src.config import Config
+from src.ingestion import IngestionEngine
+from src.vector_store import VectorStoreManager, resolve_index_path
+
+
+def _docs(tag):
+    return [Document(page_content=f"{tag} page {i} about faiss indexes", metadata={"source": f"/docs/{i}.md"})
+            for i in range(5)]
+
+
+def _search_in_thread(store, query):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(hits=store.similarity_search(query, k=2)))
+    thread.start()
+    thread.join()
+    return result["hits"]
+
+
+def test_served_version_is_not_pruned(workspace):
+    engine = IngestionEngine()
+    engine.update_vector_store(_docs("first"))
+    manager = VectorStoreManager(engine.embeddings, Config.VECTOR_STORE_PATH, check_interval=0)
+    served = manager.get()
+    _, served_path = resolve_index_path(Config.VECTOR_STORE_PATH)
+
+    # Two more versions would normally prune the served one (VECTOR_STORE_KEEP_VERSIONS = 2)
+    engine.update_vector_store(_docs("second"))
+    engine.update_vector_store(_docs("third"))
+    assert os.path.isdir(served_path)
+    assert len(_search_in_thread(served, "first page 1")) == 2
+
+    # Once the manager moves on, its old version is released and pruned by the next save
+    manager.get()
+    engine.update_vector_store(_docs("fourth"))
+    assert not os.path.exists(served_path)
+    manager._release()
+
+
+def test_loaded_store_survives_directory_removal(workspace):
+    engine = IngestionEngine()
+    engine.update_vector_store(_docs("first"))
+    manager = VectorStoreManager(engine.embeddings, Config.VECTOR_STORE_PATH, check_interval=0)
+    served = manager.get()
+    _, served_path = resolve_index_path(Config.VECTOR_STORE_PATH)
+
+    shutil.rmtree(served_path)
+    assert len(_search_in_thread(served, "first page 1")) == 2